@@ -7,12 +7,17 @@ from typing import Optional, List
 from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel, Field
 import os
+import time
 import uuid
 import jwt
 
 # Import services
 from media_service import MediaService
 from email_queue_service import EmailQueueService
+from user_cache_service import user_cache_service
+from recurrence_service import recurrence_service
+from calendar_service import calendar_service
+from search_service import search_service
 
 router = APIRouter(prefix="/api")
 
@@ -31,6 +36,7 @@ class RecurringEventCreate(BaseModel):
     capacity: Optional[int] = None
     price: float = 0
     category: str = "other"
+    store_as_series: bool = False  # Store one RRULE series instead of one document per date
     
 class MediaUpdate(BaseModel):
     media_id: str
@@ -56,7 +62,7 @@ async def get_current_user(request: Request):
         payload = jwt.decode(token, os.getenv("JWT_SECRET", "your-secret-key"), algorithms=["HS256"])
         user_id = payload.get("user_id")
         db = request.app.state.db
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        user = await user_cache_service.get_user(db, user_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -96,66 +102,90 @@ async def create_recurring_event(
             "capacity": event.capacity,
             "price": event.price,
             "category": event.category,
+            "type": event.category,
             "created_at": datetime.now(timezone.utc).isoformat(),
             "created_by": user["id"]
         }
-        await db.calendar_events.insert_one(event_doc)
+        await db.calendar_events.insert_one(search_service.with_search_terms("calendar_events", event_doc))
+        search_service.index_document("calendar_events", event_doc)
         return {"message": "Event created", "event_id": event_doc["id"]}
     
+    if event.store_as_series:
+        try:
+            rule = recurrence_service.build_rule(
+                event.recurrence_frequency,
+                event.start_date,
+                event.recurrence_end_date,
+                event.recurrence_days
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        series = recurrence_service.build_series({
+            "id": str(uuid.uuid4()),
+            "title": event.title,
+            "description": event.description,
+            "time": event.start_time,
+            "end_time": event.end_time,
+            "location": event.location,
+            "capacity": event.capacity,
+            "price": event.price,
+            "category": event.category,
+            "type": event.category,
+            "is_recurring": True,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "created_by": user["id"]
+        }, rule, collection="calendar_events")
+        await db.event_series.insert_one(series)
+        series.pop("_id", None)
+        return {"message": "Recurring event series created", "series_id": series["id"], "rrule": series["rrule"]}
+    
     # Create recurring events
+    generation_started = time.perf_counter()
     start_date = datetime.fromisoformat(event.start_date)
     end_date = datetime.fromisoformat(event.recurrence_end_date) if event.recurrence_end_date else start_date + timedelta(days=365)
     
-    created_events = []
-    current_date = start_date
+    instances = calendar_service.generate_recurring_events(
+        {
+            "title": event.title,
+            "description": event.description,
+            "time": event.start_time,
+            "end_time": event.end_time,
+            "location": event.location,
+            "capacity": event.capacity,
+            "price": event.price,
+            "category": event.category,
+            "is_recurring": True,
+            "recurrence_group": None,  # Can add group ID later
+            "created_by": user["id"]
+        },
+        start_date.strftime("%Y-%m-%d"),
+        end_date.strftime("%Y-%m-%d"),
+        event.recurrence_frequency,
+        event.recurrence_days
+    )
+    # These instances are standalone calendar entries, not children of an events document
+    for instance in instances:
+        del instance["parent_event_id"]
+        del instance["event_type"]
+    generated_ms = (time.perf_counter() - generation_started) * 1000
     
-    while current_date <= end_date:
-        should_create = False
-        
-        if event.recurrence_frequency == "daily":
-            should_create = True
-        elif event.recurrence_frequency == "weekly":
-            day_name = current_date.strftime("%A").lower()
-            should_create = day_name in [d.lower() for d in (event.recurrence_days or [])]
-        elif event.recurrence_frequency == "monthly":
-            should_create = current_date.day == start_date.day
-        
-        if should_create:
-            event_doc = {
-                "id": str(uuid.uuid4()),
-                "title": event.title,
-                "description": event.description,
-                "date": current_date.strftime("%Y-%m-%d"),
-                "time": event.start_time,
-                "end_time": event.end_time,
-                "location": event.location,
-                "capacity": event.capacity,
-                "price": event.price,
-                "category": event.category,
-                "is_recurring": True,
-                "recurrence_group": None,  # Can add group ID later
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "created_by": user["id"]
-            }
-            await db.calendar_events.insert_one(event_doc)
-            created_events.append(event_doc["id"])
-        
-        # Increment date
-        if event.recurrence_frequency == "daily":
-            current_date += timedelta(days=1)
-        elif event.recurrence_frequency == "weekly":
-            current_date += timedelta(days=1)
-        elif event.recurrence_frequency == "monthly":
-            # Move to next month, same day
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1)
+    for instance in instances:
+        search_service.with_search_terms("calendar_events", instance)
+    count = await calendar_service.insert_instances(db.calendar_events, instances)
+    for instance in instances:
+        search_service.index_document("calendar_events", instance)
+    total_ms = (time.perf_counter() - generation_started) * 1000
     
     return {
-        "message": f"Created {len(created_events)} recurring event instances",
-        "event_ids": created_events,
-        "count": len(created_events)
+        "message": f"Created {count} recurring event instances",
+        "event_ids": [instance["id"] for instance in instances],
+        "count": count,
+        "timing_ms": {
+            "generate": round(generated_ms, 1),
+            "insert": round(total_ms - generated_ms, 1),
+            "total": round(total_ms, 1)
+        }
     }
 
 # ===== MEDIA MANAGEMENT ENDPOINTS =====
@@ -213,12 +243,16 @@ async def get_media_by_category(
     category: str,
     skip: int = 0,
     limit: int = 50,
+    cursor: Optional[str] = None,
     request: Request = None
 ):
     """Get all media in category"""
     db = request.app.state.db
     media_service = MediaService(db)
-    return await media_service.get_media_by_category(category, skip, limit)
+    try:
+        return await media_service.get_media_by_category(category, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/media/update")
 async def update_media(
@@ -0,0 +1,236 @@
+"""
+Advanced Stats Service for MNASE Basketball League
+Derives per-game and efficiency metrics from player_stats in batch and materializes them
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from pymongo import ASCENDING, DeleteMany, ReplaceOne
+
+# player_stats fields loaded as columns
+IDENTITY_COLUMNS = ("id", "player_name", "team_name", "season", "jersey_number", "position")
+TOTAL_COLUMNS = (
+    "games_played", "minutes_played", "points",
+    "field_goals_made", "field_goals_attempted",
+    "three_pointers_made", "three_pointers_attempted",
+    "free_throws_made", "free_throws_attempted",
+    "offensive_rebounds", "defensive_rebounds", "total_rebounds",
+    "assists", "steals", "blocks", "turnovers"
+)
+
+# Derived metric -> decimal places it is stored with; every one can be sorted on
+ADVANCED_METRICS = {
+    "points_per_game": 1,
+    "rebounds_per_game": 1,
+    "assists_per_game": 1,
+    "steals_per_game": 1,
+    "blocks_per_game": 1,
+    "turnovers_per_game": 1,
+    "minutes_per_game": 1,
+    "field_goal_pct": 3,
+    "three_point_pct": 3,
+    "free_throw_pct": 3,
+    "effective_fg_pct": 3,
+    "true_shooting_pct": 3,
+    "usage_pct": 1,
+    "efficiency": 1,
+    "assist_turnover_ratio": 2
+}
+
+# Free throws that end a possession, as in the usual possession estimate
+FREE_THROW_WEIGHT = 0.44
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Elementwise numerator / denominator, 0 where the denominator is 0"""
+    return np.divide(
+        numerator, denominator,
+        out=np.zeros(len(numerator), dtype=np.float64),
+        where=denominator > 0
+    )
+
+
+def compute_advanced(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Derive advanced metrics for a set of players
+
+    Every metric is computed over whole arrays. Usage needs team totals,
+    which are summed per (season, team) with ``bincount``, so the input must
+    hold every player of each team it covers.
+
+    - per-game averages divide totals by games played
+    - effective FG% = (FGM + 0.5 * 3PM) / FGA
+    - true shooting % = PTS / (2 * (FGA + 0.44 * FTA))
+    - usage % is the share of team plays (FGA + 0.44 * FTA + TOV) a player
+      used while on the floor; without minutes it is the share of all team plays
+    - efficiency = (PTS + REB + AST + STL + BLK - missed FG - missed FT - TOV) per game
+
+    Args:
+        columns: Lists keyed by IDENTITY_COLUMNS and TOTAL_COLUMNS, one entry per player
+    """
+    if not columns.get("id"):
+        return []
+    totals = {column: np.asarray(columns[column], dtype=np.float64) for column in TOTAL_COLUMNS}
+    games = totals["games_played"]
+    minutes = totals["minutes_played"]
+    fga = totals["field_goals_attempted"]
+    fta = totals["free_throws_attempted"]
+
+    groups = np.stack([
+        np.asarray(columns["season"], dtype=str), np.asarray(columns["team_name"], dtype=str)
+    ], axis=1)
+    _, team = np.unique(groups, axis=0, return_inverse=True)
+    team = team.reshape(-1)
+    plays = fga + FREE_THROW_WEIGHT * fta + totals["turnovers"]
+    team_plays = np.bincount(team, plays)[team]
+    team_minutes = np.bincount(team, minutes)[team]
+    usage = np.where(
+        (minutes > 0) & (team_minutes > 0),
+        _ratio(plays * team_minutes / 5, minutes * team_plays),
+        _ratio(plays, team_plays)
+    )
+
+    missed = (fga - totals["field_goals_made"]) + (fta - totals["free_throws_made"])
+    metrics = {
+        "points_per_game": _ratio(totals["points"], games),
+        "rebounds_per_game": _ratio(totals["total_rebounds"], games),
+        "assists_per_game": _ratio(totals["assists"], games),
+        "steals_per_game": _ratio(totals["steals"], games),
+        "blocks_per_game": _ratio(totals["blocks"], games),
+        "turnovers_per_game": _ratio(totals["turnovers"], games),
+        "minutes_per_game": _ratio(minutes, games),
+        "field_goal_pct": _ratio(totals["field_goals_made"], fga),
+        "three_point_pct": _ratio(totals["three_pointers_made"], totals["three_pointers_attempted"]),
+        "free_throw_pct": _ratio(totals["free_throws_made"], fta),
+        "effective_fg_pct": _ratio(totals["field_goals_made"] + 0.5 * totals["three_pointers_made"], fga),
+        "true_shooting_pct": _ratio(totals["points"], 2 * (fga + FREE_THROW_WEIGHT * fta)),
+        "usage_pct": 100 * usage,
+        "efficiency": _ratio(
+            totals["points"] + totals["total_rebounds"] + totals["assists"] + totals["steals"]
+            + totals["blocks"] - missed - totals["turnovers"],
+            games
+        ),
+        "assist_turnover_ratio": np.where(
+            totals["turnovers"] > 0, _ratio(totals["assists"], totals["turnovers"]), totals["assists"]
+        )
+    }
+    rounded = {name: np.round(values, ADVANCED_METRICS[name]).tolist() for name, values in metrics.items()}
+
+    return [
+        {
+            **{column: columns[column][i] for column in IDENTITY_COLUMNS},
+            "games_played": int(games[i]),
+            **{name: values[i] for name, values in rounded.items()}
+        }
+        for i in range(len(columns["id"]))
+    ]
+
+
+class AdvancedStatsService:
+    """
+    Materialized advanced player metrics
+
+    Rows in ``player_advanced_stats`` mirror ``player_stats`` one to one
+    (same ``id``) with the metrics from ``compute_advanced``. They are
+    rebuilt per team: usage depends on the team's totals, so whenever a
+    player's totals change their whole (season, team) group is reloaded,
+    recomputed and written back in one ``bulk_write``. A full rebuild covers
+    every group at once and is used to backfill or repair the collection.
+    """
+
+    def __init__(self):
+        self.refreshes = 0
+        self.rows_written = 0
+        self.failures = 0
+        self.last_refresh_ms: Optional[float] = None
+        print("✅ AdvancedStatsService initialized")
+
+    async def load_columns(self, db, query: Dict[str, Any]) -> Dict[str, List[Any]]:
+        """
+        Load matching player_stats as one list per column
+
+        Documents are streamed and split into columns as they arrive, so a
+        full rebuild is not limited by the size of any single document.
+        Missing totals count as 0 and missing identity fields as None.
+        """
+        columns: Dict[str, List[Any]] = {column: [] for column in IDENTITY_COLUMNS + TOTAL_COLUMNS}
+        projection = {"_id": 0, **{column: 1 for column in IDENTITY_COLUMNS + TOTAL_COLUMNS}}
+        async for player in db.player_stats.find({**query, "id": {"$exists": True}}, projection):
+            for column in IDENTITY_COLUMNS:
+                columns[column].append(player.get(column))
+            for column in TOTAL_COLUMNS:
+                value = player.get(column)
+                columns[column].append(0 if value is None else value)
+        return columns
+
+    async def _refresh(self, db, query: Dict[str, Any], scope: Dict[str, Any]) -> int:
+        started = datetime.now(timezone.utc)
+        rows = compute_advanced(await self.load_columns(db, query))
+        now = started.isoformat()
+        operations = [
+            ReplaceOne({"id": row["id"]}, {**row, "updated_at": now}, upsert=True)
+            for row in rows
+        ]
+        # Rows of players that no longer exist in the refreshed scope
+        operations.append(DeleteMany({**scope, "id": {"$nin": [row["id"] for row in rows]}}))
+        await db.player_advanced_stats.bulk_write(operations, ordered=False)
+
+        self.refreshes += 1
+        self.rows_written += len(rows)
+        self.last_refresh_ms = round((datetime.now(timezone.utc) - started).total_seconds() * 1000, 1)
+        return len(rows)
+
+    async def refresh_teams(self, db, teams: Iterable[Tuple[Optional[str], Optional[str]]]) -> int:
+        """
+        Recompute the advanced rows of the given (season, team_name) groups
+
+        Called after player totals change. A failure is logged rather than
+        raised so the stats write that triggered it still succeeds; a full
+        refresh repairs the collection.
+        """
+        teams = sorted({(season, team) for season, team in teams}, key=str)
+        if not teams:
+            return 0
+        scope = {"$or": [{"season": season, "team_name": team} for season, team in teams]}
+        try:
+            return await self._refresh(db, scope, scope)
+        except Exception as e:
+            self.failures += 1
+            logging.error(f"Failed to refresh advanced stats for {teams}: {e}")
+            return 0
+
+    async def refresh_all(self, db, season: Optional[str] = None) -> Dict[str, Any]:
+        """Rebuild the advanced rows of one season, or of every season"""
+        query = {"season": season} if season else {}
+        players = await self._refresh(db, query, query)
+        return {"season": season, "players": players, "took_ms": self.last_refresh_ms}
+
+    async def ensure_materialized(self, db):
+        """Backfill the collection on first start"""
+        if await db.player_advanced_stats.estimated_document_count() == 0:
+            await self.refresh_all(db)
+
+    async def ensure_indexes(self, db):
+        """Create the indexes used to upsert rows and serve sorted tables"""
+        await db.player_advanced_stats.create_index("id", unique=True)
+        await db.player_advanced_stats.create_index([("season", ASCENDING), ("team_name", ASCENDING)])
+        for metric in ADVANCED_METRICS:
+            await db.player_advanced_stats.create_index(
+                [("season", ASCENDING), (metric, ASCENDING), ("id", ASCENDING)]
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get refresh counters for monitoring"""
+        return {
+            "refreshes": self.refreshes,
+            "rows_written": self.rows_written,
+            "failures": self.failures,
+            "last_refresh_ms": self.last_refresh_ms
+        }
+
+
+# Initialize service
+advanced_stats_service = AdvancedStatsService()
@@ -13,6 +13,7 @@ from dotenv import load_dotenv
 
 from affiliate_service import AffiliateService
 from ticket_service import TicketService
+from user_cache_service import user_cache_service
 from emergentintegrations.payments.stripe.checkout import (
     StripeCheckout, CheckoutSessionResponse, 
     CheckoutStatusResponse, CheckoutSessionRequest
@@ -86,7 +87,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         user_id = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        user = await user_cache_service.get_user(db, user_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return user
@@ -0,0 +1,83 @@
+"""
+Script to benchmark list-scan vs bitmask permission checks
+
+Usage: python benchmark_permissions.py
+"""
+import ast
+import timeit
+from pathlib import Path
+
+from permission_service import PermissionRegistry
+
+
+def load_server_constants():
+    """
+    Read PERMISSIONS and the manager role's permissions from server.py
+
+    The literals are parsed rather than imported so the benchmark runs
+    without MongoDB settings or the server's dependencies.
+    """
+    tree = ast.parse((Path(__file__).parent / "server.py").read_text())
+    assignments = {
+        node.targets[0].id: node.value
+        for node in tree.body
+        if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)
+    }
+    catalogue = ast.literal_eval(assignments["PERMISSIONS"])
+    roles = assignments["DEFAULT_ROLES"]
+    manager = roles.values[[ast.literal_eval(key) for key in roles.keys].index("manager")]
+    manager_fields = dict(zip((ast.literal_eval(key) for key in manager.keys), manager.values))
+    return catalogue, ast.literal_eval(manager_fields["permissions"])
+
+
+# The production catalogue and the built-in manager role
+CATALOGUE, USER_PERMISSIONS = load_server_constants()
+ALL_PERMISSIONS = [perm for perms in CATALOGUE.values() for perm in perms]
+
+# An endpoint that checks many permissions at once, mostly near the end of the list
+REQUIRED = ALL_PERMISSIONS[-20::2]
+
+
+def list_has_all(user_permissions, required):
+    return all(perm in user_permissions for perm in required)
+
+
+def list_has_any(user_permissions, required):
+    return any(perm in user_permissions for perm in required)
+
+
+def main():
+    registry = PermissionRegistry(CATALOGUE)
+    user_mask = registry.compile(USER_PERMISSIONS)
+    missing = ["perm_missing"] * 10
+
+    # Same steps as has_all_permissions / has_any_permission in server.py
+    def mask_has_all():
+        required_mask, extras = registry.split(REQUIRED)
+        if not registry.has_all(user_mask, required_mask):
+            return False
+        return all(perm in USER_PERMISSIONS for perm in extras)
+
+    def mask_has_any():
+        required_mask, extras = registry.split(missing + REQUIRED[:1])
+        if registry.has_any(user_mask, required_mask):
+            return True
+        return any(perm in USER_PERMISSIONS for perm in extras)
+
+    assert mask_has_all() == list_has_all(USER_PERMISSIONS, REQUIRED)
+    assert mask_has_any() == list_has_any(USER_PERMISSIONS, missing + REQUIRED[:1])
+
+    number = 200_000
+    cases = [
+        ("has_all (list scan)", lambda: list_has_all(USER_PERMISSIONS, REQUIRED)),
+        ("has_all (bitmask)", mask_has_all),
+        ("has_any (list scan)", lambda: list_has_any(USER_PERMISSIONS, missing + REQUIRED[:1])),
+        ("has_any (bitmask)", mask_has_any),
+    ]
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print(f"{name:<22} {seconds / number * 1e9:8.1f} ns/check")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,551 @@
+"""
+Box Score Service for MNASE Basketball League
+Validates whole box scores (JSON or CSV) and applies them with bulk writes
+"""
+
+import csv
+import io
+import logging
+import math
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DeleteMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from error_utils import ValidationError, ValidationUtils
+from advanced_stats_service import advanced_stats_service
+from leaderboard_service import leaderboard_service
+from standings_service import standings_service
+
+# Player line counters added to player_stats: field -> type
+LINE_COUNTERS = {
+    "minutes_played": float,
+    "points": int,
+    "field_goals_made": int,
+    "field_goals_attempted": int,
+    "three_pointers_made": int,
+    "three_pointers_attempted": int,
+    "free_throws_made": int,
+    "free_throws_attempted": int,
+    "offensive_rebounds": int,
+    "defensive_rebounds": int,
+    "total_rebounds": int,
+    "assists": int,
+    "steals": int,
+    "blocks": int,
+    "turnovers": int,
+    "fouls": int
+}
+
+# (made, attempted) pairs that must satisfy made <= attempted
+SHOT_PAIRS = [
+    ("field_goals_made", "field_goals_attempted"),
+    ("three_pointers_made", "three_pointers_attempted"),
+    ("free_throws_made", "free_throws_attempted"),
+    ("three_pointers_made", "field_goals_made")
+]
+
+GAME_FIELDS = ("game_date", "home_team", "away_team", "home_score", "away_score", "location",
+               "game_type", "tournament_name", "notes", "season")
+GAME_TYPES = ("regular", "playoff", "tournament", "championship")
+
+# Game fields that decide which player totals a box-score game added to
+BOX_SCORE_LOCKED_FIELDS = {"player_stats", "season", "home_team", "away_team"}
+
+# Largest accepted stat or score value
+MAX_NUMBER = 2 ** 53
+
+# MongoDB error code for a write rejected by a unique index
+DUPLICATE_KEY_CODE = 11000
+
+
+def is_duplicate_key(error: Exception) -> bool:
+    """Check whether a write failed only because a unique index already holds its key"""
+    if isinstance(error, DuplicateKeyError):
+        return True
+    if isinstance(error, BulkWriteError):
+        write_errors = error.details.get("writeErrors", [])
+        return bool(write_errors) and all(e.get("code") == DUPLICATE_KEY_CODE for e in write_errors)
+    return False
+
+
+class BoxScoreService:
+    """
+    Bulk box-score ingestion
+
+    A box score is a game plus every player's line. JSON bodies carry one
+    box score ({"game": {...}, "players": [...]}) or several under
+    "box_scores"; CSV bodies have one row per player line with the game
+    columns repeated, and rows are grouped into games by date and teams.
+
+    Everything is validated in one pass before anything is written. A batch
+    is then written as one insert of the games, one ``bulk_write`` of
+    ``$inc`` upserts to player_stats (lines for the same player are summed
+    first), and one standings update.
+    """
+
+    def __init__(self):
+        self.max_lines = int(os.environ.get('BOX_SCORE_MAX_LINES', 5000))
+        self.batches = 0
+        self.games_ingested = 0
+        self.lines_ingested = 0
+        print("✅ BoxScoreService initialized")
+
+    def parse_json(self, payload: Any) -> List[Dict[str, Any]]:
+        """Normalize a JSON body to a list of {"game", "players"} box scores"""
+        if isinstance(payload, dict) and "box_scores" in payload:
+            payload = payload["box_scores"]
+        if isinstance(payload, dict):
+            payload = [payload]
+        if not isinstance(payload, list):
+            raise ValueError("Body must be a box score object or a list of them")
+        box_scores = []
+        for item in payload:
+            item = item if isinstance(item, dict) else {}
+            game, players = item.get("game"), item.get("players")
+            box_scores.append({
+                "game": game if isinstance(game, dict) else {},
+                "players": players if isinstance(players, list) else []
+            })
+        return box_scores
+
+    def parse_csv(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Group CSV player rows into box scores by (season, game_date, home_team, away_team)
+
+        Raises:
+            ValueError: If the CSV cannot be parsed
+        """
+        try:
+            rows = list(csv.DictReader(io.StringIO(text.lstrip("﻿"))))
+        except csv.Error as e:
+            raise ValueError(str(e))
+        box_scores: Dict[Tuple, Dict[str, Any]] = {}
+        for row_number, row in enumerate(rows, start=2):
+            row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+            key = tuple(row.get(field, "") for field in ("season", "game_date", "home_team", "away_team"))
+            box_score = box_scores.get(key)
+            if box_score is None:
+                box_score = box_scores[key] = {
+                    "game": {field: row[field] for field in GAME_FIELDS if row.get(field)},
+                    "players": [],
+                    "rows": []
+                }
+            box_score["players"].append({
+                k: v for k, v in row.items() if k not in GAME_FIELDS and v != ""
+            })
+            box_score["rows"].append(row_number)
+        return list(box_scores.values())
+
+    def _number(self, value: Any, kind: type) -> Any:
+        """Parse a finite int or float; raises ValueError for anything else (bools, inf, nan, huge values)"""
+        if isinstance(value, bool):
+            raise ValueError
+        try:
+            parsed = float(value)
+            # Beyond 2**53 floats lose integer precision and BSON int64 soon overflows
+            if not math.isfinite(parsed) or abs(parsed) > MAX_NUMBER:
+                raise ValueError
+            number = parsed if kind is float else int(parsed)
+        except OverflowError:
+            raise ValueError
+        if kind is int and parsed != number:
+            raise ValueError
+        return number
+
+    def _validate_game(self, game: Dict[str, Any], where: str, errors: List[ValidationError]) -> Optional[Dict]:
+        def error(field: str, message: str):
+            errors.append(ValidationError(field=f"{where}.{field}", message=message, code="invalid"))
+
+        before = len(errors)
+        for field in ("game_date", "home_team", "away_team", "home_score", "away_score", "location", "season"):
+            if game.get(field) in (None, ""):
+                error(field, "Required")
+        if len(errors) > before:
+            return None
+
+        clean = {field: game[field] for field in GAME_FIELDS if game.get(field) not in (None, "")}
+        clean["game_type"] = clean.get("game_type", "regular")
+        for field in ("home_team", "away_team", "location", "season"):
+            clean[field] = str(clean[field]).strip()
+        if not ValidationUtils.validate_date_format(str(clean["game_date"])):
+            error("game_date", "Use YYYY-MM-DD")
+        if clean["home_team"] == clean["away_team"]:
+            error("away_team", "Home and away teams must differ")
+        if clean["game_type"] not in GAME_TYPES:
+            error("game_type", f"Must be one of {', '.join(GAME_TYPES)}")
+        for field in ("home_score", "away_score"):
+            try:
+                clean[field] = self._number(clean[field], int)
+                if clean[field] < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                error(field, "Must be a non-negative integer")
+        return clean
+
+    def _validate_line(
+        self,
+        line: Dict[str, Any],
+        game: Dict[str, Any],
+        where: str,
+        errors: List[ValidationError]
+    ) -> Optional[Dict]:
+        def error(field: str, message: str):
+            errors.append(ValidationError(field=f"{where}.{field}", message=message, code="invalid"))
+
+        before = len(errors)
+        name = str(line.get("player_name") or "").strip()
+        team = str(line.get("team_name") or "").strip()
+        if not name:
+            error("player_name", "Required")
+        if team not in (game["home_team"], game["away_team"]):
+            error("team_name", "Must be the home or away team of the game")
+
+        clean: Dict[str, Any] = {"player_name": name, "team_name": team}
+        for field, kind in LINE_COUNTERS.items():
+            try:
+                clean[field] = self._number(line.get(field) or 0, kind)
+                if clean[field] < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                error(field, "Must be a non-negative number" if kind is float else "Must be a non-negative integer")
+        if len(errors) > before:
+            return None
+
+        if "total_rebounds" not in line:
+            clean["total_rebounds"] = clean["offensive_rebounds"] + clean["defensive_rebounds"]
+        for made, attempted in SHOT_PAIRS:
+            if clean[made] > clean[attempted]:
+                error(made, f"Cannot exceed {attempted}")
+        for field in ("jersey_number", "position"):
+            if line.get(field) not in (None, ""):
+                clean[field] = line[field]
+        if "jersey_number" in clean:
+            try:
+                clean["jersey_number"] = self._number(clean["jersey_number"], int)
+            except (TypeError, ValueError):
+                error("jersey_number", "Must be an integer")
+        return clean if len(errors) == before else None
+
+    def validate(self, box_scores: List[Dict[str, Any]]) -> Tuple[List[Dict], List[ValidationError], List[str]]:
+        """
+        Validate a batch in one pass
+
+        Returns:
+            (games, errors, warnings) where each game carries its validated
+            lines under "player_stats"; games is only usable if errors is empty
+        """
+        errors: List[ValidationError] = []
+        warnings: List[str] = []
+        if not box_scores:
+            errors.append(ValidationError(field="box_scores", message="No box scores given", code="empty"))
+        if sum(len(box_score["players"]) for box_score in box_scores) > self.max_lines:
+            errors.append(ValidationError(
+                field="players", message=f"At most {self.max_lines} player lines per upload", code="too_large"
+            ))
+            return [], errors, warnings
+
+        games = []
+        seen_games = set()
+        for i, box_score in enumerate(box_scores):
+            where = f"box_scores[{i}]"
+            if box_score.get("rows"):
+                where = f"rows {box_score['rows'][0]}-{box_score['rows'][-1]}"
+            game = self._validate_game(box_score["game"], f"{where}.game", errors)
+            if game is None:
+                continue
+            key = (game["season"], game["game_date"], game["home_team"], game["away_team"])
+            if key in seen_games:
+                errors.append(ValidationError(field=f"{where}.game", message="Duplicate game in upload", code="duplicate"))
+            seen_games.add(key)
+
+            lines = []
+            seen_players = set()
+            for j, line in enumerate(box_score["players"]):
+                line_where = f"rows {box_score['rows'][j]}" if box_score.get("rows") else f"{where}.players[{j}]"
+                clean = self._validate_line(line if isinstance(line, dict) else {}, game, line_where, errors)
+                if clean is None:
+                    continue
+                if (clean["player_name"], clean["team_name"]) in seen_players:
+                    errors.append(ValidationError(
+                        field=line_where, message="Player listed twice for this game", code="duplicate"
+                    ))
+                seen_players.add((clean["player_name"], clean["team_name"]))
+                lines.append(clean)
+
+            for team, score in ((game["home_team"], game.get("home_score")), (game["away_team"], game.get("away_score"))):
+                team_lines = [line for line in lines if line["team_name"] == team]
+                if team_lines and isinstance(score, int) and sum(line["points"] for line in team_lines) != score:
+                    warnings.append(f"{where}: {team} player points do not add up to the team score {score}")
+            game["player_stats"] = lines
+            games.append(game)
+        return games, errors, warnings
+
+    async def find_existing(self, db, games: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Games of the batch that were already recorded, found with one query"""
+        if not games:
+            return []
+        return await db.game_stats.find(
+            {"$or": [
+                {field: game[field] for field in ("season", "game_date", "home_team", "away_team")}
+                for game in games
+            ]},
+            {"_id": 0, "id": 1, "season": 1, "game_date": 1, "home_team": 1, "away_team": 1}
+        ).to_list(length=None)
+
+    def player_totals(self, games: List[Dict[str, Any]]) -> Dict[Tuple[str, str, str], Dict[str, Any]]:
+        """
+        Sum the games' lines per (player_name, team_name, season)
+
+        Returns:
+            Dict of player key -> {"inc": counter totals, "set": jersey/position}
+        """
+        totals: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        for game in games:
+            for line in game["player_stats"]:
+                key = (line["player_name"], line["team_name"], game["season"])
+                total = totals.get(key)
+                if total is None:
+                    total = totals[key] = {"inc": {field: 0 for field in LINE_COUNTERS}, "set": {}}
+                    total["inc"]["games_played"] = 0
+                for field in LINE_COUNTERS:
+                    total["inc"][field] += line[field]
+                total["inc"]["games_played"] += 1
+                for field in ("jersey_number", "position"):
+                    if field in line:
+                        total["set"][field] = line[field]
+        return totals
+
+    def player_operations(
+        self,
+        totals: Dict[Tuple[str, str, str], Dict[str, Any]],
+        now: str
+    ) -> List[UpdateOne]:
+        """
+        Upserts adding summed lines to each player's season totals
+
+        Lines for the same player (several games in one upload) are summed
+        first so each player gets exactly one operation, in ``totals`` order.
+        """
+        return [
+            UpdateOne(
+                {"player_name": name, "team_name": team, "season": season},
+                {
+                    "$inc": total["inc"],
+                    "$set": {**total["set"], "updated_at": now},
+                    "$setOnInsert": {
+                        "id": str(uuid.uuid4()),
+                        "created_at": now,
+                        **{field: None for field in ("jersey_number", "position") if field not in total["set"]}
+                    }
+                },
+                upsert=True
+            )
+            for (name, team, season), total in totals.items()
+        ]
+
+    def _negate(self, inc: Dict[str, Any]) -> Dict[str, Any]:
+        return {field: -value for field, value in inc.items()}
+
+    async def _rollback_players(
+        self,
+        db,
+        totals: Dict[Tuple[str, str, str], Dict[str, Any]],
+        outcome: Any
+    ):
+        """
+        Undo the player upserts of a failed upload
+
+        ``outcome`` is the bulk write's result, or the BulkWriteError it
+        raised part way; either tells which operations were applied and
+        which of them created a document. Created documents are deleted and
+        the increments of the others are subtracted again, in one bulk write.
+        """
+        if isinstance(outcome, BulkWriteError):
+            failed = {error["index"] for error in outcome.details.get("writeErrors", [])}
+            upserted = {item["index"]: item["_id"] for item in outcome.details.get("upserted", [])}
+        else:
+            failed = set()
+            upserted = dict(outcome.upserted_ids or {})
+
+        operations: List[Any] = [
+            UpdateOne(
+                {"player_name": name, "team_name": team, "season": season},
+                {"$inc": self._negate(total["inc"])}
+            )
+            for index, ((name, team, season), total) in enumerate(totals.items())
+            if index not in failed and index not in upserted
+        ]
+        if upserted:
+            operations.append(DeleteMany({"_id": {"$in": list(upserted.values())}}))
+        if operations:
+            await db.player_stats.bulk_write(operations, ordered=False)
+
+    def build_game_docs(self, games: List[Dict[str, Any]], now: str) -> List[Dict[str, Any]]:
+        """Game documents shaped like GameStats"""
+        docs = []
+        for game in games:
+            doc = {
+                "id": str(uuid.uuid4()),
+                "tournament_name": None,
+                "notes": None,
+                **game,
+                "player_totals_applied": True,
+                "created_at": now,
+                "updated_at": now
+            }
+            doc["player_stats"] = [
+                dict(line) for line in game["player_stats"]
+            ]
+            docs.append(doc)
+        return docs
+
+    async def apply(self, db, games: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Write a validated batch: one games insert, one player_stats bulk write
+        and one standings update
+
+        If any write fails the upload is compensated: the games are removed,
+        player upserts that were applied are undone (see _rollback_players)
+        and the touched seasons' standings are recomputed from their games.
+        Should the player write fail without reporting which operations
+        were applied (e.g. a dropped connection), its players are logged
+        for review since their totals cannot be rebuilt from games.
+
+        Returns:
+            Summary with the new game ids and player created/updated counts
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        docs = self.build_game_docs(games, now)
+        totals = self.player_totals(docs)
+        operations = self.player_operations(totals, now)
+        players = list(totals)
+
+        # Outcome of the player write: None until attempted, then its result or BulkWriteError
+        player_outcome: Any = None
+        players_attempted = False
+        try:
+            await db.game_stats.insert_many(docs)
+            if operations:
+                players_attempted = True
+                try:
+                    player_outcome = await db.player_stats.bulk_write(operations, ordered=False)
+                except BulkWriteError as e:
+                    player_outcome = e
+                    raise
+            await standings_service.apply_games(db, docs)
+        except Exception as e:
+            await self._rollback(db, docs, totals, player_outcome, players_attempted, e)
+            raise
+        result = player_outcome
+
+        await self._refresh_players(db, players)
+
+        created = result.upserted_count if result else 0
+        self.batches += 1
+        self.games_ingested += len(docs)
+        self.lines_ingested += sum(len(doc["player_stats"]) for doc in docs)
+        return {
+            "games": len(docs),
+            "player_lines": sum(len(doc["player_stats"]) for doc in docs),
+            "players_created": created,
+            "players_updated": len(operations) - created,
+            "game_ids": [doc["id"] for doc in docs]
+        }
+
+    async def _refresh_players(self, db, players: List[Tuple[str, str, str]]):
+        """Bring the leader boards (with one read) and advanced stats up to date for changed players"""
+        if not players:
+            return
+        seasons = sorted({season for _, _, season in players})
+        touched = set(players)
+        async for player in db.player_stats.find(
+            {"season": {"$in": seasons}, "player_name": {"$in": sorted({p[0] for p in players})}},
+            {"_id": 0}
+        ):
+            if (player.get("player_name"), player.get("team_name"), player.get("season")) in touched:
+                leaderboard_service.upsert_player(player)
+        await advanced_stats_service.refresh_teams(db, [(season, team) for _, team, season in players])
+
+    async def reverse_games(self, db, games: List[Dict[str, Any]]) -> int:
+        """
+        Subtract deleted games' lines from player season totals
+
+        Only games written by ``apply`` (marked ``player_totals_applied``)
+        added their lines to player_stats; other games are ignored.
+
+        Returns:
+            Number of players whose totals were reduced
+        """
+        totals = self.player_totals([game for game in games if game.get("player_totals_applied")])
+        if not totals:
+            return 0
+        now = datetime.now(timezone.utc).isoformat()
+        await db.player_stats.bulk_write([
+            UpdateOne(
+                {"player_name": name, "team_name": team, "season": season},
+                {"$inc": self._negate(total["inc"]), "$set": {"updated_at": now}}
+            )
+            for (name, team, season), total in totals.items()
+        ], ordered=False)
+        await self._refresh_players(db, list(totals))
+        return len(totals)
+
+    async def _rollback(
+        self,
+        db,
+        docs: List[Dict[str, Any]],
+        totals: Dict[Tuple[str, str, str], Dict[str, Any]],
+        player_outcome: Any,
+        players_attempted: bool,
+        error: Exception
+    ):
+        """Compensate a failed apply; see apply"""
+        logging.error(f"Box score upload failed, rolling back {len(docs)} games: {error}")
+        try:
+            if player_outcome is not None:
+                await self._rollback_players(db, totals, player_outcome)
+            elif players_attempted:
+                logging.error(f"Player totals may be partially applied, review: {sorted(totals)}")
+            await db.game_stats.delete_many({"id": {"$in": [doc["id"] for doc in docs]}})
+            for season in sorted({doc["season"] for doc in docs}):
+                await standings_service.recompute_season(db, season)
+        except Exception as e:
+            logging.error(f"Box score rollback failed: {e}")
+
+    async def ensure_indexes(self, db):
+        """Create the indexes used to upsert player totals and find already-recorded games"""
+        try:
+            await db.player_stats.create_index(
+                [("season", ASCENDING), ("team_name", ASCENDING), ("player_name", ASCENDING)],
+                unique=True,
+                name="season_team_player_unique"
+            )
+        except Exception as e:
+            # Existing duplicate players block the unique index until they are cleaned up
+            logging.warning(f"Unique player stats index not created: {e}")
+        try:
+            await db.game_stats.create_index(
+                [("season", ASCENDING), ("game_date", ASCENDING), ("home_team", ASCENDING), ("away_team", ASCENDING)],
+                unique=True,
+                name="season_date_teams_unique"
+            )
+        except Exception as e:
+            # Existing duplicate games block the unique index until they are cleaned up
+            logging.warning(f"Unique game stats index not created: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get ingestion counters for monitoring"""
+        return {
+            "batches": self.batches,
+            "games_ingested": self.games_ingested,
+            "lines_ingested": self.lines_ingested,
+            "max_lines": self.max_lines
+        }
+
+
+# Initialize service
+box_score_service = BoxScoreService()
@@ -0,0 +1,110 @@
+"""
+Caching Utilities for MNASE Basketball League
+Provides a small bounded in-process cache with TTL expiry and LRU eviction
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLLRUCache:
+    """
+    Bounded mapping with per-entry expiry and least-recently-used eviction
+
+    Entries older than ``ttl_seconds`` are treated as missing. When the cache
+    holds ``max_size`` entries, inserting a new key evicts the least recently
+    used one. If ``size_of`` is given, each value's size is measured when it
+    is stored and least recently used entries are also evicted to keep the
+    total under ``max_bytes``. Hit, miss and eviction counters are kept for
+    monitoring.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: float = 60.0,
+        max_bytes: Optional[int] = None,
+        size_of: Optional[Callable[[Any], int]] = None
+    ):
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = float(ttl_seconds)
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        # key -> (expires_at, value, size)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _pop(self, key: Hashable) -> Optional[tuple]:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+        return entry
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store value under key, evicting least recently used entries if full"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        size = self.size_of(value) if self.size_of else 0
+        self._pop(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        self._data[key] = (time.monotonic() + ttl, value, size)
+        self.bytes += size
+
+        while len(self._data) > self.max_size or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._data.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Remove key from the cache. Returns True if it was present"""
+        return self._pop(key) is not None
+
+    def clear(self):
+        """Remove every entry (counters are kept)"""
+        self._data.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        stats = {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+        if self.size_of is not None:
+            stats["bytes"] = self.bytes
+            stats["max_bytes"] = self.max_bytes
+        return stats
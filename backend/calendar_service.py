@@ -3,12 +3,86 @@ Calendar Service for MNASE Basketball League
 Handles recurring events, reminders, and calendar management
 """
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Iterable, List, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import os
+import re
 import uuid
 
+from pymongo import ASCENDING, UpdateOne
+
+from cache_utils import TTLLRUCache
+from recurrence_service import recurrence_service, parse_date, WEEKDAY_NAMES, WEEKDAY_CODES
+
+# Documents per insert_many call when materializing recurring instances
+INSERT_CHUNK_SIZE = 1000
+
+ICAL_HEADER = "\r\n".join([
+    "BEGIN:VCALENDAR",
+    "VERSION:2.0",
+    "PRODID:-//MNASE Basketball League//Calendar//EN",
+    "CALSCALE:GREGORIAN",
+    "METHOD:PUBLISH"
+])
+ICAL_FOOTER = "END:VCALENDAR"
+
+# VEVENTs serialized per streamed chunk
+ICAL_BATCH_SIZE = 200
+
+
+def time_to_minutes(time_str: Optional[str]) -> Optional[int]:
+    """Convert an "HH:MM" time to minutes after midnight, or None if invalid"""
+    try:
+        parsed = datetime.strptime(time_str, "%H:%M")
+    except (TypeError, ValueError):
+        return None
+    return parsed.hour * 60 + parsed.minute
+
+
+class IntervalIndex:
+    """
+    Static index over [start, end) minute intervals for one location and date
+
+    Intervals are sorted by start with a running maximum of end times, so an
+    overlap query is a binary search: some interval overlaps [start, end)
+    exactly when an interval starting before ``end`` reaches past ``start``.
+    """
+
+    def __init__(self, intervals: List[Tuple[int, int, Dict]]):
+        intervals = sorted(intervals, key=lambda interval: interval[0])
+        self.starts = [interval[0] for interval in intervals]
+        self.events = [interval[2] for interval in intervals]
+        # max_end[i] is the latest end among intervals[0..i]; max_at[i] is where it occurs
+        self.max_end = []
+        self.max_at = []
+        for i, (_, end, _) in enumerate(intervals):
+            if i == 0 or end > self.max_end[-1]:
+                self.max_end.append(end)
+                self.max_at.append(i)
+            else:
+                self.max_end.append(self.max_end[-1])
+                self.max_at.append(self.max_at[-1])
+
+    def find_overlap(self, start: int, end: int) -> Optional[Dict]:
+        """Return an event overlapping [start, end), or None"""
+        count = bisect_left(self.starts, end)
+        if count == 0 or self.max_end[count - 1] <= start:
+            return None
+        return self.events[self.max_at[count - 1]]
+
+
 class CalendarService:
     def __init__(self):
+        # Rendered iCal feeds keyed by ETag; the ETag already encodes the date range
+        self.ical_cache = TTLLRUCache(
+            max_size=int(os.environ.get('ICAL_FEED_CACHE_MAX_SIZE', 32)),
+            ttl_seconds=float(os.environ.get('ICAL_FEED_CACHE_TTL_SECONDS', 300))
+        )
+        # Larger feeds are streamed every time rather than held in memory
+        self.ical_cache_max_bytes = int(os.environ.get('ICAL_FEED_CACHE_MAX_BYTES', 2 * 1024 * 1024))
         print("✅ CalendarService initialized")
     
     def generate_recurring_events(
@@ -22,6 +96,10 @@ class CalendarService:
         """
         Generate recurring event instances
         
+        Occurrence dates are computed directly from the pattern (see
+        RecurrenceService.occurrence_dates) rather than by stepping one day at
+        a time, so the cost is proportional to the number of instances.
+        
         Args:
             base_event: Original event data
             start_date: Start date (YYYY-MM-DD)
@@ -29,49 +107,48 @@ class CalendarService:
             pattern: daily, weekly, monthly
             recurrence_days: For weekly - list of days (e.g., ["monday", "wednesday"])
         """
-        events = []
-        current_date = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
+        rule = {"freq": pattern, "interval": 1, "dtstart": start_date, "until": end_date}
+        if pattern == "weekly":
+            days = {d.lower() for d in (recurrence_days or [])}
+            rule["byday"] = [code for name, code in zip(WEEKDAY_NAMES, WEEKDAY_CODES) if name in days]
+            if not rule["byday"]:
+                return []
+        elif pattern not in ("daily", "monthly"):
+            return []
         
-        parent_id = base_event.get('id')
+        dates = recurrence_service.occurrence_dates(
+            rule,
+            parse_date(start_date),
+            parse_date(end_date)
+        )
         
-        while current_date <= end:
-            # Check if we should create an event for this date
-            should_create = False
-            
-            if pattern == "daily":
-                should_create = True
-            elif pattern == "weekly":
-                day_name = current_date.strftime("%A").lower()
-                if recurrence_days and day_name in [d.lower() for d in recurrence_days]:
-                    should_create = True
-            elif pattern == "monthly":
-                # Create on the same day of each month
-                if current_date.day == datetime.strptime(start_date, "%Y-%m-%d").day:
-                    should_create = True
-            
-            if should_create:
-                event_instance = base_event.copy()
-                event_instance['id'] = str(uuid.uuid4())
-                event_instance['date'] = current_date.strftime("%Y-%m-%d")
-                event_instance['parent_event_id'] = parent_id
-                event_instance['event_type'] = 'recurring'
-                events.append(event_instance)
-            
-            # Increment date
-            if pattern == "daily":
-                current_date += timedelta(days=1)
-            elif pattern == "weekly":
-                current_date += timedelta(days=1)
-            elif pattern == "monthly":
-                # Move to next month
-                if current_date.month == 12:
-                    current_date = current_date.replace(year=current_date.year + 1, month=1)
-                else:
-                    current_date = current_date.replace(month=current_date.month + 1)
+        parent_id = base_event.get('id')
+        created_at = datetime.now(timezone.utc).isoformat()
+        events = []
+        for occurrence_date in dates:
+            event_instance = base_event.copy()
+            event_instance['id'] = str(uuid.uuid4())
+            event_instance['date'] = occurrence_date.strftime("%Y-%m-%d")
+            event_instance['parent_event_id'] = parent_id
+            event_instance['event_type'] = 'recurring'
+            event_instance['created_at'] = created_at
+            events.append(event_instance)
         
         return events
     
+    async def insert_instances(self, collection, instances: List[Dict], chunk_size: int = INSERT_CHUNK_SIZE) -> int:
+        """
+        Insert generated instances with insert_many in fixed-size chunks
+        
+        Returns:
+            Number of documents inserted
+        """
+        inserted = 0
+        for i in range(0, len(instances), chunk_size):
+            result = await collection.insert_many(instances[i:i + chunk_size], ordered=False)
+            inserted += len(result.inserted_ids)
+        return inserted
+    
     def check_event_conflict(
         self,
         location: str,
@@ -155,40 +232,139 @@ class CalendarService:
         
         return False
     
+    def format_vevent(self, event: Dict) -> Optional[str]:
+        """
+        Serialize one event or series as a VEVENT block, or None if it is incomplete
+        
+        DTSTAMP is the event's last modification time so the same data always
+        renders to the same bytes (required for a strong ETag).
+        """
+        try:
+            # Series are exported once with their RRULE and exception dates
+            if event.get('rrule'):
+                event_date = event['rule']['dtstart'].replace('-', '')
+            else:
+                event_date = event['date'].replace('-', '')
+            event_time = event['time'].replace(':', '')
+            
+            modified = event.get('updated_at') or event.get('created_at')
+            if isinstance(modified, str):
+                modified = datetime.fromisoformat(modified)
+            if not isinstance(modified, datetime):
+                modified = datetime.now(timezone.utc)
+            if modified.tzinfo is not None:
+                modified = modified.astimezone(timezone.utc)
+            
+            vevent = [
+                "BEGIN:VEVENT",
+                f"UID:{event['id']}",
+                f"DTSTAMP:{modified.strftime('%Y%m%dT%H%M%SZ')}",
+                f"DTSTART:{event_date}T{event_time}00",
+                f"SUMMARY:{event['title']}",
+                f"DESCRIPTION:{event.get('description', '')}",
+                f"LOCATION:{event.get('location', '')}"
+            ]
+            if event.get('rrule'):
+                vevent.append(f"RRULE:{event['rrule']}")
+                for exdate in event.get('exdates') or []:
+                    vevent.append(f"EXDATE:{exdate.replace('-', '')}T{event_time}00")
+            vevent.append("END:VEVENT")
+            return "\r\n".join(vevent)
+        except (KeyError, ValueError, AttributeError):
+            return None
+    
     def generate_ical(self, events: List[Dict]) -> str:
         """
         Generate iCal format string for calendar export
         """
-        ical_lines = [
-            "BEGIN:VCALENDAR",
-            "VERSION:2.0",
-            "PRODID:-//MNASE Basketball League//Calendar//EN",
-            "CALSCALE:GREGORIAN",
-            "METHOD:PUBLISH"
-        ]
-        
+        ical_lines = [ICAL_HEADER]
         for event in events:
-            try:
-                # Parse date and time
-                event_date = event['date'].replace('-', '')
-                event_time = event['time'].replace(':', '')
-                
-                ical_lines.extend([
-                    "BEGIN:VEVENT",
-                    f"UID:{event['id']}",
-                    f"DTSTAMP:{datetime.now().strftime('%Y%m%dT%H%M%SZ')}",
-                    f"DTSTART:{event_date}T{event_time}00",
-                    f"SUMMARY:{event['title']}",
-                    f"DESCRIPTION:{event.get('description', '')}",
-                    f"LOCATION:{event.get('location', '')}",
-                    "END:VEVENT"
-                ])
-            except (KeyError, ValueError):
-                continue
-        
-        ical_lines.append("END:VCALENDAR")
+            vevent = self.format_vevent(event)
+            if vevent:
+                ical_lines.append(vevent)
+        ical_lines.append(ICAL_FOOTER)
         return "\r\n".join(ical_lines)
     
+    async def stream_ical(
+        self,
+        cursors: Iterable,
+        cache_key: Optional[str] = None,
+        batch_size: int = ICAL_BATCH_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        Serialize VEVENTs from Mongo cursors as they arrive
+        
+        Produces the same bytes as generate_ical without holding every event
+        in memory. When cache_key is given and the feed is small enough, the
+        rendered body is stored in ical_cache once the stream completes.
+        
+        Args:
+            cursors: Async iterables of event or series documents, in output order
+            cache_key: ETag to cache the complete feed under
+            batch_size: VEVENTs per yielded chunk
+        """
+        rendered: Optional[List[bytes]] = [] if cache_key else None
+        size = 0
+        
+        def emit(text: str) -> bytes:
+            nonlocal rendered, size
+            chunk = text.encode("utf-8")
+            if rendered is not None:
+                size += len(chunk)
+                if size > self.ical_cache_max_bytes:
+                    rendered = None
+                else:
+                    rendered.append(chunk)
+            return chunk
+        
+        yield emit(ICAL_HEADER + "\r\n")
+        batch = []
+        for cursor in cursors:
+            async for event in cursor:
+                vevent = self.format_vevent(event)
+                if vevent:
+                    batch.append(vevent)
+                if len(batch) >= batch_size:
+                    yield emit("\r\n".join(batch) + "\r\n")
+                    batch = []
+        if batch:
+            yield emit("\r\n".join(batch) + "\r\n")
+        yield emit(ICAL_FOOTER)
+        
+        if rendered is not None:
+            self.ical_cache.set(cache_key, b"".join(rendered))
+    
+    async def ical_etag(self, db, event_query: Dict, series_query: Dict) -> str:
+        """
+        Compute a strong ETag for an iCal feed
+        
+        Derived from the number of matching events and series and their latest
+        modification time, so any create, edit or delete in the range changes it.
+        """
+        pipeline_tail = [
+            {"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "latest": {"$max": {"$ifNull": ["$updated_at", "$created_at"]}}
+            }}
+        ]
+        events, series = await asyncio.gather(
+            db.events.aggregate([{"$match": event_query}] + pipeline_tail).to_list(1),
+            db.event_series.aggregate([{"$match": series_query}] + pipeline_tail).to_list(1)
+        )
+        parts = [repr(sorted(event_query.items())), repr(sorted(series_query.items()))]
+        for result in (events, series):
+            summary = result[0] if result else {}
+            parts.append(f"{summary.get('count', 0)}:{summary.get('latest')}")
+        return '"' + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest() + '"'
+    
+    def etag_matches(self, if_none_match: Optional[str], etag: str) -> bool:
+        """Check an If-None-Match header value against an ETag"""
+        if not if_none_match:
+            return False
+        candidates = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+    
     def filter_events(
         self,
         events: List[Dict],
@@ -217,6 +393,220 @@ class CalendarService:
             filtered = [e for e in filtered if e.get('date', '') <= end_date]
         
         return filtered
+    
+    def with_time_bounds(self, event: Dict) -> Dict:
+        """
+        Add the indexed minute-of-day fields used for conflict checks
+        
+        Events without an end time get a zero-length interval at their start.
+        Overlap is strict, so such an event conflicts with a range that starts
+        before and ends after that minute, but not with one that only starts
+        or ends at it.
+        """
+        start_minute = time_to_minutes(event.get('time'))
+        end_minute = time_to_minutes(event.get('end_time') or event.get('time'))
+        event['start_minute'] = start_minute
+        event['end_minute'] = end_minute if end_minute is not None and start_minute is not None else start_minute
+        return event
+    
+    def build_event_filter(
+        self,
+        category: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        location: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build a MongoDB filter matching filter_events
+        
+        Backed by the (category, date), (date, location) and tags indexes
+        created in ensure_indexes.
+        """
+        query: Dict[str, Any] = {}
+        
+        if category:
+            query["category"] = category
+        
+        if tags:
+            query["tags"] = {"$in": tags}
+        
+        if location:
+            # Case-insensitive substring match on the literal text
+            query["location"] = {"$regex": re.escape(location), "$options": "i"}
+        
+        if start_date or end_date:
+            query["date"] = {}
+            if start_date:
+                query["date"]["$gte"] = start_date
+            if end_date:
+                query["date"]["$lte"] = end_date
+        
+        return query
+    
+    def build_upcoming_filter(self, days_ahead: int = 7) -> Dict[str, Any]:
+        """Build a MongoDB filter for events in the next N days (see get_upcoming_events)"""
+        today = datetime.now().date()
+        future_date = today + timedelta(days=days_ahead)
+        return self.build_event_filter(
+            start_date=today.strftime("%Y-%m-%d"),
+            end_date=future_date.strftime("%Y-%m-%d")
+        )
+    
+    async def ensure_indexes(self, db):
+        """Create event query indexes and backfill minute fields on older events"""
+        await db.events.create_index(
+            [("location", ASCENDING), ("date", ASCENDING), ("start_minute", ASCENDING)],
+            name="location_date_start_minute"
+        )
+        await db.events.create_index([("date", ASCENDING), ("location", ASCENDING)], name="date_location")
+        await db.events.create_index([("category", ASCENDING), ("date", ASCENDING)], name="category_date")
+        await db.events.create_index([("tags", ASCENDING)], name="tags")
+        await db.events.create_index([("id", ASCENDING)], name="id")
+        await db.events.create_index(
+            [("date", ASCENDING), ("time", ASCENDING), ("reminder_sent", ASCENDING)],
+            name="date_time_reminder_sent"
+        )
+        
+        updates = []
+        async for event in db.events.find(
+            {"start_minute": {"$exists": False}},
+            {"_id": 0, "id": 1, "time": 1, "end_time": 1}
+        ):
+            bounds = self.with_time_bounds(dict(event))
+            updates.append(UpdateOne(
+                {"id": event['id']},
+                {"$set": {"start_minute": bounds['start_minute'], "end_minute": bounds['end_minute']}}
+            ))
+        if updates:
+            await db.events.bulk_write(updates, ordered=False)
+    
+    async def find_conflict(
+        self,
+        db,
+        location: str,
+        date: str,
+        start_time: str,
+        end_time: str,
+        exclude_event_id: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Find an existing event at the same location overlapping the given time
+        
+        Uses the (location, date, start_minute) index, so cost does not depend
+        on the total number of events. Occurrences of stored series are
+        checked too.
+        
+        Returns:
+            The conflicting event (id, title, date, time, end_time) or None
+        """
+        start_minute = time_to_minutes(start_time)
+        end_minute = time_to_minutes(end_time)
+        if start_minute is None or end_minute is None:
+            raise ValueError("Times must use HH:MM format")
+        
+        query = {
+            "location": location,
+            "date": date,
+            "start_minute": {"$lt": end_minute},
+            "end_minute": {"$gt": start_minute}
+        }
+        if exclude_event_id:
+            query["id"] = {"$ne": exclude_event_id}
+        
+        conflict = await db.events.find_one(
+            query,
+            {"_id": 0, "id": 1, "title": 1, "date": 1, "time": 1, "end_time": 1}
+        )
+        if conflict:
+            return conflict
+        
+        series_query = recurrence_service.series_window_filter("events", date, date)
+        series_query.update({
+            "location": location,
+            "start_minute": {"$lt": end_minute},
+            "end_minute": {"$gt": start_minute}
+        })
+        async for series in db.event_series.find(series_query, {"_id": 0}):
+            if series['id'] == exclude_event_id:
+                continue
+            for occurrence in recurrence_service.expand(series, date, date):
+                if occurrence['id'] != exclude_event_id:
+                    return {k: occurrence.get(k) for k in ("id", "title", "date", "time", "end_time")}
+        return None
+    
+    async def find_conflicts_bulk(
+        self,
+        db,
+        location: str,
+        instances: List[Dict],
+        exclude_event_ids: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Check a batch of proposed events at one location (e.g. recurring instances)
+        
+        Loads the existing events for the proposed dates in a single indexed
+        query, builds an IntervalIndex per date and checks each instance with a
+        binary search.
+        
+        Args:
+            instances: Proposed events with date, time and end_time
+            
+        Returns:
+            List of {"date", "time", "end_time", "conflicts_with"} for each conflicting instance
+        """
+        dates = sorted({instance['date'] for instance in instances if instance.get('date')})
+        if not dates:
+            return []
+        
+        query = {"location": location, "date": {"$in": dates}, "start_minute": {"$ne": None}}
+        if exclude_event_ids:
+            query["id"] = {"$nin": exclude_event_ids}
+        
+        by_date: Dict[str, List[Tuple[int, int, Dict]]] = {}
+        async for event in db.events.find(
+            query,
+            {"_id": 0, "id": 1, "title": 1, "date": 1, "time": 1, "end_time": 1,
+             "start_minute": 1, "end_minute": 1}
+        ):
+            by_date.setdefault(event['date'], []).append(
+                (event['start_minute'], event['end_minute'], event)
+            )
+        
+        # Occurrences of stored series at this location on the proposed dates
+        wanted = set(dates)
+        series_query = recurrence_service.series_window_filter("events", dates[0], dates[-1])
+        series_query["location"] = location
+        async for series in db.event_series.find(series_query, {"_id": 0}):
+            if exclude_event_ids and series['id'] in exclude_event_ids:
+                continue
+            if series.get('start_minute') is None:
+                continue
+            for occurrence in recurrence_service.expand(series, dates[0], dates[-1]):
+                if occurrence['date'] in wanted:
+                    by_date.setdefault(occurrence['date'], []).append(
+                        (series['start_minute'], series['end_minute'], occurrence)
+                    )
+        
+        indexes = {date: IntervalIndex(intervals) for date, intervals in by_date.items()}
+        conflicts = []
+        for instance in instances:
+            index = indexes.get(instance.get('date'))
+            if index is None:
+                continue
+            start_minute = time_to_minutes(instance.get('time'))
+            end_minute = time_to_minutes(instance.get('end_time'))
+            if start_minute is None or end_minute is None:
+                continue
+            existing = index.find_overlap(start_minute, end_minute)
+            if existing:
+                conflicts.append({
+                    "date": instance['date'],
+                    "time": instance.get('time'),
+                    "end_time": instance.get('end_time'),
+                    "conflicts_with": {k: existing.get(k) for k in ("id", "title", "time", "end_time")}
+                })
+        return conflicts
 
 # Initialize service
 calendar_service = CalendarService()
@@ -13,10 +13,8 @@ class EmailQueueService:
         self.rate_limit = 100  # Gmail free account limit: 100 emails/day
         self.processing = False
     
-    async def queue_email(self, to_email: str, subject: str, body: str, 
-                         priority: str = "normal"):
-        """Add email to queue"""
-        email_doc = {
+    def _build_email_doc(self, to_email: str, subject: str, body: str, priority: str) -> dict:
+        return {
             "to_email": to_email,
             "subject": subject,
             "body": body,
@@ -28,10 +26,27 @@ class EmailQueueService:
             "sent_at": None,
             "error": None
         }
+    
+    async def queue_email(self, to_email: str, subject: str, body: str, 
+                         priority: str = "normal"):
+        """Add email to queue"""
+        email_doc = self._build_email_doc(to_email, subject, body, priority)
         
         result = await self.db.email_queue.insert_one(email_doc)
         return {"queued": True, "queue_id": str(result.inserted_id)}
     
+    async def queue_emails(self, emails: List[dict], priority: str = "normal"):
+        """Add several emails (dicts with to_email, subject, body) to the queue with one insert"""
+        if not emails:
+            return {"queued": 0}
+        
+        email_docs = [
+            self._build_email_doc(email["to_email"], email["subject"], email["body"], priority)
+            for email in emails
+        ]
+        result = await self.db.email_queue.insert_many(email_docs, ordered=False)
+        return {"queued": len(result.inserted_ids)}
+    
     async def process_queue(self):
         """Process pending emails in queue with rate limiting"""
         if self.processing:
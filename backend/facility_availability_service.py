@@ -0,0 +1,278 @@
+"""
+Facility Availability Service for MNASE Basketball League
+Tracks per-facility, per-day occupancy as bitmaps of 15-minute slots
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ASCENDING
+
+from cache_utils import TTLLRUCache
+from calendar_service import time_to_minutes
+from recurrence_service import recurrence_service
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY_MASK = (1 << SLOTS_PER_DAY) - 1
+
+# Bookings in these states hold their slot; pending ones only until the hold expires
+OCCUPYING_PAYMENT_STATUSES = ["pending", "completed"]
+
+
+def slot_mask(start_minute: int, end_minute: int) -> int:
+    """
+    Bitmask of the 15-minute slots touched by [start_minute, end_minute)
+
+    Partial slots count as occupied, so 10:10-10:20 covers the 10:00 and
+    10:15 slots.
+    """
+    start_slot = max(0, start_minute // SLOT_MINUTES)
+    end_slot = min(SLOTS_PER_DAY, -(-end_minute // SLOT_MINUTES))
+    if end_slot <= start_slot:
+        return 0
+    return ((1 << end_slot) - 1) ^ ((1 << start_slot) - 1)
+
+
+class FacilityAvailabilityService:
+    """
+    Occupancy bitmaps for facilities
+
+    Each (facility_id, date) maps to a 96-bit integer where bit i is set when
+    the 15-minute slot starting at i * 15 minutes is taken by a booking or by
+    an event whose location is the facility's name. Checking whether a
+    facility is free between two times is a single AND against a range mask.
+
+    Bitmaps are built on demand from one bookings query and one events query
+    per date, cached briefly, and updated in place when this process writes a
+    booking or event. Releases (deletes, reschedules) drop the affected day so
+    it is rebuilt on next use. Writes made by other workers are picked up
+    when the cached day expires.
+    """
+
+    def __init__(self):
+        self.cache = TTLLRUCache(
+            max_size=int(os.environ.get('FACILITY_OCCUPANCY_CACHE_MAX_SIZE', 5000)),
+            ttl_seconds=float(os.environ.get('FACILITY_OCCUPANCY_TTL_SECONDS', 60))
+        )
+        self.booking_hold_minutes = int(os.environ.get('BOOKING_HOLD_MINUTES', 30))
+        # Lower-cased facility name -> facility id, for mapping event locations
+        self._facility_by_name: Dict[str, str] = {}
+        print("✅ FacilityAvailabilityService initialized")
+
+    def parse_range(self, start_time: str, end_time: str) -> Tuple[int, int]:
+        """
+        Convert "HH:MM" start/end times to minutes
+
+        Raises:
+            ValueError: If either time is invalid or the range is empty
+        """
+        start = time_to_minutes(start_time)
+        end = time_to_minutes(end_time)
+        if start is None or end is None:
+            raise ValueError("Times must be in HH:MM format")
+        if end <= start:
+            raise ValueError("End time must be after start time")
+        return start, end
+
+    def _remember_facilities(self, facilities: Iterable[Dict]):
+        for facility in facilities:
+            if facility.get('name'):
+                self._facility_by_name[facility['name'].strip().lower()] = facility['id']
+
+    def _booking_occupies(self, booking: Dict, now: datetime) -> bool:
+        if booking.get('payment_status') == "completed":
+            return True
+        if booking.get('payment_status') != "pending":
+            return False
+        created_at = booking.get('created_at')
+        if isinstance(created_at, str):
+            try:
+                created_at = datetime.fromisoformat(created_at)
+            except ValueError:
+                return True
+        if isinstance(created_at, datetime) and created_at.tzinfo is not None:
+            return now - created_at <= timedelta(minutes=self.booking_hold_minutes)
+        return True
+
+    def _interval_mask(self, start_time: Optional[str], end_time: Optional[str]) -> int:
+        start = time_to_minutes(start_time)
+        end = time_to_minutes(end_time)
+        if start is None or end is None:
+            return 0
+        return slot_mask(start, end)
+
+    async def load_day_masks(self, db, facilities: List[Dict], date: str) -> Dict[str, int]:
+        """
+        Get occupancy bitmaps for several facilities on one date
+
+        Cached days are returned as-is; the rest are built together with one
+        bookings query and one events query.
+        """
+        self._remember_facilities(facilities)
+        masks: Dict[str, int] = {}
+        missing = []
+        for facility in facilities:
+            mask = self.cache.get((facility['id'], date))
+            if mask is None:
+                missing.append(facility)
+            else:
+                masks[facility['id']] = mask
+        if not missing:
+            return masks
+
+        built = {facility['id']: 0 for facility in missing}
+        now = datetime.now(timezone.utc)
+        async for booking in db.bookings.find(
+            {
+                "facility_id": {"$in": list(built)},
+                "booking_date": date,
+                "payment_status": {"$in": OCCUPYING_PAYMENT_STATUSES}
+            },
+            {"_id": 0, "facility_id": 1, "start_time": 1, "end_time": 1, "payment_status": 1, "created_at": 1}
+        ):
+            if self._booking_occupies(booking, now):
+                built[booking['facility_id']] |= self._interval_mask(booking.get('start_time'), booking.get('end_time'))
+
+        ids_by_name = {
+            facility['name'].strip().lower(): facility['id']
+            for facility in missing if facility.get('name')
+        }
+        if ids_by_name:
+            events = await db.events.find(
+                {"date": date},
+                {"_id": 0, "location": 1, "time": 1, "end_time": 1}
+            ).to_list(length=None)
+            events += await recurrence_service.load_occurrences(db, None, date, date)
+            for event in events:
+                facility_id = ids_by_name.get((event.get('location') or "").strip().lower())
+                if facility_id is not None:
+                    built[facility_id] |= self._interval_mask(event.get('time'), event.get('end_time'))
+
+        for facility_id, mask in built.items():
+            self.cache.set((facility_id, date), mask)
+        masks.update(built)
+        return masks
+
+    async def is_free(self, db, facility: Dict, date: str, start_minute: int, end_minute: int) -> bool:
+        """Check that no slot of a facility is occupied between two times"""
+        masks = await self.load_day_masks(db, [facility], date)
+        return masks[facility['id']] & slot_mask(start_minute, end_minute) == 0
+
+    async def find_available(
+        self,
+        db,
+        facilities: List[Dict],
+        date: str,
+        start_minute: Optional[int] = None,
+        end_minute: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Filter facilities to those free on a date
+
+        Without a time range a facility is available if any slot is free.
+        """
+        masks = await self.load_day_masks(db, facilities, date)
+        if start_minute is None or end_minute is None:
+            return [f for f in facilities if masks[f['id']] != FULL_DAY_MASK]
+        wanted = slot_mask(start_minute, end_minute)
+        return [f for f in facilities if masks[f['id']] & wanted == 0]
+
+    def free_windows(self, mask: int) -> List[Dict[str, str]]:
+        """List the free time windows of a day bitmap as HH:MM ranges"""
+        windows = []
+        slot = 0
+        while slot < SLOTS_PER_DAY:
+            if mask >> slot & 1:
+                slot += 1
+                continue
+            start = slot
+            while slot < SLOTS_PER_DAY and not mask >> slot & 1:
+                slot += 1
+            windows.append({
+                "start_time": self._format_minute(start * SLOT_MINUTES),
+                "end_time": self._format_minute(slot * SLOT_MINUTES)
+            })
+        return windows
+
+    def _format_minute(self, minute: int) -> str:
+        return "24:00" if minute >= 24 * 60 else f"{minute // 60:02d}:{minute % 60:02d}"
+
+    def record_booking(self, booking: Dict):
+        """Mark a new booking's slots on its cached day, if that day is cached"""
+        key = (booking.get('facility_id'), booking.get('booking_date'))
+        mask = self.cache.get(key)
+        if mask is not None:
+            self.cache.set(key, mask | self._interval_mask(booking.get('start_time'), booking.get('end_time')))
+
+    async def holds_slot(self, db, booking: Dict) -> bool:
+        """
+        Check that a just-saved booking keeps its slot
+
+        Two requests can both find a slot free before either saves its
+        booking. Once saved, each sees the other here and only the earlier
+        one by (created_at, id) keeps the slot.
+        """
+        wanted = self._interval_mask(booking.get('start_time'), booking.get('end_time'))
+        claim = (booking['created_at'], booking['id'])
+        now = datetime.now(timezone.utc)
+        async for other in db.bookings.find(
+            {
+                "facility_id": booking['facility_id'],
+                "booking_date": booking['booking_date'],
+                "payment_status": {"$in": OCCUPYING_PAYMENT_STATUSES},
+                "id": {"$ne": booking['id']}
+            },
+            {"_id": 0, "id": 1, "start_time": 1, "end_time": 1, "payment_status": 1, "created_at": 1}
+        ):
+            if not self._booking_occupies(other, now):
+                continue
+            if not self._interval_mask(other.get('start_time'), other.get('end_time')) & wanted:
+                continue
+            if other.get('payment_status') == "completed" or (str(other.get('created_at')), other['id']) < claim:
+                return False
+        return True
+
+    def release_booking(self, booking: Dict):
+        """Drop the cached day a failed or expired booking occupied so it is rebuilt without it"""
+        self.cache.delete((booking.get('facility_id'), booking.get('booking_date')))
+
+    def record_event(self, event: Dict):
+        """Mark a new event's slots on the cached day of the facility it is held at"""
+        facility_id = self._facility_by_name.get((event.get('location') or "").strip().lower())
+        key = (facility_id, event.get('date'))
+        mask = self.cache.get(key) if facility_id else None
+        if mask is not None:
+            self.cache.set(key, mask | self._interval_mask(event.get('time'), event.get('end_time')))
+
+    def release_event(self, event: Dict):
+        """Drop the cached day an event occupied so it is rebuilt without it"""
+        facility_id = self._facility_by_name.get((event.get('location') or "").strip().lower())
+        if facility_id:
+            self.cache.delete((facility_id, event.get('date')))
+
+    def invalidate_all(self):
+        """Drop every cached bitmap (facility renamed or removed)"""
+        self.cache.clear()
+        self._facility_by_name.clear()
+
+    async def ensure_indexes(self, db):
+        """Create the index used to load a facility's bookings for a day"""
+        await db.bookings.create_index(
+            [("facility_id", ASCENDING), ("booking_date", ASCENDING)],
+            name="facility_booking_date"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters for monitoring"""
+        return {
+            "slot_minutes": SLOT_MINUTES,
+            "booking_hold_minutes": self.booking_hold_minutes,
+            "known_facilities": len(self._facility_by_name),
+            "cache": self.cache.stats()
+        }
+
+
+# Initialize service
+facility_availability_service = FacilityAvailabilityService()
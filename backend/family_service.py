@@ -0,0 +1,133 @@
+"""
+Family Service for MNASE Basketball League
+Batch-loads children's registrations and memberships for the family dashboard
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Any, Hashable, Iterable, Optional, Set
+
+from cache_utils import TTLLRUCache
+
+# Fields shown on the family dashboard; medical, insurance and contact details are left out
+REGISTRATION_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "user_id": 1,
+    "event_id": 1,
+    "program_id": 1,
+    "program_name": 1,
+    "athlete_first_name": 1,
+    "athlete_last_name": 1,
+    "participant_name": 1,
+    "skill_level": 1,
+    "status": 1,
+    "payment_status": 1,
+    "registration_fee": 1,
+    "created_at": 1
+}
+
+MEMBERSHIP_SUMMARY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "user_id": 1,
+    "membership_type": 1,
+    "tier": 1,
+    "status": 1,
+    "price": 1,
+    "billing_cycle": 1,
+    "payment_status": 1,
+    "start_date": 1,
+    "end_date": 1,
+    "auto_renew": 1,
+    "team_name": 1,
+    "created_at": 1
+}
+
+
+class FamilyService:
+    """
+    Service for family dashboard data
+
+    Activities for any number of children are fetched with three ``$in``
+    queries run concurrently. Rendered payloads are cached briefly and tagged
+    with the user ids they depend on so a registration or membership write for
+    one child only drops the entries that include that child.
+    """
+
+    def __init__(self):
+        self.cache = TTLLRUCache(
+            max_size=int(os.environ.get('FAMILY_CACHE_MAX_SIZE', 2000)),
+            ttl_seconds=float(os.environ.get('FAMILY_CACHE_TTL_SECONDS', 30))
+        )
+        self._keys_by_user: Dict[str, Set[Hashable]] = {}
+        print("✅ FamilyService initialized")
+
+    async def load_activities(self, db, user_ids: List[str]) -> Dict[str, Dict[str, List[Dict]]]:
+        """
+        Load registrations and memberships for several users at once
+
+        Returns:
+            Dict of user_id -> {"youth_registrations", "adult_registrations", "memberships"}
+        """
+        activities = {
+            user_id: {"youth_registrations": [], "adult_registrations": [], "memberships": []}
+            for user_id in user_ids
+        }
+        if not user_ids:
+            return activities
+
+        query = {"user_id": {"$in": user_ids}}
+        youth_regs, adult_regs, memberships = await asyncio.gather(
+            db.enhanced_registrations.find(query, REGISTRATION_SUMMARY_PROJECTION).to_list(None),
+            db.adult_registrations.find(query, REGISTRATION_SUMMARY_PROJECTION).to_list(None),
+            db.memberships.find(query, MEMBERSHIP_SUMMARY_PROJECTION).to_list(None)
+        )
+
+        for field, docs in (
+            ("youth_registrations", youth_regs),
+            ("adult_registrations", adult_regs),
+            ("memberships", memberships)
+        ):
+            for doc in docs:
+                activities[doc["user_id"]][field].append(doc)
+
+        return activities
+
+    def get_cached(self, key: Hashable) -> Optional[Any]:
+        """Get a cached payload, or None"""
+        return self.cache.get(key)
+
+    def set_cached(self, key: Hashable, value: Any, user_ids: Iterable[str]):
+        """Cache a payload and record which users' activities it contains"""
+        self.cache.set(key, value)
+        for user_id in user_ids:
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+
+        # Drop tags for entries that have since expired or been evicted
+        if len(self._keys_by_user) > 4 * self.cache.max_size:
+            self._keys_by_user = {
+                user_id: {k for k in keys if k in self.cache}
+                for user_id, keys in self._keys_by_user.items()
+            }
+            self._keys_by_user = {u: keys for u, keys in self._keys_by_user.items() if keys}
+
+    def invalidate_user(self, user_id: Optional[str]):
+        """Drop every cached payload that includes this user's activities"""
+        if user_id is None:
+            return
+        for key in self._keys_by_user.pop(user_id, ()):
+            self.cache.delete(key)
+
+    def invalidate_all(self):
+        """Drop every cached payload (used when the affected user is not known)"""
+        self.cache.clear()
+        self._keys_by_user.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters for monitoring"""
+        return self.cache.stats()
+
+
+# Initialize service
+family_service = FamilyService()
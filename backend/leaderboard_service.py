@@ -0,0 +1,199 @@
+"""
+Leaderboard Service for MNASE Basketball League
+Keeps per-season top-K stat leaders in memory as bounded heaps
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+# Leader board stat name -> player_stats field
+LEADER_STATS = {
+    "points": "points",
+    "assists": "assists",
+    "rebounds": "total_rebounds",
+    "steals": "steals",
+    "blocks": "blocks",
+    "three_pointers_made": "three_pointers_made"
+}
+
+# Board key covering every season
+ALL_SEASONS = None
+
+
+class LeaderboardService:
+    """
+    In-memory stat leader boards
+
+    Every player_stats document is held in memory by season. For each
+    (season, stat) - plus an all-seasons board - a min-heap keeps the top
+    ``size`` (value, player_id) pairs, so the smallest leader is at the root:
+    a new or improved player only needs to beat the root to get in.
+
+    Writes made through create/update/delete_player_stats update the boards
+    incrementally. A player whose value drops while on a board, or who is
+    deleted, can be overtaken by someone outside it, so that one board is
+    rebuilt from the season's players in memory. Reads never touch MongoDB
+    except for the initial load; a background task reloads the boards
+    periodically to pick up writes from other workers.
+    """
+
+    def __init__(self):
+        self.size = int(os.environ.get('LEADERBOARD_SIZE', 25))
+        self.reload_interval = float(os.environ.get('LEADERBOARD_RELOAD_SECONDS', 300))
+        # season -> player_id -> player stats document
+        self._players: Dict[Optional[str], Dict[str, Dict[str, Any]]] = {}
+        self._heaps: Dict[Tuple[Optional[str], str], List[Tuple[float, str]]] = {}
+        self._members: Dict[Tuple[Optional[str], str], set] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.reloads = 0
+        self.rebuilds = 0
+        print("✅ LeaderboardService initialized")
+
+    def _value(self, player: Dict[str, Any], stat: str) -> float:
+        return player.get(LEADER_STATS[stat]) or 0
+
+    def _rebuild(self, key: Optional[str], stat: str):
+        players = self._players.get(key, {})
+        heap = heapq.nlargest(
+            self.size, ((self._value(p, stat), player_id) for player_id, p in players.items())
+        )
+        heapq.heapify(heap)
+        self._heaps[(key, stat)] = heap
+        self._members[(key, stat)] = {player_id for _, player_id in heap}
+        self.rebuilds += 1
+
+    def _offer(self, key: Optional[str], stat: str, player_id: str, value: float, previous: Optional[float]):
+        board = (key, stat)
+        heap = self._heaps.setdefault(board, [])
+        members = self._members.setdefault(board, set())
+        entry = (value, player_id)
+
+        if player_id in members:
+            if previous is not None and value < previous:
+                self._rebuild(key, stat)
+            elif value != previous:
+                heap[heap.index((previous, player_id))] = entry
+                heapq.heapify(heap)
+            return
+
+        if len(heap) < self.size:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            members.discard(heapq.heapreplace(heap, entry)[1])
+        else:
+            return
+        members.add(player_id)
+
+    def _add(self, player: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+        for key in (player.get("season"), ALL_SEASONS):
+            self._players.setdefault(key, {})[player["id"]] = player
+            for stat in LEADER_STATS:
+                self._offer(
+                    key, stat, player["id"], self._value(player, stat),
+                    self._value(previous, stat) if previous else None
+                )
+
+    def _remove(self, player: Dict[str, Any]):
+        for key in (player.get("season"), ALL_SEASONS):
+            self._players.get(key, {}).pop(player["id"], None)
+            for stat in LEADER_STATS:
+                if player["id"] in self._members.get((key, stat), ()):
+                    self._rebuild(key, stat)
+
+    def upsert_player(self, player: Dict[str, Any]):
+        """Add a new player_stats document or apply an updated one to the boards"""
+        if self._loaded_at is None or not player.get("id"):
+            return
+        player = {k: v for k, v in player.items() if k != "_id"}
+        previous = self._players.get(ALL_SEASONS, {}).get(player["id"])
+        if previous is not None and previous.get("season") != player.get("season"):
+            self._remove(previous)
+            previous = None
+        self._add(player, previous)
+
+    def remove_player(self, player_id: str):
+        """Drop a deleted player from every board"""
+        player = self._players.get(ALL_SEASONS, {}).get(player_id)
+        if player is not None:
+            self._remove(player)
+
+    async def load(self, db):
+        """Load every player_stats document and build all boards"""
+        players: Dict[Optional[str], Dict[str, Dict[str, Any]]] = {ALL_SEASONS: {}}
+        async for player in db.player_stats.find({}, {"_id": 0}):
+            if player.get("id"):
+                players.setdefault(player.get("season"), {})[player["id"]] = player
+                players[ALL_SEASONS][player["id"]] = player
+        self._players = players
+        self._heaps = {}
+        self._members = {}
+        for key in players:
+            for stat in LEADER_STATS:
+                self._rebuild(key, stat)
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+
+    async def ensure_loaded(self, db):
+        """Load the boards on first use; later reloads happen in the background"""
+        if self._loaded_at is not None:
+            return
+        async with self._lock:
+            if self._loaded_at is None:
+                await self.load(db)
+
+    async def _reload_loop(self, db):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                async with self._lock:
+                    await self.load(db)
+            except Exception as e:
+                logging.error(f"Failed to reload stat leader boards: {e}")
+
+    def start(self, db):
+        """Start the background reload task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._reload_loop(db))
+
+    async def stop(self):
+        """Stop the background reload task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def leaders(self, stat: str, season: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Top players for one stat, best first (at most the board size)"""
+        heap = self._heaps.get((season, stat), [])
+        players = self._players.get(season, {})
+        return [dict(players[player_id]) for _, player_id in heapq.nlargest(limit, heap)]
+
+    def all_leaders(self, season: Optional[str] = None, limit: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """Top players for every stat"""
+        return {stat: self.leaders(stat, season, limit) for stat in LEADER_STATS}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get board sizes and reload counters for monitoring"""
+        return {
+            "board_size": self.size,
+            "seasons": len([key for key in self._players if key is not ALL_SEASONS]),
+            "players": len(self._players.get(ALL_SEASONS, {})),
+            "boards": len(self._heaps),
+            "loaded": self._loaded_at is not None,
+            "reload_interval_seconds": self.reload_interval,
+            "reloads": self.reloads,
+            "rebuilds": self.rebuilds
+        }
+
+
+# Initialize service
+leaderboard_service = LeaderboardService()
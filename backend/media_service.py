@@ -2,6 +2,7 @@
 Media Management Service - Handle file uploads, storage, and gallery
 """
 import os
+import re
 import uuid
 import shutil
 from datetime import datetime, timezone
@@ -9,6 +10,8 @@ from typing import Optional, List
 from pathlib import Path
 from bson import ObjectId
 
+from pagination_utils import paginate
+
 class MediaService:
     def __init__(self, db):
         self.db = db
@@ -98,18 +101,24 @@ class MediaService:
         media = await self.db.media.find_one({"id": media_id}, {"_id": 0})
         return media
     
-    async def get_media_by_category(self, category: str, skip: int = 0, limit: int = 50):
-        """Get all media in a category"""
+    async def get_media_by_category(self, category: str, skip: int = 0, limit: int = 50,
+                                    cursor: Optional[str] = None):
+        """Get all media in a category (pass the returned next_cursor to page forward)"""
         if category not in self.categories and category != 'all':
             raise ValueError(f"Invalid category")
         
         query = {} if category == 'all' else {"category": category}
-        
-        media_list = await self.db.media.find(query, {"_id": 0})\
-            .sort("uploaded_at", -1)\
-            .skip(skip)\
-            .limit(limit)\
-            .to_list(length=limit)
+        sort_params = [("uploaded_at", -1)]
+        
+        if cursor or not skip:
+            media_list, next_cursor = await paginate(self.db.media, query, sort_params, limit, cursor)
+        else:
+            media_list = await self.db.media.find(query, {"_id": 0})\
+                .sort(sort_params)\
+                .skip(skip)\
+                .limit(limit)\
+                .to_list(length=limit)
+            next_cursor = None
         
         total = await self.db.media.count_documents(query)
         
@@ -117,7 +126,8 @@ class MediaService:
             "media": media_list,
             "total": total,
             "skip": skip,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor
         }
     
     async def update_media(self, media_id: str, title: Optional[str] = None, 
@@ -187,8 +197,8 @@ class MediaService:
         """Search media by title, description, or tags"""
         search_filter = {
             "$or": [
-                {"title": {"$regex": query, "$options": "i"}},
-                {"description": {"$regex": query, "$options": "i"}},
+                {"title": {"$regex": re.escape(query), "$options": "i"}},
+                {"description": {"$regex": re.escape(query), "$options": "i"}},
                 {"tags": {"$in": [query]}}
             ]
         }
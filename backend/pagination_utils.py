@@ -0,0 +1,148 @@
+"""
+Keyset (cursor) pagination helpers for MNASE Basketball League
+Encodes the last row's sort key in an opaque token so every page is an index seek
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+SortParams = List[Tuple[str, int]]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor token is malformed or was issued for a different sort"""
+
+
+def with_tiebreaker(sort_params: SortParams) -> SortParams:
+    """Append ``id`` to a sort so every row has a unique position"""
+    if any(field == "id" for field, _ in sort_params):
+        return list(sort_params)
+    direction = sort_params[-1][1] if sort_params else 1
+    return list(sort_params) + [("id", direction)]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def _signature(sort_params: SortParams) -> str:
+    return ",".join(f"{field}:{direction}" for field, direction in sort_params)
+
+
+def encode_cursor(doc: Dict[str, Any], sort_params: SortParams) -> str:
+    """Build an opaque cursor pointing just after ``doc`` in ``sort_params`` order"""
+    payload = {
+        "s": _signature(sort_params),
+        "v": [_encode_value(doc.get(field)) for field, _ in sort_params]
+    }
+    raw = json.dumps(payload, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, sort_params: SortParams) -> List[Any]:
+    """
+    Decode a cursor into the sort key values of the last row seen
+
+    Raises:
+        InvalidCursorError: If the token is malformed or belongs to another sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = payload["v"]
+        signature = payload["s"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+    if signature != _signature(sort_params) or len(values) != len(sort_params):
+        raise InvalidCursorError("Cursor does not match the requested sort order")
+    return [_decode_value(value) for value in values]
+
+
+def _after(field: str, direction: int, value: Any) -> Optional[Dict[str, Any]]:
+    """
+    Condition for rows strictly after ``value`` on one field
+
+    MongoDB sorts missing/null values first, and range operators never match
+    them, so nulls are handled explicitly.
+    """
+    if value is None:
+        return {field: {"$ne": None}} if direction == 1 else None
+    if direction == 1:
+        return {field: {"$gt": value}}
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def cursor_filter(sort_params: SortParams, values: List[Any]) -> Dict[str, Any]:
+    """
+    Build the keyset condition selecting rows after the cursor position
+
+    For sort (a, b, id) this is: a after A, or a == A and b after B, or
+    a == A and b == B and id after ID.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort_params):
+        after = _after(field, direction, values[i])
+        if after is None:
+            continue
+        equal = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort_params[:i])}
+        if "$or" in after and equal:
+            clauses.append({"$and": [equal, after]})
+        else:
+            clauses.append({**equal, **after})
+    if not clauses:
+        # Nothing sorts after the cursor
+        return {"id": {"$in": []}}
+    return {"$or": clauses}
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort_params: SortParams,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Fetch one page with keyset pagination
+
+    Args:
+        collection: Motor collection
+        query: Filter for the whole result set
+        sort_params: Sort from SearchService.parse_sort_param (id is appended)
+        limit: Page size (at least 1)
+        cursor: Token from the previous page's next_cursor
+
+    Returns:
+        (rows, next_cursor); next_cursor is None on the last page
+
+    Raises:
+        InvalidCursorError: If the cursor cannot be used with this sort
+    """
+    # A page always holds at least one row; Mongo would read limit(0) as "no limit"
+    limit = max(1, limit)
+    sort_params = with_tiebreaker(sort_params)
+    if cursor:
+        after = cursor_filter(sort_params, decode_cursor(cursor, sort_params))
+        query = {"$and": [query, after]} if query else after
+
+    rows = await collection.find(query, projection or {"_id": 0})\
+        .sort(sort_params)\
+        .limit(limit + 1)\
+        .to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1], sort_params)
+    return rows, next_cursor
@@ -0,0 +1,131 @@
+"""
+Password Service for MNASE Basketball League
+Runs bcrypt hashing and verification off the event loop in a bounded worker pool
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordQueueFullError(Exception):
+    """Raised when too many password operations are already waiting"""
+    pass
+
+
+class PasswordService:
+    """
+    Service for CPU-bound password work
+
+    At most ``max_workers`` hashes run at once and at most ``max_queue`` more
+    may wait for a worker. Anything beyond that is rejected immediately with
+    PasswordQueueFullError so a login burst cannot stall the event loop or
+    grow an unbounded backlog.
+    """
+
+    def __init__(self):
+        self.max_workers = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+        self.max_queue = int(os.environ.get('PASSWORD_HASH_MAX_QUEUE', 64))
+        self.executor_type = os.environ.get('PASSWORD_HASH_EXECUTOR', 'process')  # process, thread
+        self._executor = None
+        self._semaphore = None
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+        print("✅ PasswordService initialized")
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor_type == 'thread':
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password"
+                )
+            else:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.in_flight + self.waiting >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordQueueFullError("Password worker queue is full")
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        started_at = time.perf_counter()
+        self.total_wait_seconds += started_at - queued_at
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool for the next request
+            self._executor = None
+            raise
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_run_seconds += time.perf_counter() - started_at
+            self._semaphore.release()
+
+    async def hash_password(self, password: str) -> str:
+        """Hash a password with bcrypt in the worker pool"""
+        return await self._run(_hash_password, password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against a bcrypt hash in the worker pool"""
+        return await self._run(_verify_password, plain_password, hashed_password)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and latency counters for monitoring"""
+        return {
+            "executor": self.executor_type,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "peak_queue_depth": self.peak_waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            "avg_run_ms": round(self.total_run_seconds / self.completed * 1000, 2) if self.completed else 0.0
+        }
+
+    def shutdown(self):
+        """Stop the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Initialize service
+password_service = PasswordService()
@@ -0,0 +1,113 @@
+"""
+Permission Service for MNASE Basketball League
+Compiles permission lists into integer bitmasks so checks are bitwise operations
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache_utils import TTLLRUCache
+
+
+class PermissionRegistry:
+    """
+    Registry mapping each known permission to a single bit
+
+    Bits are assigned in catalogue declaration order, so every process built
+    from the same catalogue agrees on them (masks can be stored or embedded
+    in tokens). Permission strings outside the catalogue - e.g. from custom
+    roles - cannot be represented as bits and are returned separately as
+    extras so callers can fall back to a membership test.
+    """
+
+    def __init__(self, permissions: Dict[str, List[str]]):
+        self.bits: Dict[str, int] = {}
+        for perms in permissions.values():
+            for perm in perms:
+                if perm not in self.bits:
+                    self.bits[perm] = 1 << len(self.bits)
+        self.all_mask = (1 << len(self.bits)) - 1
+
+        # Compiled permission lists, keyed by the tuple of permission strings.
+        # Users assigned the same role share the same list, so this stays small.
+        self._compiled = TTLLRUCache(max_size=2048, ttl_seconds=3600)
+        # Role name -> compiled mask, cleared whenever /admin/roles changes
+        self._role_masks: Dict[str, int] = {}
+        self.role_mask_hits = 0
+        self.role_mask_misses = 0
+        print("✅ PermissionRegistry initialized")
+
+    def split(self, permissions: Iterable[str]) -> Tuple[int, Tuple[str, ...]]:
+        """
+        Compile permissions into (mask, extras)
+
+        Returns:
+            The bitmask of catalogue permissions and a tuple of any permission
+            strings that have no bit
+        """
+        key = tuple(permissions)
+        compiled = self._compiled.get(key)
+        if compiled is not None:
+            return compiled
+
+        mask = 0
+        extras = []
+        for perm in key:
+            bit = self.bits.get(perm)
+            if bit is None:
+                extras.append(perm)
+            else:
+                mask |= bit
+        compiled = (mask, tuple(extras))
+        self._compiled.set(key, compiled)
+        return compiled
+
+    def compile(self, permissions: Iterable[str]) -> int:
+        """Compile permissions into a bitmask, ignoring unknown permissions"""
+        return self.split(permissions)[0]
+
+    def decompile(self, mask: int) -> List[str]:
+        """Expand a bitmask back into permission names"""
+        return [perm for perm, bit in self.bits.items() if mask & bit]
+
+    def has_all(self, mask: int, required_mask: int) -> bool:
+        """Check that every bit in required_mask is set in mask"""
+        return mask & required_mask == required_mask
+
+    def has_any(self, mask: int, required_mask: int) -> bool:
+        """Check that at least one bit in required_mask is set in mask"""
+        return mask & required_mask != 0
+
+    async def get_role_mask(self, db, role_name: str) -> Optional[int]:
+        """
+        Get the compiled permission mask for a role
+
+        Returns:
+            The role's mask, or None if the role does not exist
+        """
+        mask = self._role_masks.get(role_name)
+        if mask is not None:
+            self.role_mask_hits += 1
+            return mask
+
+        self.role_mask_misses += 1
+        role = await db.roles.find_one({"name": role_name}, {"_id": 0, "permissions": 1})
+        if not role:
+            return None
+
+        mask = self.compile(role.get('permissions', []))
+        self._role_masks[role_name] = mask
+        return mask
+
+    def invalidate_roles(self):
+        """Drop compiled role masks after a role is created, updated or deleted"""
+        self._role_masks.clear()
+
+    def get_stats(self) -> Dict:
+        """Get registry size and cache counters"""
+        return {
+            "permission_count": len(self.bits),
+            "cached_role_masks": len(self._role_masks),
+            "role_mask_hits": self.role_mask_hits,
+            "role_mask_misses": self.role_mask_misses,
+            "compiled_lists": self._compiled.stats()
+        }
@@ -0,0 +1,277 @@
+"""
+Recurrence Service for MNASE Basketball League
+Stores recurring events once as a rule and expands occurrences on read
+"""
+
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from cache_utils import TTLLRUCache
+
+WEEKDAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+WEEKDAY_CODES = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+
+# How far open-ended series are expanded (listings and conflict checks) when no window is given
+DEFAULT_HORIZON_DAYS = 366
+
+# Series fields that are not copied onto expanded occurrences
+SERIES_META_FIELDS = {"rule", "rrule", "exdates", "collection", "updated_at"}
+
+
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _ceil_div(a: int, b: int) -> int:
+    return -(-a // b)
+
+
+class RecurrenceService:
+    """
+    Service for RRULE-style event series
+
+    A series document lives in the ``event_series`` collection and holds the
+    base event fields, a ``rule`` (freq, interval, byday, dtstart, until), the
+    equivalent iCal ``rrule`` string and a list of ``exdates``. Occurrences
+    are computed only for the requested window; expanded windows are kept in
+    an LRU cache keyed by the series' ``updated_at`` so edits never serve
+    stale expansions.
+    """
+
+    def __init__(self):
+        self.cache = TTLLRUCache(
+            max_size=int(os.environ.get('RECURRENCE_CACHE_MAX_SIZE', 1024)),
+            ttl_seconds=float(os.environ.get('RECURRENCE_CACHE_TTL_SECONDS', 600))
+        )
+        print("✅ RecurrenceService initialized")
+
+    def build_rule(
+        self,
+        pattern: str,
+        start_date: str,
+        end_date: Optional[str] = None,
+        recurrence_days: Optional[List[str]] = None,
+        interval: int = 1
+    ) -> Dict[str, Any]:
+        """
+        Build a recurrence rule
+
+        Args:
+            pattern: daily, weekly, monthly
+            start_date: First possible occurrence (YYYY-MM-DD)
+            end_date: Last possible occurrence (YYYY-MM-DD), or None for open-ended
+            recurrence_days: For weekly - day names; defaults to the start date's weekday
+            interval: Repeat every N days/weeks/months
+        """
+        if pattern not in ("daily", "weekly", "monthly"):
+            raise ValueError("Recurrence pattern must be daily, weekly or monthly")
+        dtstart = parse_date(start_date)
+        if end_date and parse_date(end_date) < dtstart:
+            raise ValueError("Recurrence end date must be on or after the start date")
+
+        rule = {
+            "freq": pattern,
+            "interval": max(1, int(interval)),
+            "dtstart": start_date,
+            "until": end_date
+        }
+        if pattern == "weekly":
+            days = [d.lower() for d in (recurrence_days or [])]
+            invalid = [d for d in days if d not in WEEKDAY_NAMES]
+            if invalid:
+                raise ValueError(f"Invalid recurrence days: {', '.join(invalid)}")
+            weekdays = sorted({WEEKDAY_NAMES.index(d) for d in days}) or [dtstart.weekday()]
+            rule["byday"] = [WEEKDAY_CODES[d] for d in weekdays]
+        return rule
+
+    def rule_to_rrule(self, rule: Dict[str, Any]) -> str:
+        """Render a rule as an iCal RRULE value"""
+        parts = [f"FREQ={rule['freq'].upper()}"]
+        if rule.get("interval", 1) > 1:
+            parts.append(f"INTERVAL={rule['interval']}")
+        if rule.get("byday"):
+            parts.append(f"BYDAY={','.join(rule['byday'])}")
+        if rule["freq"] == "monthly":
+            parts.append(f"BYMONTHDAY={parse_date(rule['dtstart']).day}")
+        if rule.get("until"):
+            parts.append(f"UNTIL={rule['until'].replace('-', '')}T235959")
+        return ";".join(parts)
+
+    def occurrence_dates(self, rule: Dict[str, Any], window_start: date, window_end: date) -> List[date]:
+        """
+        Compute occurrence dates of a rule within [window_start, window_end]
+
+        Dates are computed directly from the rule (no day-by-day walk), so the
+        cost is proportional to the number of occurrences in the window.
+        Monthly rules skip months that do not have the start date's day.
+        """
+        dtstart = parse_date(rule["dtstart"])
+        lo = max(dtstart, window_start)
+        hi = window_end
+        if rule.get("until"):
+            hi = min(hi, parse_date(rule["until"]))
+        if lo > hi:
+            return []
+
+        interval = rule.get("interval", 1)
+        freq = rule["freq"]
+
+        if freq == "daily":
+            first = dtstart + timedelta(days=_ceil_div((lo - dtstart).days, interval) * interval)
+            count = (hi - first).days // interval + 1 if first <= hi else 0
+            return [first + timedelta(days=i * interval) for i in range(count)]
+
+        if freq == "weekly":
+            week_start = dtstart - timedelta(days=dtstart.weekday())
+            step = 7 * interval
+            dates = []
+            for code in rule.get("byday") or [WEEKDAY_CODES[dtstart.weekday()]]:
+                weekday = WEEKDAY_CODES.index(code)
+                k = max(0, _ceil_div((lo - week_start).days - weekday, step))
+                current = week_start + timedelta(days=k * step + weekday)
+                while current <= hi:
+                    if current >= lo:
+                        dates.append(current)
+                    current += timedelta(days=step)
+            return sorted(dates)
+
+        if freq == "monthly":
+            day = dtstart.day
+            start_index = dtstart.year * 12 + dtstart.month - 1
+            lo_index = lo.year * 12 + lo.month - 1
+            index = start_index + _ceil_div(lo_index - start_index, interval) * interval
+            dates = []
+            while True:
+                year, month = divmod(index, 12)
+                if date(year, month + 1, 1) > hi:
+                    break
+                try:
+                    current = date(year, month + 1, day)
+                except ValueError:
+                    current = None
+                if current is not None and lo <= current <= hi:
+                    dates.append(current)
+                index += interval
+            return dates
+
+        return []
+
+    def expand(
+        self,
+        series: Dict[str, Any],
+        window_start: Optional[str] = None,
+        window_end: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Expand a series into occurrence documents within a window
+
+        Args:
+            series: Series document
+            window_start: First date (YYYY-MM-DD), defaults to the series start
+            window_end: Last date (YYYY-MM-DD), defaults to the rule's ``until``;
+                open-ended rules stop DEFAULT_HORIZON_DAYS after today or
+                after the series start, whichever is later
+
+        Returns:
+            Occurrence dicts shaped like materialized event instances
+        """
+        rule = series["rule"]
+        lo = parse_date(window_start) if window_start else parse_date(rule["dtstart"])
+        if window_end:
+            hi = parse_date(window_end)
+        elif rule.get("until"):
+            hi = parse_date(rule["until"])
+        else:
+            hi = max(datetime.now().date(), parse_date(rule["dtstart"])) + timedelta(days=DEFAULT_HORIZON_DAYS)
+
+        key = (series["id"], series.get("updated_at"), lo, hi)
+        occurrences = self.cache.get(key)
+        if occurrences is None:
+            exdates = set(series.get("exdates") or [])
+            base = {k: v for k, v in series.items() if k not in SERIES_META_FIELDS}
+            if series.get("collection") == "calendar_events":
+                # Calendar events require a type; older series only stored the category
+                base.setdefault("type", base.get("category") or "event")
+            occurrences = []
+            for occurrence_date in self.occurrence_dates(rule, lo, hi):
+                date_str = occurrence_date.strftime("%Y-%m-%d")
+                if date_str in exdates:
+                    continue
+                occurrence = dict(base)
+                occurrence.update({
+                    "id": f"{series['id']}_{occurrence_date.strftime('%Y%m%d')}",
+                    "date": date_str,
+                    "parent_event_id": series["id"],
+                    "series_id": series["id"],
+                    "event_type": "recurring"
+                })
+                occurrences.append(occurrence)
+            self.cache.set(key, occurrences)
+
+        return [dict(occurrence) for occurrence in occurrences]
+
+    def build_series(
+        self,
+        base_event: Dict[str, Any],
+        rule: Dict[str, Any],
+        collection: str = "events"
+    ) -> Dict[str, Any]:
+        """Build a series document from base event fields and a rule"""
+        now = datetime.now(timezone.utc).isoformat()
+        series = {k: v for k, v in base_event.items() if k not in ("_id", "date")}
+        series.update({
+            "rule": rule,
+            "rrule": self.rule_to_rrule(rule),
+            "exdates": [],
+            "collection": collection,
+            "created_at": base_event.get("created_at") or now,
+            "updated_at": now
+        })
+        return series
+
+    def series_window_filter(
+        self,
+        collection: str = "events",
+        window_start: Optional[str] = None,
+        window_end: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build a MongoDB filter for series that may have occurrences in a window"""
+        query: Dict[str, Any] = {"collection": collection}
+        if window_end:
+            query["rule.dtstart"] = {"$lte": window_end}
+        if window_start:
+            query["$or"] = [{"rule.until": None}, {"rule.until": {"$gte": window_start}}]
+        return query
+
+    async def load_occurrences(
+        self,
+        db,
+        base_query: Optional[Dict[str, Any]] = None,
+        window_start: Optional[str] = None,
+        window_end: Optional[str] = None,
+        collection: str = "events"
+    ) -> List[Dict[str, Any]]:
+        """
+        Load matching series and expand them for a window
+
+        Args:
+            base_query: Filter on series base fields (category, tags, location, ...)
+        """
+        query = self.series_window_filter(collection, window_start, window_end)
+        if base_query:
+            query = {"$and": [query, base_query]}
+
+        occurrences = []
+        async for series in db.event_series.find(query, {"_id": 0}):
+            occurrences.extend(self.expand(series, window_start, window_end))
+        return occurrences
+
+    async def ensure_indexes(self, db):
+        """Create indexes used to find series by location and window"""
+        await db.event_series.create_index([("collection", 1), ("location", 1), ("rule.dtstart", 1)])
+        await db.event_series.create_index([("id", 1)], unique=True)
+
+
+# Initialize service
+recurrence_service = RecurrenceService()
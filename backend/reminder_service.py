@@ -0,0 +1,293 @@
+"""
+Reminder Scheduler for MNASE Basketball League
+Sends event reminders in the background from a time-ordered queue
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from activity_log_service import activity_log_service
+from calendar_service import calendar_service
+from email_queue_service import EmailQueueService
+from notification_service import notification_service
+
+REMINDER_PROJECTION = {"_id": 0, "id": 1, "title": 1, "date": 1, "time": 1, "location": 1}
+
+
+def event_start(event: Dict) -> Optional[datetime]:
+    """Parse an event's local start time, or None if the date/time is invalid"""
+    try:
+        return datetime.strptime(f"{event['date']} {event['time']}", "%Y-%m-%d %H:%M")
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class ReminderScheduler:
+    """
+    In-process scheduler for event reminders
+
+    Keeps a min-heap of (fire_at, event_id) for events starting within the
+    next ``hours_before`` hours plus a lookahead, loaded with an indexed query
+    on date/time/reminder_sent and reloaded periodically. Event writes push
+    entries directly so new events do not wait for a reload. Heap entries are
+    invalidated lazily: an entry only fires if it still matches the event's
+    current date and time.
+
+    Due events are claimed with one ``bulk_write`` that sets ``reminder_sent``
+    only where it is still unset and the date/time are unchanged, so several
+    workers can run the scheduler without sending duplicates. Notifications,
+    emails and the activity log entry are then written in batches.
+    """
+
+    def __init__(self):
+        self.hours_before = int(os.environ.get('REMINDER_HOURS_BEFORE', 24))
+        self.reload_interval = float(os.environ.get('REMINDER_RELOAD_SECONDS', 300))
+        self.batch_size = int(os.environ.get('REMINDER_BATCH_SIZE', 500))
+        self.enabled = os.environ.get('REMINDER_SCHEDULER_ENABLED', 'true').lower() == 'true'
+        self.send_emails = os.environ.get('REMINDER_SEND_EMAILS', 'true').lower() == 'true'
+
+        self._heap: List[Tuple[datetime, str]] = []
+        # event_id -> (date, time, event) for the entry currently scheduled
+        self._pending: Dict[str, Tuple[str, str, Dict]] = {}
+        self._horizon: Optional[datetime] = None
+        self._next_reload: Optional[datetime] = None
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        self.reloads = 0
+        self.reminders_sent = 0
+        self.notifications_created = 0
+        self.emails_queued = 0
+        print("✅ ReminderScheduler initialized")
+
+    def _fire_at(self, start: datetime) -> datetime:
+        return start - timedelta(hours=self.hours_before)
+
+    def _push(self, event: Dict):
+        start = event_start(event)
+        if start is None or start < datetime.now():
+            return
+        self._pending[event['id']] = (event['date'], event['time'], event)
+        heapq.heappush(self._heap, (self._fire_at(start), event['id']))
+
+    def schedule(self, event: Dict):
+        """
+        Schedule (or reschedule) a reminder after an event is created or edited
+
+        Events beyond the loaded horizon are picked up by a later reload.
+        """
+        if event.get('reminder_sent'):
+            self.cancel(event.get('id'))
+            return
+        start = event_start(event)
+        if start is None or self._horizon is None or start > self._horizon:
+            self.cancel(event.get('id'))
+            return
+        self._push({k: event.get(k) for k in REMINDER_PROJECTION if k != "_id"})
+        self._wakeup.set()
+
+    def cancel(self, event_id: Optional[str]):
+        """Drop a scheduled reminder (the heap entry is skipped when popped)"""
+        if event_id is not None:
+            self._pending.pop(event_id, None)
+
+    async def reload(self, db):
+        """Rebuild the heap from events starting before the next reload horizon"""
+        now = datetime.now()
+        horizon = now + timedelta(hours=self.hours_before, seconds=2 * self.reload_interval)
+        query = calendar_service.build_event_filter(
+            start_date=now.strftime("%Y-%m-%d"),
+            end_date=horizon.strftime("%Y-%m-%d")
+        )
+        query["reminder_sent"] = {"$ne": True}
+
+        self._heap = []
+        self._pending = {}
+        async for event in db.events.find(query, REMINDER_PROJECTION):
+            start = event_start(event)
+            if start is not None and start <= horizon:
+                self._push(event)
+
+        self._horizon = horizon
+        self._next_reload = now + timedelta(seconds=self.reload_interval)
+        self.reloads += 1
+
+    def _pop_due(self, now: datetime) -> List[Dict]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            _, event_id = heapq.heappop(self._heap)
+            entry = self._pending.get(event_id)
+            if entry is None:
+                continue
+            event = entry[2]
+            start = event_start(event)
+            # Stale heap entry from before a reschedule
+            if start is None or self._fire_at(start) > now:
+                continue
+            del self._pending[event_id]
+            if start >= now:
+                due.append(event)
+        return due
+
+    async def _deliver(self, db, events: List[Dict], trigger: str, actor: Optional[Dict] = None) -> int:
+        """Claim due events, then write notifications, emails and one log entry"""
+        if not events:
+            return 0
+
+        claim = str(uuid.uuid4())
+        sent_at = datetime.now(timezone.utc).isoformat()
+        await db.events.bulk_write([
+            UpdateOne(
+                {"id": event['id'], "date": event['date'], "time": event['time'], "reminder_sent": {"$ne": True}},
+                {"$set": {"reminder_sent": True, "reminder_sent_at": sent_at, "reminder_claim": claim}}
+            )
+            for event in events
+        ], ordered=False)
+        claimed = await db.events.find(
+            {"id": {"$in": [event['id'] for event in events]}, "reminder_claim": claim},
+            REMINDER_PROJECTION
+        ).to_list(length=None)
+        if not claimed:
+            return 0
+
+        events_by_id = {event['id']: event for event in claimed}
+        registrations = await db.registrations.find(
+            {"event_id": {"$in": list(events_by_id)}, "payment_status": "completed"},
+            {"_id": 0, "user_id": 1, "event_id": 1}
+        ).to_list(length=None)
+        recipients = {(reg['user_id'], reg['event_id']) for reg in registrations}
+
+        notifications = [
+            notification_service.create_event_reminder_notification(
+                user_id=user_id,
+                event_name=events_by_id[event_id]['title'],
+                event_date=events_by_id[event_id]['date'],
+                event_time=events_by_id[event_id]['time']
+            )
+            for user_id, event_id in recipients
+        ]
+        for i in range(0, len(notifications), self.batch_size):
+            await db.notifications.insert_many(notifications[i:i + self.batch_size], ordered=False)
+        self.notifications_created += len(notifications)
+
+        if self.send_emails and recipients:
+            users = await db.users.find(
+                {"id": {"$in": list({user_id for user_id, _ in recipients})}},
+                {"_id": 0, "id": 1, "email": 1, "name": 1}
+            ).to_list(length=None)
+            users_by_id = {user['id']: user for user in users}
+            emails = []
+            for user_id, event_id in recipients:
+                user = users_by_id.get(user_id)
+                if not user or not user.get('email'):
+                    continue
+                event = events_by_id[event_id]
+                emails.append({
+                    "to_email": user['email'],
+                    "subject": f"Reminder: {event['title']}",
+                    "body": (
+                        f"Hi {user.get('name', '')},\n\n"
+                        f"This is a reminder that {event['title']} is scheduled for "
+                        f"{event['date']} at {event['time']}"
+                        + (f" at {event['location']}" if event.get('location') else "")
+                        + ".\n\nMNASE Basketball League"
+                    )
+                })
+            result = await EmailQueueService(db).queue_emails(emails)
+            self.emails_queued += result["queued"]
+
+        self.reminders_sent += len(claimed)
+        await activity_log_service.log_activity(
+            action="send_event_reminders",
+            resource_type="event",
+            user_id=(actor or {}).get("id"),
+            user_email=(actor or {}).get("email"),
+            details={
+                "trigger": trigger,
+                "event_ids": list(events_by_id),
+                "count": len(claimed),
+                "notifications": len(notifications)
+            }
+        )
+        return len(claimed)
+
+    async def run_due(self, db, trigger: str = "scheduler", actor: Optional[Dict] = None) -> int:
+        """Send every reminder that is due now; returns the number of events reminded"""
+        async with self._lock:
+            if self._next_reload is None or datetime.now() >= self._next_reload:
+                await self.reload(db)
+            sent = 0
+            while True:
+                due = self._pop_due(datetime.now())
+                if not due:
+                    break
+                sent += await self._deliver(db, due, trigger, actor)
+            return sent
+
+    async def send_now(self, db, actor: Optional[Dict] = None) -> int:
+        """Reload from the database and send every due reminder immediately"""
+        async with self._lock:
+            self._next_reload = None
+        return await self.run_due(db, "manual", actor)
+
+    async def _run_loop(self, db):
+        while True:
+            try:
+                await self.run_due(db)
+            except Exception as e:
+                logging.error(f"Reminder scheduler error: {e}")
+
+            now = datetime.now()
+            wait = self.reload_interval
+            if self._next_reload is not None:
+                wait = min(wait, (self._next_reload - now).total_seconds())
+            if self._heap:
+                wait = min(wait, (self._heap[0][0] - now).total_seconds())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait, 0.5))
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, db):
+        """Start the background scheduler task"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run_loop(db))
+
+    async def stop(self):
+        """Stop the background scheduler task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler counters for monitoring"""
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "hours_before": self.hours_before,
+            "scheduled": len(self._pending),
+            "heap_size": len(self._heap),
+            "next_fire_at": self._heap[0][0].isoformat() if self._heap else None,
+            "horizon": self._horizon.isoformat() if self._horizon else None,
+            "reloads": self.reloads,
+            "reminders_sent": self.reminders_sent,
+            "notifications_created": self.notifications_created,
+            "emails_queued": self.emails_queued
+        }
+
+
+# Initialize service
+reminder_scheduler = ReminderScheduler()
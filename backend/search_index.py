@@ -0,0 +1,460 @@
+"""
+Inverted Index for MNASE Basketball League search
+Tokenized in-memory index with BM25 ranking and incremental updates, a
+sorted prefix array for typeahead suggestions and a trigram index for
+typo-tolerant lookups
+"""
+
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from cache_utils import TTLLRUCache
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words too common to help ranking; dropped from documents and queries
+STOP_WORDS = frozenset({
+    "a", "an", "and", "at", "by", "for", "in", "of", "on", "or", "the", "to", "with"
+})
+
+# Standard BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalize_text(text: Any) -> str:
+    """Lower-case text and strip accents so "Café" and "cafe" match"""
+    if text is None:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text))
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: Any) -> List[str]:
+    """Split text into normalized tokens, dropping stop words"""
+    return [token for token in TOKEN_PATTERN.findall(normalize_text(text)) if token not in STOP_WORDS]
+
+
+class InvertedIndex:
+    """
+    Inverted index over one content type
+
+    Each document is tokenized per field; a token's term frequency is the sum
+    of its occurrences weighted by field (so a match in a title counts more
+    than one in a description) and document length is weighted the same way.
+    Postings map token -> {doc_id: weighted tf}. A sorted vocabulary allows
+    the last query word to match as a prefix for search-as-you-type.
+
+    Documents are stored alongside the postings so ranked results can be
+    returned without another database round trip.
+    """
+
+    def __init__(self, fields: Dict[str, float]):
+        self.fields = fields
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.doc_terms: Dict[str, Dict[str, float]] = {}
+        self.doc_lengths: Dict[str, float] = {}
+        self.total_length = 0.0
+        self._vocabulary: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def _analyze(self, doc: Dict[str, Any]) -> Tuple[Dict[str, float], float]:
+        terms: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in self.fields.items():
+            value = doc.get(field)
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(v) for v in value)
+            for token in tokenize(value):
+                terms[token] = terms.get(token, 0.0) + weight
+                length += weight
+        return terms, length
+
+    def add(self, doc: Dict[str, Any]):
+        """Index a document, replacing any previous version with the same id"""
+        doc_id = doc.get("id")
+        if not doc_id:
+            return
+        self.remove(doc_id)
+
+        terms, length = self._analyze(doc)
+        for token, tf in terms.items():
+            postings = self.postings.get(token)
+            if postings is None:
+                self.postings[token] = postings = {}
+                self._vocabulary = None
+            postings[doc_id] = tf
+        self.docs[doc_id] = {k: v for k, v in doc.items() if k != "_id"}
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = length
+        self.total_length += length
+
+    def remove(self, doc_id: str):
+        """Remove a document from the index if present"""
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for token in terms:
+            postings = self.postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[token]
+                self._vocabulary = None
+        self.total_length -= self.doc_lengths.pop(doc_id, 0.0)
+        self.docs.pop(doc_id, None)
+
+    def vocabulary(self) -> List[str]:
+        """Sorted list of indexed tokens (rebuilt lazily after the vocabulary changes)"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        return self._vocabulary
+
+    def expand_prefix(self, prefix: str, max_terms: int = 50) -> List[str]:
+        """Indexed tokens starting with prefix, in lexical order"""
+        vocabulary = self.vocabulary()
+        i = bisect_left(vocabulary, prefix)
+        terms = []
+        while i < len(vocabulary) and vocabulary[i].startswith(prefix) and len(terms) < max_terms:
+            terms.append(vocabulary[i])
+            i += 1
+        return terms
+
+    def _idf(self, token: str) -> float:
+        df = len(self.postings.get(token, ()))
+        n = len(self.docs)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def score(self, query: str, prefix_last: bool = True) -> Dict[str, float]:
+        """
+        Score documents matching every query word with BM25
+
+        Args:
+            query: Free-text query
+            prefix_last: Let the last query word match as a prefix
+
+        Returns:
+            Dict of doc_id -> score; empty if any word matches nothing
+        """
+        tokens = tokenize(query)
+        if not tokens or not self.docs:
+            return {}
+
+        # Each query word becomes a group of alternative index terms
+        groups: List[List[str]] = [[token] for token in dict.fromkeys(tokens[:-1])]
+        last = tokens[-1]
+        if prefix_last:
+            groups.append(self.expand_prefix(last) or [last])
+        else:
+            groups.append([last])
+
+        avg_length = self.total_length / len(self.docs) or 1.0
+        candidates: Optional[Set[str]] = None
+        group_scores: List[Dict[str, float]] = []
+        for group in groups:
+            scores: Dict[str, float] = {}
+            for token in group:
+                postings = self.postings.get(token)
+                if not postings:
+                    continue
+                idf = self._idf(token)
+                for doc_id, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avg_length)
+                    score = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    # A prefix group contributes its best-matching term
+                    if score > scores.get(doc_id, 0.0):
+                        scores[doc_id] = score
+            if not scores:
+                return {}
+            candidates = set(scores) if candidates is None else candidates & scores.keys()
+            if not candidates:
+                return {}
+            group_scores.append(scores)
+
+        return {doc_id: sum(scores[doc_id] for scores in group_scores) for doc_id in candidates}
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Ranked (score, document) pairs, best first"""
+        scores = self.score(query)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(score, self.docs[doc_id]) for doc_id, score in ranked]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size counters"""
+        return {
+            "documents": len(self.docs),
+            "terms": len(self.postings),
+            "postings": sum(len(p) for p in self.postings.values())
+        }
+
+
+def phrase_key(text: Any) -> str:
+    """Normalize text to space-separated words for prefix matching (stop words kept)"""
+    return " ".join(TOKEN_PATTERN.findall(normalize_text(text)))
+
+
+class PrefixIndex:
+    """
+    Sorted prefix array for typeahead suggestions
+
+    Each distinct (type, text) pair is one suggestion. It is stored under its
+    full phrase and under the phrase starting at each later word, so "camp"
+    completes "Summer Basketball Camp". Lookups are a binary search plus a
+    bounded scan of the matching range. Documents sharing the same text
+    (e.g. instances of a recurring event) collapse into one suggestion whose
+    count boosts its rank. Answers are cached per prefix until the next
+    change, since typeahead traffic repeats the same short prefixes.
+    """
+
+    def __init__(self, max_scan: int = 2000):
+        self.max_scan = max_scan
+        self.version = 0
+        self._cache = TTLLRUCache(max_size=4096, ttl_seconds=600)
+        self._keys: List[Tuple[str, str]] = []
+        # entry key -> {"text", "type", "phrase", "ids"}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # document key -> ((type, text) pairs, entry keys they map to)
+        self._doc_entries: Dict[Tuple[str, str], Tuple[Tuple, List[str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add_entry(self, doc_id: str, suggestion_type: str, text: str) -> Optional[str]:
+        phrase = phrase_key(text)
+        if not phrase:
+            return None
+        entry_key = f"{suggestion_type}\x00{phrase}"
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            entry = self._entries[entry_key] = {
+                "text": str(text).strip(),
+                "type": suggestion_type,
+                "phrase": phrase,
+                "ids": set()
+            }
+            words = phrase.split(" ")
+            for i in range(len(words)):
+                insort(self._keys, (" ".join(words[i:]), entry_key))
+        entry["ids"].add(doc_id)
+        self.version += 1
+        return entry_key
+
+    def _remove_entry(self, doc_id: str, entry_key: str):
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return
+        entry["ids"].discard(doc_id)
+        self.version += 1
+        if entry["ids"]:
+            return
+        del self._entries[entry_key]
+        words = entry["phrase"].split(" ")
+        for i in range(len(words)):
+            key = (" ".join(words[i:]), entry_key)
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def set_document(self, source: str, doc_id: str, suggestions: List[Tuple[str, Any]]):
+        """
+        Replace the suggestions contributed by one document
+
+        Args:
+            suggestions: (type, text) pairs; empty texts are skipped
+        """
+        suggestions = tuple((t, text) for t, text in suggestions if text)
+        current = self._doc_entries.get((source, doc_id))
+        if current is not None and current[0] == suggestions:
+            return
+        self.remove_document(source, doc_id)
+        entry_keys = []
+        for suggestion_type, text in suggestions:
+            entry_key = self._add_entry(doc_id, suggestion_type, text)
+            if entry_key:
+                entry_keys.append(entry_key)
+        if entry_keys:
+            self._doc_entries[(source, doc_id)] = (suggestions, entry_keys)
+
+    def remove_document(self, source: str, doc_id: str):
+        """Drop every suggestion contributed by one document"""
+        current = self._doc_entries.pop((source, doc_id), None)
+        for entry_key in (current[1] if current else ()):
+            self._remove_entry(doc_id, entry_key)
+
+    def document_ids(self, source: str) -> List[str]:
+        """Ids of the documents from one source that contribute suggestions"""
+        return [doc_id for doc_source, doc_id in self._doc_entries if doc_source == source]
+
+    def suggest(self, prefix: str, limit: int = 10, types: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Ranked completions for a prefix
+
+        Suggestions whose text starts with the prefix rank above those where
+        a later word does, then by how many documents share the text, then
+        shorter texts first.
+        """
+        query = phrase_key(prefix)
+        if not query:
+            return []
+        cache_key = (self.version, query, limit, frozenset(types) if types else None)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return [dict(result) for result in cached]
+
+        best: Dict[str, bool] = {}
+        position = bisect_left(self._keys, (query,))
+        end = min(len(self._keys), position + self.max_scan)
+        while position < end:
+            key, entry_key = self._keys[position]
+            if not key.startswith(query):
+                break
+            position += 1
+            entry = self._entries[entry_key]
+            if types and entry["type"] not in types:
+                continue
+            best[entry_key] = best.get(entry_key, False) or key == entry["phrase"] or entry["phrase"].startswith(query)
+
+        def rank(entry_key: str):
+            entry = self._entries[entry_key]
+            return (not best[entry_key], -len(entry["ids"]), len(entry["phrase"]), entry["phrase"])
+
+        results = []
+        for entry_key in heapq.nsmallest(limit, best, key=rank):
+            entry = self._entries[entry_key]
+            results.append({
+                "text": entry["text"],
+                "type": entry["type"],
+                "id": min(entry["ids"]),
+                "count": len(entry["ids"])
+            })
+        self._cache.set(cache_key, results)
+        return [dict(result) for result in results]
+
+
+def trigrams(text: Any) -> Set[str]:
+    """
+    Character trigrams of each normalized word, padded like pg_trgm
+
+    Words get two leading spaces and one trailing space, so "smith" yields
+    "  s", " sm", "smi", "mit", "ith", "th ". Short words still produce
+    trigrams and word starts count for more.
+    """
+    grams: Set[str] = set()
+    for word in TOKEN_PATTERN.findall(normalize_text(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """
+    Trigram index for fuzzy (misspelled) name lookups
+
+    Every text of a document is stored as one entry, and each of its words
+    as another, so a misspelled surname still matches "John Smith". Postings
+    map trigram -> entry ids. A lookup counts shared trigrams per entry
+    straight from the postings of the query's trigrams and scores entries
+    by Jaccard similarity (shared / union), so it costs about as much as an
+    exact lookup: proportional to the postings touched, not the catalog.
+    A document scores as its best entry.
+    """
+
+    def __init__(self):
+        self._next_entry = 0
+        self.postings: Dict[str, Set[int]] = {}
+        # entry id -> (doc_id, trigram set)
+        self._entries: Dict[int, Tuple[str, Set[str]]] = {}
+        # doc_id -> (texts, entry ids)
+        self._doc_entries: Dict[str, Tuple[Tuple, List[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_entries)
+
+    def _add_entry(self, doc_id: str, grams: Set[str]) -> int:
+        entry_id = self._next_entry
+        self._next_entry += 1
+        self._entries[entry_id] = (doc_id, grams)
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(entry_id)
+        return entry_id
+
+    def set_document(self, doc_id: str, texts: List[Any]):
+        """Replace the texts indexed for one document; empty texts are skipped"""
+        texts = tuple(str(text) for text in texts if text)
+        current = self._doc_entries.get(doc_id)
+        if current is not None and current[0] == texts:
+            return
+        self.remove_document(doc_id)
+
+        seen: Set[frozenset] = set()
+        entry_ids = []
+        for text in texts:
+            words = TOKEN_PATTERN.findall(normalize_text(text))
+            for value in ([" ".join(words)] if len(words) > 1 else []) + words:
+                grams = trigrams(value)
+                key = frozenset(grams)
+                if grams and key not in seen:
+                    seen.add(key)
+                    entry_ids.append(self._add_entry(doc_id, grams))
+        if entry_ids:
+            self._doc_entries[doc_id] = (texts, entry_ids)
+
+    def remove_document(self, doc_id: str):
+        """Drop every entry of one document"""
+        current = self._doc_entries.pop(doc_id, None)
+        for entry_id in (current[1] if current else ()):
+            _, grams = self._entries.pop(entry_id)
+            for gram in grams:
+                postings = self.postings.get(gram)
+                if postings is None:
+                    continue
+                postings.discard(entry_id)
+                if not postings:
+                    del self.postings[gram]
+
+    def document_ids(self) -> List[str]:
+        """Ids of the indexed documents"""
+        return list(self._doc_entries)
+
+    def search(self, query: str, limit: int = 20, threshold: float = 0.3) -> List[Tuple[float, str]]:
+        """
+        Documents whose texts are similar to the query, best first
+
+        Returns:
+            (similarity, doc_id) pairs with similarity >= threshold
+        """
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        shared: Dict[int, int] = {}
+        for gram in query_grams:
+            for entry_id in self.postings.get(gram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+
+        best: Dict[str, float] = {}
+        for entry_id, common in shared.items():
+            doc_id, grams = self._entries[entry_id]
+            similarity = common / (len(query_grams) + len(grams) - common)
+            if similarity >= threshold and similarity > best.get(doc_id, 0.0):
+                best[doc_id] = similarity
+
+        return heapq.nlargest(limit, ((score, doc_id) for doc_id, score in best.items()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size counters"""
+        return {
+            "documents": len(self._doc_entries),
+            "entries": len(self._entries),
+            "trigrams": len(self.postings)
+        }
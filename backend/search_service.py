@@ -2,27 +2,607 @@
 Search Service for MNASE Basketball League
 Provides search and filtering capabilities across all content types
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timezone
+import asyncio
+import hashlib
+import heapq
+import json
+import logging
+import os
 import re
+import time
+
+from pymongo import UpdateOne
+
+from cache_utils import TTLLRUCache
+from search_index import InvertedIndex, PrefixIndex, TrigramIndex, normalize_text, phrase_key, tokenize
+
+# Searchable content types: backing collection, result label and weighted text fields
+SEARCH_SOURCES = {
+    "events": {
+        "collection": "events",
+        "result_type": "event",
+        "fields": {"title": 3.0, "location": 1.5, "description": 1.0, "tags": 1.0}
+    },
+    "programs": {
+        "collection": "programs",
+        "result_type": "program",
+        "fields": {"name": 3.0, "location": 1.5, "category": 1.0, "description": 1.0}
+    },
+    "facilities": {
+        "collection": "facilities",
+        "result_type": "facility",
+        "fields": {"name": 3.0, "location": 1.5, "amenities": 1.0, "description": 1.0}
+    },
+    "teams": {
+        "collection": "teams",
+        "result_type": "team",
+        "fields": {"name": 3.0, "coach_name": 2.0, "division": 1.0, "age_group": 1.0}
+    },
+    "calendar_events": {
+        "collection": "calendar_events",
+        "result_type": "calendar_event",
+        "fields": {"title": 3.0, "location": 1.5, "description": 1.0}
+    }
+}
+
+# Fields offered as typeahead suggestions, per content type: field -> suggestion type
+SUGGEST_FIELDS = {
+    "events": {"title": "event"},
+    "programs": {"name": "program"},
+    "teams": {"name": "team", "coach_name": "coach"},
+    "facilities": {"name": "facility"}
+}
+
+# Name/title fields indexed as trigrams for typo-tolerant lookups, per content type
+FUZZY_FIELDS = {
+    "events": ["title"],
+    "programs": ["name"],
+    "teams": ["name", "coach_name"],
+    "facilities": ["name"]
+}
+
+# Facet counts offered next to search results, per content type: facet name -> field
+SEARCH_FACETS = {
+    "events": {"event_type": "type", "category": "category"},
+    "programs": {"category": "category", "age_group": "age_group", "skill_level": "skill_level"}
+}
+
+# Lower bounds of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKETS = [0, 25, 50, 100, 250]
+
+# Fields whose lower-cased words are stored in SEARCH_TERMS_FIELD for indexed prefix matching;
+# the same fields as the text index, so one- and multi-word queries cover the same content
+PREFIX_FIELDS = {source: list(config["fields"]) for source, config in SEARCH_SOURCES.items()}
+SEARCH_TERMS_FIELD = "search_terms"
+
+# Projection for search results: internal search fields are not returned
+SEARCH_PROJECTION = {"_id": 0, SEARCH_TERMS_FIELD: 0}
+
+# User input longer than this is truncated before it is used in a regex
+MAX_REGEX_LENGTH = int(os.environ.get('SEARCH_MAX_REGEX_LENGTH', 64))
+
+# Strategies the text query planner can choose, cheapest first
+QUERY_STRATEGIES = ("text", "prefix", "regex")
+
+# Compound indexes backing keyset pagination: one per sort mode a listing
+# supports, ending in the id tiebreaker added by pagination_utils
+KEYSET_INDEXES = {
+    "events": [("date", "id"), ("price", "id"), ("title", "id"), ("created_at", "id")],
+    "programs": [("name", "id"), ("price", "id"), ("created_at", "id")],
+    "facilities": [("name", "id"), ("created_at", "id")],
+    "teams": [("name", "id"), ("created_at", "id")],
+    "calendar_events": [("date", "id"), ("title", "id"), ("created_at", "id")],
+    "news_posts": [
+        ("published", "published_at", "created_at", "id"),
+        ("published_at", "created_at", "id")
+    ],
+    "media": [("category", "uploaded_at", "id"), ("uploaded_at", "id")]
+}
 
 
 class SearchService:
     """
     Service for searching and filtering content
     Supports full-text search, date ranges, categories, and more
+    
+    Text search is answered from an in-memory inverted index per content
+    type (see search_index.InvertedIndex) once it has been built; until then
+    callers fall back to MongoDB regex queries. The index is updated on
+    writes made by this process and rebuilt periodically to pick up writes
+    from other workers.
     """
     
     def __init__(self):
+        self.indexes: Dict[str, InvertedIndex] = {
+            source: InvertedIndex(config["fields"]) for source, config in SEARCH_SOURCES.items()
+        }
+        self.suggestions = PrefixIndex()
+        self.fuzzy: Dict[str, TrigramIndex] = {source: TrigramIndex() for source in FUZZY_FIELDS}
+        self.fuzzy_threshold = float(os.environ.get('SEARCH_FUZZY_THRESHOLD', 0.3))
+        self.fuzzy_lookups = 0
+        self.fuzzy_ms = 0.0
+        self.ready = set()
+        self.refresh_interval = float(os.environ.get('SEARCH_INDEX_REFRESH_SECONDS', 300))
+        self.last_build_ms: Dict[str, float] = {}
+        # Writes that arrive while a source is being rebuilt, replayed onto the new index
+        self._replay: Dict[str, List[Tuple[str, Any]]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+        # Query planner state: collections with a $text index, and with search terms
+        # indexed and backfilled, plus how often each strategy was chosen
+        self.text_indexed = set()
+        self.terms_indexed = set()
+        self.terms_backfilled = set()
+        self.strategy_counts: Dict[str, int] = {strategy: 0 for strategy in QUERY_STRATEGIES}
+        self._term_writes = set()
+        # Write generation per content type; cache keys include it, so a write
+        # makes every cached answer over that content type unreachable
+        self.generations: Dict[str, int] = {source: 0 for source in SEARCH_SOURCES}
+        # Facet counts per content type, keyed by generation and a hash of the filter
+        facet_ttl = float(os.environ.get('SEARCH_FACET_CACHE_TTL_SECONDS', 30))
+        self.facet_cache: Dict[str, TTLLRUCache] = {
+            source: TTLLRUCache(max_size=1000, ttl_seconds=facet_ttl) for source in SEARCH_FACETS
+        }
+        # Whole search responses, keyed by endpoint, normalized parameters and generations
+        self.result_cache = TTLLRUCache(
+            max_size=int(os.environ.get('SEARCH_RESULT_CACHE_MAX_SIZE', 2000)),
+            ttl_seconds=float(os.environ.get('SEARCH_RESULT_CACHE_TTL_SECONDS', 60)),
+            max_bytes=int(os.environ.get('SEARCH_RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024)),
+            size_of=lambda value: len(json.dumps(value, default=str))
+        )
         print("✅ SearchService initialized")
     
-    def create_text_search_query(self, search_term: str, fields: List[str]) -> Dict[str, Any]:
+    def is_ready(self, source: str) -> bool:
+        """Check whether a content type's index has been built"""
+        return source in self.ready
+    
+    def _suggest_document(self, source: str, doc: Dict[str, Any]):
+        fields = SUGGEST_FIELDS.get(source)
+        if fields and doc.get("id"):
+            self.suggestions.set_document(
+                source, doc["id"], [(suggestion_type, doc.get(field)) for field, suggestion_type in fields.items()]
+            )
+    
+    def _fuzzy_document(self, source: str, doc: Dict[str, Any]):
+        fields = FUZZY_FIELDS.get(source)
+        if fields and doc.get("id"):
+            self.fuzzy[source].set_document(doc["id"], [doc.get(field) for field in fields])
+    
+    def bump_generation(self, source: str):
+        """Mark a content type as written so cached results over it are no longer served"""
+        self.generations[source] = self.generations.get(source, 0) + 1
+    
+    def search_terms(self, source: str, doc: Dict[str, Any]) -> List[str]:
+        """Distinct lower-cased, accent-free words of a document's prefix fields"""
+        words = set()
+        for field in PREFIX_FIELDS.get(source, ()):
+            value = doc.get(field)
+            for item in value if isinstance(value, list) else [value]:
+                words.update(phrase_key(item).split())
+        return sorted(words)
+    
+    def with_search_terms(self, source: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Set a document's search terms before it is written
+        
+        Documents written with their terms need no follow-up write from
+        index_document; that background write is left for backfill and for
+        documents whose terms changed outside these endpoints.
+        """
+        doc[SEARCH_TERMS_FIELD] = self.search_terms(source, doc)
+        return doc
+    
+    def _store_search_terms(self, source: str, doc: Dict[str, Any], stored: Optional[List[str]]):
+        """Write a document's search terms back in the background if they changed"""
+        terms = self.search_terms(source, doc)
+        if self._db is None or not doc.get("id") or stored == terms:
+            return
+        task = asyncio.create_task(self._db[SEARCH_SOURCES[source]["collection"]].update_one(
+            {"id": doc["id"]}, {"$set": {SEARCH_TERMS_FIELD: terms}}
+        ))
+        self._term_writes.add(task)
+        task.add_done_callback(self._term_writes.discard)
+    
+    def index_document(self, source: str, doc: Dict[str, Any]):
+        """Add or replace a document in a content type's index"""
+        stored = doc.get(SEARCH_TERMS_FIELD)
+        doc = {k: v for k, v in doc.items() if k != SEARCH_TERMS_FIELD}
+        self.indexes[source].add(doc)
+        self._store_search_terms(source, doc, stored)
+        self.bump_generation(source)
+        self._suggest_document(source, doc)
+        self._fuzzy_document(source, doc)
+        if source in self._replay:
+            self._replay[source].append(("add", dict(doc)))
+    
+    def remove_document(self, source: str, doc_id: str):
+        """Remove a document from a content type's index"""
+        self.indexes[source].remove(doc_id)
+        self.suggestions.remove_document(source, doc_id)
+        if source in self.fuzzy:
+            self.fuzzy[source].remove_document(doc_id)
+        self.bump_generation(source)
+        if source in self._replay:
+            self._replay[source].append(("remove", doc_id))
+    
+    async def reindex_document(self, db, source: str, doc_id: str):
+        """Reload one document from MongoDB and update the index (or drop it if deleted)"""
+        doc = await db[SEARCH_SOURCES[source]["collection"]].find_one({"id": doc_id}, {"_id": 0})
+        if doc:
+            self.index_document(source, doc)
+        else:
+            self.remove_document(source, doc_id)
+    
+    async def build_index(self, db, source: str):
+        """Rebuild one content type's index from MongoDB and swap it in"""
+        started = time.perf_counter()
+        self._replay[source] = []
+        try:
+            index = InvertedIndex(SEARCH_SOURCES[source]["fields"])
+            collection = db[SEARCH_SOURCES[source]["collection"]]
+            term_updates = []
+            async for doc in collection.find({}, {"_id": 0}):
+                terms = self.search_terms(source, doc)
+                if doc.get(SEARCH_TERMS_FIELD) != terms:
+                    term_updates.append(UpdateOne({"id": doc.get("id")}, {"$set": {SEARCH_TERMS_FIELD: terms}}))
+                doc.pop(SEARCH_TERMS_FIELD, None)
+                index.add(doc)
+            for op, value in self._replay[source]:
+                if op == "add":
+                    index.add(value)
+                else:
+                    index.remove(value)
+            self.indexes[source] = index
+            self.ready.add(source)
+            # The rebuild may include writes made by other workers
+            self.bump_generation(source)
+            
+            # Backfill search terms for documents written before (or by another worker)
+            for i in range(0, len(term_updates), 500):
+                await collection.bulk_write(term_updates[i:i + 500], ordered=False)
+            self.terms_backfilled.add(source)
+            
+            # Bring suggestions in line with the rebuilt index; unchanged documents are skipped
+            if source in SUGGEST_FIELDS:
+                for doc_id in self.suggestions.document_ids(source):
+                    if doc_id not in index.docs:
+                        self.suggestions.remove_document(source, doc_id)
+                for doc in index.docs.values():
+                    self._suggest_document(source, doc)
+            if source in self.fuzzy:
+                for doc_id in self.fuzzy[source].document_ids():
+                    if doc_id not in index.docs:
+                        self.fuzzy[source].remove_document(doc_id)
+                for doc in index.docs.values():
+                    self._fuzzy_document(source, doc)
+        finally:
+            self._replay.pop(source, None)
+        self.last_build_ms[source] = round((time.perf_counter() - started) * 1000, 1)
+    
+    async def build_all(self, db):
+        """Rebuild every content type's index"""
+        for source in SEARCH_SOURCES:
+            try:
+                await self.build_index(db, source)
+            except Exception as e:
+                logging.error(f"Failed to build {source} search index: {e}")
+    
+    async def _refresh_loop(self, db):
+        while True:
+            await self.build_all(db)
+            await asyncio.sleep(self.refresh_interval)
+    
+    def start(self, db):
+        """Build the indexes in the background and refresh them periodically"""
+        self._db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(db))
+    
+    async def stop(self):
+        """Stop the background refresh task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def suggest(self, prefix: str, limit: int = 10, types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Ranked typeahead completions with type tags, answered from memory"""
+        return self.suggestions.suggest(prefix, limit, set(types) if types else None)
+    
+    def fuzzy_scores(self, source: str, search: str, limit: int = 50) -> Dict[str, float]:
+        """
+        Trigram similarity of the closest names/titles to a (possibly misspelled) search
+        
+        Returns:
+            Dict of doc_id -> similarity in (0, 1]; empty if the content type has
+            no fuzzy index or nothing is similar enough
+        """
+        index = self.fuzzy.get(source)
+        if index is None or source not in self.ready:
+            return {}
+        started = time.perf_counter()
+        matches = index.search(search, limit, self.fuzzy_threshold)
+        self.fuzzy_lookups += 1
+        self.fuzzy_ms += (time.perf_counter() - started) * 1000
+        return {doc_id: similarity for similarity, doc_id in matches}
+    
+    def rank_fuzzy(self, source: str, search: str, limit: int) -> List[Dict[str, Any]]:
+        """Indexed documents closest to a misspelled search, best first, with similarity as score"""
+        results = []
+        for doc_id, similarity in self.fuzzy_scores(source, search, limit).items():
+            doc = self.indexes[source].docs.get(doc_id)
+            if doc is not None:
+                results.append({**doc, "score": round(similarity, 4)})
+        return results
+    
+    def score(self, source: str, search: str) -> Dict[str, float]:
+        """BM25 scores of every document matching all search words, keyed by id"""
+        return self.indexes[source].score(search)
+    
+    def rank(self, source: str, search: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Ranked documents for a search, best first
+        
+        Returns:
+            Copies of the indexed documents with a "score" field
+        """
+        results = []
+        for score, doc in self.indexes[source].search(search, limit):
+            result = dict(doc)
+            result["score"] = round(score, 4)
+            results.append(result)
+        return results
+    
+    def match_score(self, source: str, doc: Dict[str, Any], search: str) -> float:
+        """
+        Heuristic relevance for a document matched by a regex query
+        
+        Sums the weight of each field containing the search text, discounted
+        by how far into the field the match starts, so title hits near the
+        start rank first. Used when a content type has no built index.
+        """
+        needle = normalize_text(search)
+        score = 0.0
+        for field, weight in SEARCH_SOURCES[source]["fields"].items():
+            value = doc.get(field)
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(v) for v in value)
+            position = normalize_text(value).find(needle)
+            if position >= 0:
+                score += weight / (1 + position / 10)
+        return round(score, 4)
+    
+    def merge_top_k(self, result_lists: List[List[Dict[str, Any]]], limit: int) -> List[Dict[str, Any]]:
+        """
+        Merge scored results from several sources into the overall top `limit`
+        
+        Uses a bounded heap, so the cost is O(n log limit) for n candidates.
+        Ties keep source order.
+        """
+        candidates = (
+            (result.get("score", 0.0), -source_index, -position, result)
+            for source_index, results in enumerate(result_lists)
+            for position, result in enumerate(results)
+        )
+        return [item[3] for item in heapq.nlargest(limit, candidates, key=lambda item: item[:3])]
+    
+    def build_facet_pipeline(self, source: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Build one aggregation that counts every facet of a content type
+        
+        Each facet is a $group sub-pipeline of a single $facet stage, so all
+        counts come from one pass over the documents matching the query.
+        """
+        facets: Dict[str, List[Dict[str, Any]]] = {
+            name: [
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}}
+            ]
+            for name, field in SEARCH_FACETS[source].items()
+        }
+        facets["price"] = [
+            {"$match": {"price": {"$type": "number", "$gte": PRICE_BUCKETS[0]}}},
+            {"$bucket": {
+                "groupBy": "$price",
+                "boundaries": PRICE_BUCKETS,
+                "default": "open",
+                "output": {"count": {"$sum": 1}}
+            }}
+        ]
+        facets["total"] = [{"$count": "count"}]
+        return [{"$match": query}, {"$facet": facets}]
+    
+    def _format_facets(self, source: str, raw: Dict[str, Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            name: [
+                {"value": row["_id"], "count": row["count"]}
+                for row in raw.get(name, []) if row["_id"] not in (None, "")
+            ]
+            for name in SEARCH_FACETS[source]
+        }
+        counts = {row["_id"]: row["count"] for row in raw.get("price", [])}
+        result["price"] = []
+        for i, low in enumerate(PRICE_BUCKETS):
+            high = PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None
+            count = counts.get("open" if high is None else low, 0)
+            result["price"].append({
+                "bucket": f"{low}-{high}" if high is not None else f"{low}+",
+                "min": low,
+                "max": high,
+                "count": count
+            })
+        total = raw.get("total") or [{"count": 0}]
+        result["total"] = total[0]["count"]
+        return result
+    
+    async def facet_counts(self, db, source: str, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Facet counts for the documents matching a search filter
+        
+        Results are cached briefly per filter combination and stop being
+        served once a document of the content type is written.
+        """
+        key = (self.generations[source], hashlib.sha1(
+            json.dumps(query, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest())
+        cache = self.facet_cache[source]
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        
+        collection = db[SEARCH_SOURCES[source]["collection"]]
+        rows = await collection.aggregate(self.build_facet_pipeline(source, query)).to_list(length=1)
+        facets = self._format_facets(source, rows[0] if rows else {})
+        cache.set(key, facets)
+        return facets
+    
+    def result_cache_key(self, endpoint: str, sources: List[str], params: Dict[str, Any]) -> Tuple:
+        """
+        Cache key for a search response
+        
+        Parameters that are unset are dropped and the search term is
+        normalized (case, accents, spacing) since every strategy ignores
+        those; other filters are kept exactly because they match exactly.
+        The current generation of each content type searched is included.
+        """
+        normalized = []
+        for name, value in sorted(params.items()):
+            if value is None or value == "":
+                continue
+            if name == "search":
+                value = " ".join(normalize_text(value).split())
+            elif isinstance(value, list):
+                value = tuple(value)
+            normalized.append((name, value))
+        return (endpoint, tuple(normalized), tuple(self.generations.get(source, 0) for source in sources))
+    
+    async def cached_response(
+        self,
+        endpoint: str,
+        sources: List[str],
+        params: Dict[str, Any],
+        compute,
+        should_cache=None
+    ):
+        """
+        Serve a search response from the result cache, computing it on a miss
+        
+        Args:
+            compute: Zero-argument coroutine function building the response
+            should_cache: Optional predicate; responses it rejects are not stored
+        
+        Returns:
+            The response with "cached" set to whether it came from the cache
+        """
+        key = self.result_cache_key(endpoint, sources, params)
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+        response = await compute()
+        # Only store if nothing was written while the response was computed
+        if key == self.result_cache_key(endpoint, sources, params) and (should_cache is None or should_cache(response)):
+            self.result_cache.set(key, response)
+        return {**response, "cached": False}
+    
+    async def ensure_indexes(self, db):
+        """
+        Create id indexes used to fetch ranked documents with filters applied,
+        plus (sort field, id) indexes so each keyset page is a single index seek
+        """
+        for config in SEARCH_SOURCES.values():
+            await db[config["collection"]].create_index("id")
+        for collection, keys in KEYSET_INDEXES.items():
+            for key in keys:
+                await db[collection].create_index([(field, 1) for field in key])
+        
+        # Indexes behind the text query planner: one weighted $text index per
+        # collection and a multikey index on the lower-cased prefix words
+        for source, config in SEARCH_SOURCES.items():
+            collection = db[config["collection"]]
+            try:
+                await collection.create_index(
+                    [(field, "text") for field in config["fields"]],
+                    weights={field: max(1, round(weight * 2)) for field, weight in config["fields"].items()},
+                    default_language="english",
+                    name="search_text"
+                )
+                self.text_indexed.add(source)
+            except Exception as e:
+                # A collection can only have one text index; keep using regex if another exists
+                logging.warning(f"Text index not created for {source}: {e}")
+            await collection.create_index(SEARCH_TERMS_FIELD)
+            self.terms_indexed.add(source)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-content-type index sizes and build times"""
+        stats = {
+            source: {
+                "ready": source in self.ready,
+                "last_build_ms": self.last_build_ms.get(source),
+                **index.get_stats()
+            }
+            for source, index in self.indexes.items()
+        }
+        stats["suggestions"] = {"entries": len(self.suggestions)}
+        stats["fuzzy"] = {
+            "threshold": self.fuzzy_threshold,
+            "lookups": self.fuzzy_lookups,
+            "avg_ms": round(self.fuzzy_ms / self.fuzzy_lookups, 3) if self.fuzzy_lookups else 0.0,
+            **{source: index.get_stats() for source, index in self.fuzzy.items()}
+        }
+        stats["facet_cache"] = {source: cache.stats() for source, cache in self.facet_cache.items()}
+        stats["result_cache"] = self.result_cache.stats()
+        stats["generations"] = dict(self.generations)
+        stats["query_planner"] = {
+            "strategies": dict(self.strategy_counts),
+            "text_indexed": sorted(self.text_indexed),
+            "prefix_ready": sorted(self.terms_indexed & self.terms_backfilled)
+        }
+        return stats
+    
+    def text_strategy(self, source: Optional[str], search_term: str) -> str:
+        """
+        Choose how MongoDB should answer a text search
+        
+        - "text": two or more words, answered by the collection's $text index
+          (every word must appear, as a whole word)
+        - "prefix": one word, answered by an anchored prefix match on the
+          lower-cased search terms, which is a range scan on their index
+        - "regex": escaped, length-capped case-insensitive regex over the
+          fields; only when neither index is available for the collection
+        """
+        words = tokenize(search_term)
+        if len(words) >= 2 and source in self.text_indexed:
+            return "text"
+        if len(words) == 1 and source in self.terms_indexed and source in self.terms_backfilled:
+            return "prefix"
+        return "regex"
+    
+    def bounded_regex(self, value: str) -> Dict[str, Any]:
+        """Case-insensitive regex condition matching user input literally"""
+        return {"$regex": re.escape(value.strip()[:MAX_REGEX_LENGTH]), "$options": "i"}
+    
+    def create_text_search_query(
+        self,
+        search_term: str,
+        fields: List[str],
+        source: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Create a MongoDB query for text search across multiple fields
         
+        User input is never compiled as a pattern; see text_strategy for how
+        the query shape is chosen.
+        
         Args:
             search_term: The search term
-            fields: List of field names to search in
+            fields: List of field names to search in (regex strategy)
+            source: Content type, which decides the indexes available
             
         Returns:
             MongoDB query dict
@@ -30,13 +610,18 @@ class SearchService:
         if not search_term:
             return {}
         
-        # Create case-insensitive regex pattern
-        pattern = re.compile(search_term, re.IGNORECASE)
+        strategy = self.text_strategy(source, search_term)
+        self.strategy_counts[strategy] += 1
+        
+        if strategy == "text":
+            return {"$text": {"$search": " ".join(f'"{word}"' for word in tokenize(search_term))}}
+        if strategy == "prefix":
+            return {SEARCH_TERMS_FIELD: {"$regex": "^" + re.escape(tokenize(search_term)[0])}}
         
-        # Search across all specified fields
+        condition = self.bounded_regex(search_term)
         return {
             "$or": [
-                {field: {"$regex": pattern}} for field in fields
+                {field: dict(condition)} for field in fields
             ]
         }
     
@@ -72,7 +657,8 @@ class SearchService:
         if search:
             text_query = self.create_text_search_query(
                 search,
-                ["title", "description", "location"]
+                ["title", "description", "location"],
+                "events"
             )
             conditions.append(text_query)
         
@@ -91,8 +677,7 @@ class SearchService:
         
         # Location filter
         if location:
-            location_pattern = re.compile(location, re.IGNORECASE)
-            query["location"] = {"$regex": location_pattern}
+            query["location"] = self.bounded_regex(location)
         
         # Price range filter
         if min_price is not None:
@@ -142,7 +727,8 @@ class SearchService:
         if search:
             text_query = self.create_text_search_query(
                 search,
-                ["name", "description", "location"]
+                ["name", "description", "location"],
+                "programs"
             )
             conditions.append(text_query)
         
@@ -202,7 +788,8 @@ class SearchService:
         if search:
             text_query = self.create_text_search_query(
                 search,
-                ["name", "description", "location"]
+                ["name", "description", "location"],
+                "facilities"
             )
             conditions.append(text_query)
         
@@ -214,6 +801,11 @@ class SearchService:
         if amenities and len(amenities) > 0:
             query["amenities"] = {"$all": amenities}
         
+        # Facilities switched off by an admin are never available; slot-level
+        # availability is checked by FacilityAvailabilityService
+        if available_date:
+            query["available"] = {"$ne": False}
+        
         # Combine conditions
         if conditions:
             if "$and" in query:
@@ -247,7 +839,8 @@ class SearchService:
         if search:
             text_query = self.create_text_search_query(
                 search,
-                ["name", "coach_name"]
+                ["name", "coach_name"],
+                "teams"
             )
             conditions.append(text_query)
         
@@ -9,24 +9,39 @@ load_dotenv(ROOT_DIR / '.env')
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, UploadFile, File
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import logging
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, PrivateAttr
 from typing import List, Optional, Dict
 import uuid
+import json
+import time
+import asyncio
 from datetime import datetime, timezone, timedelta
-from passlib.context import CryptContext
 import jwt
 from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
 from email_service import email_service
 from image_service import image_service
-from search_service import search_service
+from search_service import search_service, SEARCH_SOURCES, SEARCH_PROJECTION
+from pagination_utils import InvalidCursorError, paginate, encode_cursor, decode_cursor
 from notification_service import notification_service
 from activity_log_service import activity_log_service
 from membership_service import membership_service, MEMBERSHIP_PRICING
 from calendar_service import calendar_service
+from user_cache_service import user_cache_service
+from password_service import password_service, PasswordQueueFullError
+from permission_service import PermissionRegistry
+from token_service import token_version_service
+from family_service import family_service
+from recurrence_service import recurrence_service
+from reminder_service import reminder_scheduler
+from facility_availability_service import facility_availability_service
+from standings_service import standings_service
+from leaderboard_service import leaderboard_service, LEADER_STATS
+from box_score_service import box_score_service, is_duplicate_key, BOX_SCORE_LOCKED_FIELDS
+from advanced_stats_service import advanced_stats_service, ADVANCED_METRICS
 from error_utils import (
     ValidationUtils, ValidationError, CustomHTTPException,
     not_found_error, validation_error, unauthorized_error, 
@@ -41,11 +56,12 @@ client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
 # Security setup
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 SECRET_KEY = os.environ.get('JWT_SECRET', 'your-secret-key-change-this')
 STRIPE_API_KEY = os.environ.get('STRIPE_API_KEY')
 SETUP_SECRET_TOKEN = os.environ.get('SETUP_SECRET_TOKEN', 'mnase-setup-token-2025')
+# Embed role, permission mask and token version in JWTs so requests can be authorized without a user lookup
+JWT_EMBED_PERMISSIONS = os.environ.get('JWT_EMBED_PERMISSIONS', 'false').lower() == 'true'
 
 # Permissions Configuration
 PERMISSIONS = {
@@ -133,6 +149,9 @@ DEFAULT_ROLES = {
     }
 }
 
+# Compiled permission bits for fast permission checks
+permission_registry = PermissionRegistry(PERMISSIONS)
+
 
 # Create the main app
 app = FastAPI()
@@ -209,6 +228,8 @@ class User(BaseModel):
     is_parent: bool = False  # True if this account manages youth
     profile_image: Optional[str] = None  # Path to profile image
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    _permission_mask: Optional[int] = PrivateAttr(default=None)  # Compiled lazily by get_permission_mask
+    _from_claims: bool = PrivateAttr(default=False)  # Built from token claims rather than the users collection
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -377,6 +398,14 @@ class TeamStandings(BaseModel):
     points_against: int = 0
     season: str
     division: Optional[str] = None
+    # Computed from the season's games when standings are listed
+    rank: Optional[int] = None
+    games_played: Optional[int] = None
+    win_pct: Optional[float] = None
+    games_back: Optional[float] = None
+    point_differential: Optional[int] = None
+    head_to_head_pct: Optional[float] = None
+    streak: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -400,6 +429,19 @@ class GameStatsCreate(BaseModel):
     notes: Optional[str] = None
     season: str
 
+class GameStatsUpdate(BaseModel):
+    game_date: Optional[str] = None
+    home_team: Optional[str] = None
+    away_team: Optional[str] = None
+    home_score: Optional[int] = None
+    away_score: Optional[int] = None
+    location: Optional[str] = None
+    game_type: Optional[str] = None
+    tournament_name: Optional[str] = None
+    player_stats: Optional[List[Dict]] = None
+    notes: Optional[str] = None
+    season: Optional[str] = None
+
 class StatsUpdate(BaseModel):
     games_played: Optional[int] = None
     minutes_played: Optional[float] = None
@@ -456,6 +498,7 @@ class EventCreate(BaseModel):
     recurrence_end_date: Optional[str] = None
     recurrence_days: Optional[List[str]] = Field(default_factory=list)
     tags: Optional[List[str]] = Field(default_factory=list)
+    store_as_series: bool = False  # Store recurring events once as a rule instead of one document per date
 
 class Facility(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -1107,19 +1150,65 @@ class AddPlayerToTeam(BaseModel):
 
 
 # Helper functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+def password_busy_error():
+    """503 returned when the password worker queue is full"""
+    return CustomHTTPException(
+        status_code=503,
+        error="service_busy",
+        message="Too many sign-in requests are being processed. Please try again in a moment.",
+        details={"retry_after_seconds": 1}
+    )
+
+async def hash_password(password: str) -> str:
+    try:
+        return await password_service.hash_password(password)
+    except PasswordQueueFullError:
+        raise password_busy_error()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await password_service.verify_password(plain_password, hashed_password)
+    except PasswordQueueFullError:
+        raise password_busy_error()
 
-def create_access_token(data: dict) -> str:
+def create_access_token(data: dict, user: Optional[User] = None, token_version: int = 0) -> str:
     to_encode = data.copy()
+    if JWT_EMBED_PERMISSIONS and user is not None:
+        mask, extras = permission_registry.split(user.permissions)
+        to_encode.update({
+            "name": user.name,
+            "role": user.role,
+            "perm": format(mask, "x"),
+            "ver": token_version,
+            "dob": user.date_of_birth,
+            "pid": user.parent_account_id,
+            "parent": user.is_parent
+        })
+        if extras:
+            to_encode["xperm"] = list(extras)
     expire = datetime.now(timezone.utc) + timedelta(days=7)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm="HS256")
     return encoded_jwt
 
+def user_from_claims(payload: dict) -> User:
+    """Build a User from the claims embedded by create_access_token"""
+    mask = int(payload["perm"], 16)
+    user = User(
+        id=payload["user_id"],
+        email=payload["email"],
+        name=payload["name"],
+        role=payload["role"],
+        permissions=permission_registry.decompile(mask) + payload.get("xperm", []),
+        date_of_birth=payload.get("dob"),
+        parent_account_id=payload.get("pid"),
+        is_parent=payload.get("parent", False)
+    )
+    if not payload.get("xperm"):
+        user._permission_mask = mask
+    user._from_claims = True
+    return user
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         token = credentials.credentials
@@ -1127,10 +1216,17 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         user_id = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        if "ver" in payload:
+            if not token_version_service.is_current(user_id, payload["ver"]):
+                raise HTTPException(status_code=401, detail="Token revoked")
+            if JWT_EMBED_PERMISSIONS:
+                return user_from_claims(payload)
+        user = await user_cache_service.get_user(db, user_id)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         return User(**user)
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except Exception as e:
@@ -1143,23 +1239,39 @@ async def get_admin_user(user: User = Depends(get_current_user)):
 
 
 # Permission checking utilities
+def get_permission_mask(user: User) -> int:
+    """Get the user's compiled permission bitmask (computed once per User object)"""
+    if user._permission_mask is None:
+        user._permission_mask = permission_registry.compile(user.permissions)
+    return user._permission_mask
+
 def has_permission(user: User, required_permission: str) -> bool:
     """Check if user has a specific permission"""
     if user.role == "super_admin":
         return True
-    return required_permission in user.permissions
+    bit = permission_registry.bits.get(required_permission)
+    if bit is None:
+        # Custom permission outside the catalogue
+        return required_permission in user.permissions
+    return get_permission_mask(user) & bit != 0
 
 def has_any_permission(user: User, required_permissions: List[str]) -> bool:
     """Check if user has at least one of the required permissions"""
     if user.role == "super_admin":
         return True
-    return any(perm in user.permissions for perm in required_permissions)
+    required_mask, extras = permission_registry.split(required_permissions)
+    if permission_registry.has_any(get_permission_mask(user), required_mask):
+        return True
+    return any(perm in user.permissions for perm in extras)
 
 def has_all_permissions(user: User, required_permissions: List[str]) -> bool:
     """Check if user has all required permissions"""
     if user.role == "super_admin":
         return True
-    return all(perm in user.permissions for perm in required_permissions)
+    required_mask, extras = permission_registry.split(required_permissions)
+    if not permission_registry.has_all(get_permission_mask(user), required_mask):
+        return False
+    return all(perm in user.permissions for perm in extras)
 
 async def require_permission(permission: str):
     """Dependency for routes requiring specific permission"""
@@ -1273,7 +1385,7 @@ async def register(user_data: UserCreate, request: Request):
         )
         
         doc = user.model_dump()
-        doc['password'] = hash_password(user_data.password)
+        doc['password'] = await hash_password(user_data.password)
         doc['created_at'] = doc['created_at'].isoformat()
         
         await db.users.insert_one(doc)
@@ -1316,7 +1428,7 @@ async def register(user_data: UserCreate, request: Request):
         except Exception as e:
             logging.error(f"Failed to send welcome email: {e}")
         
-        token = create_access_token({"user_id": user.id, "email": user.email})
+        token = create_access_token({"user_id": user.id, "email": user.email}, user)
         return {"user": user, "token": token, "message": "Registration successful"}
         
     except CustomHTTPException:
@@ -1332,7 +1444,7 @@ async def login(credentials: UserLogin, request: Request):
     user_doc = await db.users.find_one({"email": credentials.email}, {"_id": 0})
     
     # Log failed login attempt
-    if not user_doc or not verify_password(credentials.password, user_doc['password']):
+    if not user_doc or not await verify_password(credentials.password, user_doc['password']):
         await activity_log_service.log_activity(
             action="login",
             resource_type="auth",
@@ -1347,7 +1459,11 @@ async def login(credentials: UserLogin, request: Request):
         user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
     
     user = User(**user_doc)
-    token = create_access_token({"user_id": user.id, "email": user.email})
+    token = create_access_token(
+        {"user_id": user.id, "email": user.email},
+        user,
+        token_version=user_doc.get('token_version', 0)
+    )
     
     # Log successful login
     await activity_log_service.log_activity(
@@ -1363,6 +1479,12 @@ async def login(credentials: UserLogin, request: Request):
 
 @api_router.get("/auth/me", response_model=User)
 async def get_me(user: User = Depends(get_current_user)):
+    if user._from_claims:
+        # Claims only carry identity and authorization fields
+        user_doc = await user_cache_service.get_user(db, user.id)
+        if not user_doc:
+            raise HTTPException(status_code=401, detail="User not found")
+        return User(**user_doc)
     return user
 
 
@@ -1420,10 +1542,11 @@ async def create_child_account(
         )
         
         doc = child.model_dump()
-        doc['password'] = hash_password(temp_password)
+        doc['password'] = await hash_password(temp_password)
         doc['created_at'] = doc['created_at'].isoformat()
         
         await db.users.insert_one(doc)
+        family_service.invalidate_user(parent.id)
         
         # Update parent's is_parent flag if not already set
         if not parent.is_parent:
@@ -1431,6 +1554,7 @@ async def create_child_account(
                 {"id": parent.id},
                 {"$set": {"is_parent": True}}
             )
+            user_cache_service.invalidate(parent.id)
         
         # Log activity
         await activity_log_service.log_activity(
@@ -1515,31 +1639,25 @@ async def get_child_activities(
 ):
     """Get all activities for a child (registrations, memberships, etc.)"""
     # Verify parent owns this child account
-    child = await db.users.find_one({"id": child_id}, {"_id": 0})
+    child = await user_cache_service.get_user(db, child_id)
     if not child:
         raise not_found_error("Child account", child_id)
     
     if child.get("parent_account_id") != parent.id:
         raise forbidden_error("You don't have access to this account")
     
-    # Get child's registrations
-    youth_registrations = await db.enhanced_registrations.find(
-        {"user_id": child_id},
-        {"_id": 0}
-    ).to_list(1000)
+    cache_key = ("activities", child_id)
+    cached = family_service.get_cached(cache_key)
+    if cached is not None:
+        return cached
     
-    adult_registrations = await db.adult_registrations.find(
-        {"user_id": child_id},
-        {"_id": 0}
-    ).to_list(1000)
+    # Get child's registrations and memberships
+    activities = (await family_service.load_activities(db, [child_id]))[child_id]
+    youth_registrations = activities["youth_registrations"]
+    adult_registrations = activities["adult_registrations"]
+    memberships = activities["memberships"]
     
-    # Get child's memberships
-    memberships = await db.memberships.find(
-        {"user_id": child_id},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    return {
+    result = {
         "child_id": child_id,
         "child_name": child["name"],
         "youth_registrations": youth_registrations,
@@ -1547,6 +1665,8 @@ async def get_child_activities(
         "memberships": memberships,
         "total_activities": len(youth_registrations) + len(adult_registrations) + len(memberships)
     }
+    family_service.set_cached(cache_key, result, [child_id])
+    return result
 
 @api_router.put("/users/children/{child_id}")
 async def update_child_account(
@@ -1578,6 +1698,8 @@ async def update_child_account(
         update_dict["email"] = update_data.email
     
     await db.users.update_one({"id": child_id}, {"$set": update_dict})
+    user_cache_service.invalidate(child_id)
+    family_service.invalidate_user(child_id)
     
     # Log activity
     await activity_log_service.log_activity(
@@ -1598,12 +1720,21 @@ async def update_child_account(
 @api_router.get("/users/family-dashboard")
 async def get_family_dashboard(parent: User = Depends(get_current_user)):
     """Get complete family dashboard with all children and their activities"""
+    cache_key = ("dashboard", parent.id)
+    cached = family_service.get_cached(cache_key)
+    if cached is not None:
+        return cached
+    
     # Get all children
     children = await db.users.find(
         {"parent_account_id": parent.id},
-        {"_id": 0, "password": 0}
+        {"_id": 0, "id": 1, "name": 1, "date_of_birth": 1}
     ).to_list(1000)
     
+    # Load every child's activities in one batch
+    child_ids = [child["id"] for child in children]
+    activities = await family_service.load_activities(db, child_ids)
+    
     family_data = {
         "parent": {
             "id": parent.id,
@@ -1620,21 +1751,9 @@ async def get_family_dashboard(parent: User = Depends(get_current_user)):
     }
     
     for child in children:
-        # Get child's activities
-        youth_regs = await db.enhanced_registrations.find(
-            {"user_id": child["id"]},
-            {"_id": 0}
-        ).to_list(1000)
-        
-        adult_regs = await db.adult_registrations.find(
-            {"user_id": child["id"]},
-            {"_id": 0}
-        ).to_list(1000)
-        
-        memberships = await db.memberships.find(
-            {"user_id": child["id"]},
-            {"_id": 0}
-        ).to_list(1000)
+        youth_regs = activities[child["id"]]["youth_registrations"]
+        adult_regs = activities[child["id"]]["adult_registrations"]
+        memberships = activities[child["id"]]["memberships"]
         
         # Count pending payments
         pending = sum(1 for r in youth_regs + adult_regs if r.get("payment_status") == "unpaid")
@@ -1656,6 +1775,7 @@ async def get_family_dashboard(parent: User = Depends(get_current_user)):
         family_data["summary"]["total_memberships"] += child_data["memberships_count"]
         family_data["summary"]["pending_payments"] += pending
     
+    family_service.set_cached(cache_key, family_data, [parent.id] + child_ids)
     return family_data
 
 
@@ -1678,7 +1798,7 @@ async def setup_super_admin(request: SetupAdminRequest):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create super admin user
-    hashed_password = hash_password(request.password)
+    hashed_password = await hash_password(request.password)
     user = User(
         email=request.email,
         name=request.name,
@@ -1740,7 +1860,7 @@ async def setup_super_admin(request: SetupAdminRequest):
     except Exception as e:
         logging.error(f"Failed to create notification: {e}")
     
-    token = create_access_token({"user_id": user.id, "email": user.email})
+    token = create_access_token({"user_id": user.id, "email": user.email}, user)
     return {"user": user, "token": token, "message": "Super admin created successfully"}
 
 # Role Management Endpoints
@@ -1782,6 +1902,7 @@ async def create_role(role_data: RoleCreate, super_admin: User = Depends(get_sup
     role_doc = role.model_dump()
     role_doc['created_at'] = role_doc['created_at'].isoformat()
     await db.roles.insert_one(role_doc)
+    permission_registry.invalidate_roles()
     
     return role
 
@@ -1799,6 +1920,8 @@ async def update_role(role_id: str, role_data: RoleUpdate, super_admin: User = D
     update_data = {k: v for k, v in role_data.model_dump().items() if v is not None}
     if update_data:
         await db.roles.update_one({"id": role_id}, {"$set": update_data})
+        permission_registry.invalidate_roles()
+        user_cache_service.invalidate_all()
     
     updated_role = await db.roles.find_one({"id": role_id}, {"_id": 0})
     if isinstance(updated_role['created_at'], str):
@@ -1825,6 +1948,7 @@ async def delete_role(role_id: str, super_admin: User = Depends(get_super_admin_
         )
     
     await db.roles.delete_one({"id": role_id})
+    permission_registry.invalidate_roles()
     return {"message": "Role deleted successfully"}
 
 @api_router.get("/admin/permissions")
@@ -1858,6 +1982,8 @@ async def assign_role_to_user(request: AssignRoleRequest, super_admin: User = De
         {"id": request.user_id},
         {"$set": {"role": request.role, "permissions": permissions}}
     )
+    user_cache_service.invalidate(request.user_id)
+    await token_version_service.revoke(db, request.user_id)
     
     # Create notification
     try:
@@ -1916,9 +2042,26 @@ async def get_user_permissions(user_id: str, admin: User = Depends(get_admin_use
     return {
         "user_id": user_id,
         "role": user.get('role', 'user'),
-        "permissions": user.get('permissions', [])
+        "permissions": user.get('permissions', []),
+        "permission_mask": permission_registry.compile(user.get('permissions', [])),
+        "role_mask": await permission_registry.get_role_mask(db, user.get('role', 'user'))
     }
 
+@api_router.get("/admin/metrics/user-cache")
+async def get_user_cache_metrics(admin: User = Depends(get_admin_user)):
+    """Get authenticated-user cache hit/miss counters"""
+    return user_cache_service.get_stats()
+
+@api_router.get("/admin/metrics/password-hashing")
+async def get_password_hashing_metrics(admin: User = Depends(get_admin_user)):
+    """Get password worker pool queue depth and latency counters"""
+    return password_service.get_stats()
+
+@api_router.get("/admin/metrics/token-versions")
+async def get_token_version_metrics(admin: User = Depends(get_admin_user)):
+    """Get token revocation table counters"""
+    return token_version_service.get_stats()
+
 
 
 # Activity Log Endpoints
@@ -2101,6 +2244,7 @@ async def create_membership(
         doc['created_at'] = doc['created_at'].isoformat()
         
         await db.memberships.insert_one(doc)
+        family_service.invalidate_user(doc['user_id'])
         
         # Log activity
         await activity_log_service.log_activity(
@@ -2179,6 +2323,7 @@ async def create_membership_checkout(
                 "payment_status": "pending"
             }}
         )
+        family_service.invalidate_user(membership.get('user_id'))
         
         return {"checkout_url": session.url, "session_id": session.id}
         
@@ -2213,6 +2358,7 @@ async def get_membership_payment_status(
                         "status": "active"
                     }}
                 )
+                family_service.invalidate_user(membership.get('user_id'))
                 
                 # Log activity
                 await activity_log_service.log_activity(
@@ -2301,6 +2447,7 @@ async def update_membership_admin(
     
     if update_dict:
         await db.memberships.update_one({"id": membership_id}, {"$set": update_dict})
+        family_service.invalidate_user(membership.get('user_id'))
         
         # Log activity
         await activity_log_service.log_activity(
@@ -2313,6 +2460,8 @@ async def update_membership_admin(
         )
     
     updated = await db.memberships.find_one({"id": membership_id}, {"_id": 0})
+    if updated.get('user_id') != membership.get('user_id'):
+        family_service.invalidate_user(updated.get('user_id'))
     if isinstance(updated.get('start_date'), str):
         updated['start_date'] = datetime.fromisoformat(updated['start_date'])
     if isinstance(updated.get('end_date'), str):
@@ -2383,12 +2532,29 @@ async def get_team_standings(
     season: Optional[str] = None,
     user: User = Depends(get_current_user)
 ):
-    """Get team standings - Logged in users only"""
+    """
+    Get team standings - Logged in users only
+    
+    Each season is ranked by win percentage, then head-to-head record among
+    tied teams, point differential and points scored, with games back and
+    the current streak
+    """
     query = {}
     if season:
         query["season"] = season
     
-    standings = await db.team_standings.find(query, {"_id": 0}).sort("wins", -1).to_list(1000)
+    standings = await db.team_standings.find(query, {"_id": 0}).to_list(1000)
+    
+    by_team = {(team['season'], team['team_name']): team for team in standings}
+    for team_season in sorted({team['season'] for team in standings} | ({season} if season else set())):
+        for row in await standings_service.get_table(db, team_season):
+            team = by_team.setdefault((team_season, row['team_name']), {"season": team_season})
+            team.update(row)
+    
+    standings = sorted(
+        by_team.values(),
+        key=lambda team: (team['season'], team.get('rank') or float('inf'), -team.get('wins', 0))
+    )
     
     result = []
     for team in standings:
@@ -2400,6 +2566,67 @@ async def get_team_standings(
     
     return result
 
+@api_router.get("/stats/advanced")
+async def get_advanced_stats(
+    season: Optional[str] = None,
+    team_name: Optional[str] = None,
+    sort_by: str = "efficiency",
+    order: str = "desc",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    user: User = Depends(get_current_user)
+):
+    """
+    Advanced player metrics table - Logged in users only
+    
+    Query Parameters:
+    - season / team_name: Filter rows
+    - sort_by: Any metric in ADVANCED_METRICS (default: efficiency)
+    - order: asc or desc (default: desc)
+    - limit: Page size (max 200)
+    - cursor: next_cursor from the previous page
+    """
+    if sort_by not in ADVANCED_METRICS:
+        sort_by = "efficiency"
+    direction = 1 if order == "asc" else -1
+    limit = max(1, min(limit, 200))
+    
+    query = {}
+    if season:
+        query["season"] = season
+    if team_name:
+        query["team_name"] = team_name
+    
+    try:
+        players, next_cursor = await paginate(
+            db.player_advanced_stats, query, [(sort_by, direction)], limit, cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {
+        "season": season,
+        "sort_by": sort_by,
+        "order": "asc" if direction == 1 else "desc",
+        "players": players,
+        "next_cursor": next_cursor
+    }
+
+@api_router.get("/stats/leaders/all")
+async def get_all_stat_leaders(
+    season: Optional[str] = None,
+    limit: int = 10,
+    user: User = Depends(get_current_user)
+):
+    """Get the leaders for every stat in one response, served from memory - Logged in users only"""
+    await leaderboard_service.ensure_loaded(db)
+    limit = max(1, min(limit, leaderboard_service.size))
+    return {
+        "season": season,
+        "limit": limit,
+        "leaders": leaderboard_service.all_leaders(season, limit)
+    }
+
 @api_router.get("/stats/leaders")
 async def get_stat_leaders(
     stat_type: str = "points",
@@ -2408,16 +2635,19 @@ async def get_stat_leaders(
     user: User = Depends(get_current_user)
 ):
     """Get statistical leaders - Logged in users only"""
-    query = {}
-    if season:
-        query["season"] = season
-    
-    # Valid stat types
-    valid_stats = ["points", "assists", "rebounds", "steals", "blocks", "three_pointers_made"]
-    if stat_type not in valid_stats:
+    if stat_type not in LEADER_STATS:
         stat_type = "points"
     
-    leaders = await db.player_stats.find(query, {"_id": 0}).sort(stat_type, -1).limit(limit).to_list(limit)
+    if limit <= leaderboard_service.size:
+        await leaderboard_service.ensure_loaded(db)
+        leaders = leaderboard_service.leaders(stat_type, season, limit)
+    else:
+        # Deeper than the in-memory boards
+        query = {"season": season} if season else {}
+        leaders = await db.player_stats.find(query, {"_id": 0})\
+            .sort(LEADER_STATS[stat_type], -1)\
+            .limit(limit)\
+            .to_list(limit)
     
     return {
         "stat_type": stat_type,
@@ -2456,6 +2686,8 @@ async def create_player_stats(
         doc['updated_at'] = doc['updated_at'].isoformat()
         
         await db.player_stats.insert_one(doc)
+        leaderboard_service.upsert_player(doc)
+        await advanced_stats_service.refresh_teams(db, [(doc['season'], doc['team_name'])])
         
         # Log activity
         await activity_log_service.log_activity(
@@ -2472,6 +2704,8 @@ async def create_player_stats(
     except CustomHTTPException:
         raise
     except Exception as e:
+        if is_duplicate_key(e):
+            raise conflict_error("player_stats", "Player stats already exist for this season")
         logging.error(f"Error creating player stats: {e}")
         raise server_error("Failed to create player stats")
 
@@ -2503,6 +2737,11 @@ async def update_player_stats(
         )
     
     updated = await db.player_stats.find_one({"id": player_id}, {"_id": 0})
+    leaderboard_service.upsert_player(updated)
+    await advanced_stats_service.refresh_teams(db, [
+        (player.get('season'), player.get('team_name')),
+        (updated.get('season'), updated.get('team_name'))
+    ])
     if isinstance(updated.get('created_at'), str):
         updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     if isinstance(updated.get('updated_at'), str):
@@ -2525,10 +2764,12 @@ async def create_game_stats(
         
         await db.game_stats.insert_one(doc)
         
-        # Update team standings
-        await update_team_standings(game_data.home_team, game_data.away_team, 
-                                    game_data.home_score, game_data.away_score, 
-                                    game_data.season)
+        # Update team standings; undo the insert if that fails so the two stay in step
+        try:
+            await standings_service.apply_game(db, doc)
+        except Exception:
+            await db.game_stats.delete_one({"id": game.id})
+            raise
         
         # Log activity
         await activity_log_service.log_activity(
@@ -2543,9 +2784,67 @@ async def create_game_stats(
         return game
         
     except Exception as e:
+        if is_duplicate_key(e):
+            raise conflict_error("game_stats", "This game is already recorded")
         logging.error(f"Error creating game stats: {e}")
         raise server_error("Failed to create game stats")
 
+@api_router.post("/admin/stats/box-scores")
+async def ingest_box_scores(
+    request: Request,
+    admin: User = Depends(get_admin_user)
+):
+    """
+    Upload whole box scores (games plus every player's line) as JSON or CSV - Admin only
+    
+    The batch is validated in one pass and rejected as a whole on any error.
+    A valid batch is written as one games insert, one bulk upsert of player
+    season totals and one standings update.
+    """
+    started = time.perf_counter()
+    body = await request.body()
+    try:
+        if "csv" in request.headers.get("content-type", ""):
+            box_scores = box_score_service.parse_csv(body.decode("utf-8"))
+        else:
+            box_scores = box_score_service.parse_json(json.loads(body or b"null"))
+    except ValueError as e:
+        raise validation_error([ValidationError(field="body", message=f"Could not parse box scores: {e}", code="invalid")])
+    
+    games, errors, warnings = box_score_service.validate(box_scores)
+    if not errors:
+        for existing in await box_score_service.find_existing(db, games):
+            errors.append(ValidationError(
+                field="game",
+                message=f"{existing['home_team']} vs {existing['away_team']} on {existing['game_date']} is already recorded ({existing['id']})",
+                code="exists"
+            ))
+    if errors:
+        raise validation_error(errors)
+    
+    try:
+        summary = await box_score_service.apply(db, games)
+    except Exception as e:
+        if is_duplicate_key(e):
+            # Another upload recorded one of these games after the check above
+            raise validation_error([ValidationError(
+                field="game",
+                message="One or more of these games is already recorded",
+                code="exists"
+            )])
+        logging.error(f"Error ingesting box scores: {e}")
+        raise server_error("Failed to ingest box scores")
+    
+    await activity_log_service.log_activity(
+        action="ingest_box_scores",
+        resource_type="stats",
+        user_id=admin.id,
+        user_email=admin.email,
+        details={k: v for k, v in summary.items() if k != "game_ids"}
+    )
+    
+    return {**summary, "warnings": warnings, "took_ms": round((time.perf_counter() - started) * 1000, 1)}
+
 @api_router.delete("/admin/stats/players/{player_id}")
 async def delete_player_stats(
     player_id: str,
@@ -2557,6 +2856,8 @@ async def delete_player_stats(
         raise not_found_error("Player stats", player_id)
     
     await db.player_stats.delete_one({"id": player_id})
+    leaderboard_service.remove_player(player_id)
+    await advanced_stats_service.refresh_teams(db, [(player.get('season'), player.get('team_name'))])
     
     # Log activity
     await activity_log_service.log_activity(
@@ -2575,12 +2876,13 @@ async def delete_game_stats(
     game_id: str,
     admin: User = Depends(get_admin_user)
 ):
-    """Delete game statistics - Admin only"""
-    game = await db.game_stats.find_one({"id": game_id}, {"_id": 0})
+    """Delete game statistics and take the result out of the standings - Admin only"""
+    game = await db.game_stats.find_one_and_delete({"id": game_id}, {"_id": 0})
     if not game:
         raise not_found_error("Game stats", game_id)
     
-    await db.game_stats.delete_one({"id": game_id})
+    await standings_service.reverse_game(db, game)
+    await box_score_service.reverse_games(db, [game])
     
     # Log activity
     await activity_log_service.log_activity(
@@ -2594,65 +2896,166 @@ async def delete_game_stats(
     
     return {"message": "Game stats deleted successfully"}
 
-# Helper function to update team standings
-async def update_team_standings(home_team: str, away_team: str, home_score: int, away_score: int, season: str):
-    """Update team standings based on game result"""
-    # Update home team
-    home_standing = await db.team_standings.find_one({"team_name": home_team, "season": season}, {"_id": 0})
-    if not home_standing:
-        home_standing = TeamStandings(team_name=home_team, season=season).model_dump()
-        home_standing['created_at'] = home_standing['created_at'].isoformat()
-        home_standing['updated_at'] = home_standing['updated_at'].isoformat()
-        await db.team_standings.insert_one(home_standing)
-    
-    # Update away team
-    away_standing = await db.team_standings.find_one({"team_name": away_team, "season": season}, {"_id": 0})
-    if not away_standing:
-        away_standing = TeamStandings(team_name=away_team, season=season).model_dump()
-        away_standing['created_at'] = away_standing['created_at'].isoformat()
-        away_standing['updated_at'] = away_standing['updated_at'].isoformat()
-        await db.team_standings.insert_one(away_standing)
-    
-    # Update records
-    if home_score > away_score:
-        # Home team wins
-        await db.team_standings.update_one(
-            {"team_name": home_team, "season": season},
-            {"$inc": {"wins": 1, "points_for": home_score, "points_against": away_score}}
-        )
-        await db.team_standings.update_one(
-            {"team_name": away_team, "season": season},
-            {"$inc": {"losses": 1, "points_for": away_score, "points_against": home_score}}
-        )
-    else:
-        # Away team wins
-        await db.team_standings.update_one(
-            {"team_name": away_team, "season": season},
-            {"$inc": {"wins": 1, "points_for": away_score, "points_against": home_score}}
-        )
-        await db.team_standings.update_one(
-            {"team_name": home_team, "season": season},
-            {"$inc": {"losses": 1, "points_for": home_score, "points_against": away_score}}
-        )
+@api_router.put("/admin/stats/games/{game_id}", response_model=GameStats)
+async def update_game_stats(
+    game_id: str,
+    update_data: GameStatsUpdate,
+    admin: User = Depends(get_admin_user)
+):
+    """Edit a game and move the standings from its old result to the new one - Admin only"""
+    update_dict = {k: v for k, v in update_data.model_dump().items() if v is not None}
+    
+    # Uploaded box scores added their lines to player totals; those fields can only change by re-uploading
+    locked = sorted(set(update_dict) & BOX_SCORE_LOCKED_FIELDS)
+    if locked and await db.game_stats.count_documents({"id": game_id, "player_totals_applied": True}, limit=1):
+        raise validation_error([
+            ValidationError(
+                field=field,
+                message="This game came from a box score upload; delete it and upload the corrected box score",
+                code="box_score_game"
+            )
+            for field in locked
+        ])
+    update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
+    
+    old_game = await db.game_stats.find_one_and_update(
+        {"id": game_id}, {"$set": update_dict}, projection={"_id": 0}
+    )
+    if not old_game:
+        raise not_found_error("Game stats", game_id)
+    updated = {**old_game, **update_dict}
+    
+    await standings_service.replace_game(db, old_game, updated)
+    
+    await activity_log_service.log_activity(
+        action="update_game_stats",
+        resource_type="stats",
+        user_id=admin.id,
+        user_email=admin.email,
+        resource_id=game_id,
+        details={k: v for k, v in update_dict.items() if k != "player_stats"}
+    )
+    
+    for field in ('created_at', 'updated_at'):
+        if isinstance(updated.get(field), str):
+            updated[field] = datetime.fromisoformat(updated[field])
+    return GameStats(**updated)
+
+@api_router.post("/admin/stats/standings/recompute")
+async def recompute_standings(
+    season: str,
+    admin: User = Depends(get_admin_user)
+):
+    """Rebuild a season's standings from its games - Admin only"""
+    started = time.perf_counter()
+    result = await standings_service.recompute_season(db, season)
+    
+    await activity_log_service.log_activity(
+        action="recompute_standings",
+        resource_type="stats",
+        user_id=admin.id,
+        user_email=admin.email,
+        details=result
+    )
+    
+    return {**result, "took_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+@api_router.post("/admin/stats/advanced/refresh")
+async def refresh_advanced_stats(
+    season: Optional[str] = None,
+    admin: User = Depends(get_admin_user)
+):
+    """Rebuild advanced player metrics for a season, or every season - Admin only"""
+    result = await advanced_stats_service.refresh_all(db, season)
+    
+    await activity_log_service.log_activity(
+        action="refresh_advanced_stats",
+        resource_type="stats",
+        user_id=admin.id,
+        user_email=admin.email,
+        details=result
+    )
+    
+    return result
+
+@api_router.get("/admin/metrics/standings")
+async def get_standings_metrics(admin: User = Depends(get_admin_user)):
+    """Standings engine counters"""
+    return standings_service.get_stats()
+
+@api_router.get("/admin/metrics/leaderboards")
+async def get_leaderboard_metrics(admin: User = Depends(get_admin_user)):
+    """In-memory stat leader board sizes and reload counters"""
+    return leaderboard_service.get_stats()
+
+@api_router.get("/admin/metrics/box-scores")
+async def get_box_score_metrics(admin: User = Depends(get_admin_user)):
+    """Box score ingestion counters"""
+    return box_score_service.get_stats()
 
+@api_router.get("/admin/metrics/advanced-stats")
+async def get_advanced_stats_metrics(admin: User = Depends(get_admin_user)):
+    """Advanced player metrics refresh counters"""
+    return advanced_stats_service.get_stats()
 
 # Event endpoints
+# Event list responses leave out internal conflict-index fields
+EVENT_LIST_PROJECTION = {"_id": 0, "start_minute": 0, "end_minute": 0}
+
 @api_router.get("/events", response_model=List[Event])
 async def get_events():
-    events = await db.events.find({}, {"_id": 0}).to_list(1000)
+    events = await db.events.find({}, EVENT_LIST_PROJECTION).to_list(1000)
+    events += await recurrence_service.load_occurrences(db)
     for event in events:
         if isinstance(event['created_at'], str):
             event['created_at'] = datetime.fromisoformat(event['created_at'])
     return events
 
-@api_router.get("/events/{event_id}", response_model=Event)
-async def get_event(event_id: str):
-    event = await db.events.find_one({"id": event_id}, {"_id": 0})
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    if isinstance(event['created_at'], str):
-        event['created_at'] = datetime.fromisoformat(event['created_at'])
-    return Event(**event)
+async def create_event_series(event_data: EventCreate, doc: Dict, admin: User) -> Event:
+    """Store a recurring event once as a series; occurrences are expanded on read"""
+    try:
+        rule = recurrence_service.build_rule(
+            event_data.recurrence_pattern,
+            event_data.date,
+            event_data.recurrence_end_date,
+            event_data.recurrence_days
+        )
+    except ValueError as e:
+        raise validation_error([ValidationError(field="recurrence_pattern", message=str(e), code="invalid_recurrence")])
+    
+    doc['event_type'] = "recurring"
+    series = recurrence_service.build_series(doc, rule)
+    
+    if event_data.end_time:
+        # Every occurrence up to the rule's end date is checked; open-ended series are
+        # checked for their first DEFAULT_HORIZON_DAYS (see RecurrenceService.expand)
+        conflicts = await calendar_service.find_conflicts_bulk(
+            db,
+            event_data.location,
+            recurrence_service.expand(series)
+        )
+        if conflicts:
+            raise CustomHTTPException(
+                status_code=409,
+                error="scheduling_conflict",
+                message="Event series conflicts with existing events at this location and time",
+                details={"conflicts": conflicts[:50], "conflict_count": len(conflicts)}
+            )
+    
+    await db.event_series.insert_one(series)
+    # A series touches many days; drop cached occupancy rather than marking each one
+    facility_availability_service.invalidate_all()
+    
+    await activity_log_service.log_activity(
+        action="create_event_series",
+        resource_type="event",
+        user_id=admin.id,
+        user_email=admin.email,
+        resource_id=series['id'],
+        details={"title": event_data.title, "rrule": series['rrule']}
+    )
+    
+    return Event(**doc)
 
 @api_router.post("/events", response_model=Event)
 async def create_event(event_data: EventCreate, admin: User = Depends(get_admin_user)):
@@ -2660,29 +3063,15 @@ async def create_event(event_data: EventCreate, admin: User = Depends(get_admin_
     try:
         # Create base event
         event = Event(**event_data.model_dump())
-        doc = event.model_dump()
+        doc = calendar_service.with_time_bounds(event.model_dump())
         doc['created_at'] = doc['created_at'].isoformat()
         
-        # Check for conflicts if end_time provided
-        if event_data.end_time:
-            all_events = await db.events.find({}, {"_id": 0}).to_list(1000)
-            has_conflict = calendar_service.check_event_conflict(
-                event_data.location,
-                event_data.date,
-                event_data.time,
-                event_data.end_time,
-                all_events
-            )
-            if has_conflict:
-                raise CustomHTTPException(
-                    status_code=409,
-                    error="scheduling_conflict",
-                    message="Event conflicts with existing event at this location and time"
-                )
-        
-        await db.events.insert_one(doc)
+        if event_data.event_type == "recurring" and event_data.recurrence_pattern and event_data.store_as_series:
+            return await create_event_series(event_data, doc, admin)
         
         # Generate recurring events if specified
+        recurring_events = []
+        generation_started = time.perf_counter()
         if event_data.event_type == "recurring" and event_data.recurrence_pattern and event_data.recurrence_end_date:
             recurring_events = calendar_service.generate_recurring_events(
                 doc,
@@ -2691,12 +3080,37 @@ async def create_event(event_data: EventCreate, admin: User = Depends(get_admin_
                 event_data.recurrence_pattern,
                 event_data.recurrence_days
             )
-            
-            # Insert all recurring instances
-            if recurring_events:
-                for rec_event in recurring_events:
-                    rec_event['created_at'] = datetime.now(timezone.utc).isoformat()
-                await db.events.insert_many(recurring_events)
+        
+        # Check the base event and every recurring instance for conflicts if end_time provided
+        if event_data.end_time:
+            conflicts = await calendar_service.find_conflicts_bulk(
+                db,
+                event_data.location,
+                [doc] + recurring_events
+            )
+            if conflicts:
+                raise CustomHTTPException(
+                    status_code=409,
+                    error="scheduling_conflict",
+                    message="Event conflicts with existing event at this location and time",
+                    details={"conflicts": conflicts[:50], "conflict_count": len(conflicts)}
+                )
+        
+        for scheduled in [doc] + recurring_events:
+            search_service.with_search_terms("events", scheduled)
+        await db.events.insert_one(doc)
+        
+        # Insert all recurring instances
+        instance_count = 0
+        if recurring_events:
+            instance_count = await calendar_service.insert_instances(db.events, recurring_events)
+        for scheduled in [doc] + recurring_events:
+            reminder_scheduler.schedule(scheduled)
+            facility_availability_service.record_event(scheduled)
+            search_service.index_document("events", scheduled)
+        generation_ms = round((time.perf_counter() - generation_started) * 1000, 1)
+        if instance_count:
+            logging.info(f"Created {instance_count} recurring instances for event {event.id} in {generation_ms} ms")
         
         # Log activity
         await activity_log_service.log_activity(
@@ -2708,7 +3122,9 @@ async def create_event(event_data: EventCreate, admin: User = Depends(get_admin_
             details={
                 "title": event_data.title,
                 "date": event_data.date,
-                "recurring": event_data.event_type == "recurring"
+                "recurring": event_data.event_type == "recurring",
+                "instance_count": instance_count,
+                "generation_ms": generation_ms
             }
         )
         
@@ -2726,19 +3142,31 @@ async def update_event(event_id: str, event_data: EventCreate, admin: User = Dep
     if not existing:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    updated_doc = event_data.model_dump()
+    updated_doc = calendar_service.with_time_bounds(event_data.model_dump(exclude={"store_as_series"}))
+    updated_doc['updated_at'] = datetime.now(timezone.utc).isoformat()
+    search_service.with_search_terms("events", updated_doc)
+    # A rescheduled event gets a fresh reminder
+    if (updated_doc['date'], updated_doc['time']) != (existing.get('date'), existing.get('time')):
+        updated_doc['reminder_sent'] = False
     await db.events.update_one({"id": event_id}, {"$set": updated_doc})
     
     event = await db.events.find_one({"id": event_id}, {"_id": 0})
+    reminder_scheduler.schedule(event)
+    search_service.index_document("events", event)
+    facility_availability_service.release_event(existing)
+    facility_availability_service.release_event(event)
     if isinstance(event['created_at'], str):
         event['created_at'] = datetime.fromisoformat(event['created_at'])
     return Event(**event)
 
 @api_router.delete("/events/{event_id}")
 async def delete_event(event_id: str, admin: User = Depends(get_admin_user)):
-    result = await db.events.delete_one({"id": event_id})
-    if result.deleted_count == 0:
+    event = await db.events.find_one_and_delete({"id": event_id}, {"_id": 0})
+    if not event:
         raise HTTPException(status_code=404, detail="Event not found")
+    reminder_scheduler.cancel(event_id)
+    facility_availability_service.release_event(event)
+    search_service.remove_document("events", event_id)
     return {"message": "Event deleted"}
 
 # Facility endpoints
@@ -2751,21 +3179,28 @@ async def filter_events(
     tags: Optional[str] = None,  # Comma-separated
     location: Optional[str] = None,
     start_date: Optional[str] = None,
-    end_date: Optional[str] = None
+    end_date: Optional[str] = None,
+    limit: int = 500
 ):
     """Filter events by various criteria"""
-    all_events = await db.events.find({}, {"_id": 0}).to_list(1000)
-    
     tag_list = tags.split(',') if tags else None
     
-    filtered = calendar_service.filter_events(
-        all_events,
+    query = calendar_service.build_event_filter(
         category=category,
         tags=tag_list,
         location=location,
         start_date=start_date,
         end_date=end_date
     )
+    limit = max(1, min(limit, 1000))
+    filtered = await db.events.find(query, EVENT_LIST_PROJECTION)\
+        .sort([("date", 1), ("time", 1)])\
+        .limit(limit)\
+        .to_list(length=limit)
+    
+    series_query = calendar_service.build_event_filter(category=category, tags=tag_list, location=location)
+    filtered += await recurrence_service.load_occurrences(db, series_query, start_date, end_date)
+    filtered = sorted(filtered, key=lambda e: (e.get('date', ''), e.get('time', '')))[:limit]
     
     result = []
     for event in filtered:
@@ -2776,10 +3211,19 @@ async def filter_events(
     return result
 
 @api_router.get("/events/upcoming")
-async def get_upcoming_events(days: int = 7):
+async def get_upcoming_events(days: int = 7, limit: int = 500):
     """Get events happening in the next N days"""
-    all_events = await db.events.find({}, {"_id": 0}).to_list(1000)
-    upcoming = calendar_service.get_upcoming_events(all_events, days)
+    limit = max(1, min(limit, 1000))
+    upcoming_filter = calendar_service.build_upcoming_filter(days)
+    upcoming = await db.events.find(
+        upcoming_filter,
+        EVENT_LIST_PROJECTION
+    ).sort([("date", 1), ("time", 1)]).limit(limit).to_list(length=limit)
+    
+    upcoming += await recurrence_service.load_occurrences(
+        db, None, upcoming_filter["date"]["$gte"], upcoming_filter["date"]["$lte"]
+    )
+    upcoming = sorted(upcoming, key=lambda e: (e.get('date', ''), e.get('time', '')))[:limit]
     
     result = []
     for event in upcoming:
@@ -2791,61 +3235,44 @@ async def get_upcoming_events(days: int = 7):
 
 @api_router.get("/events/export/ical")
 async def export_calendar_ical(
+    request: Request,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     user: User = Depends(get_current_user)
 ):
     """Export calendar in iCal format"""
-    query = {}
-    if start_date:
-        query["date"] = {"$gte": start_date}
-    if end_date:
-        if "date" in query:
-            query["date"]["$lte"] = end_date
-        else:
-            query["date"] = {"$lte": end_date}
-    
-    events = await db.events.find(query, {"_id": 0}).to_list(1000)
-    ical_content = calendar_service.generate_ical(events)
-    
-    from fastapi.responses import Response
-    return Response(
-        content=ical_content,
+    query = calendar_service.build_event_filter(start_date=start_date, end_date=end_date)
+    series_query = recurrence_service.series_window_filter("events", start_date, end_date)
+    
+    etag = await calendar_service.ical_etag(db, query, series_query)
+    headers = {
+        "Content-Disposition": "attachment; filename=mnase_calendar.ics",
+        "ETag": etag,
+        "Cache-Control": "private, no-cache"
+    }
+    if calendar_service.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    
+    cached = calendar_service.ical_cache.get(etag)
+    if cached is not None:
+        return Response(content=cached, media_type="text/calendar", headers=headers)
+    
+    # Series are exported once with their RRULE rather than as expanded occurrences
+    cursors = [
+        db.events.find(query, {"_id": 0}).sort([("date", 1), ("time", 1), ("id", 1)]).batch_size(500),
+        db.event_series.find(series_query, {"_id": 0}).sort("id", 1)
+    ]
+    return StreamingResponse(
+        calendar_service.stream_ical(cursors, cache_key=etag),
         media_type="text/calendar",
-        headers={
-            "Content-Disposition": "attachment; filename=mnase_calendar.ics"
-        }
+        headers=headers
     )
 
 @api_router.post("/admin/events/send-reminders")
 async def send_event_reminders(admin: User = Depends(get_admin_user)):
-    """Send reminders for upcoming events - Admin only"""
+    """Send due event reminders now - Admin only (the background scheduler also sends them)"""
     try:
-        all_events = await db.events.find({}, {"_id": 0}).to_list(1000)
-        reminders_sent = 0
-        
-        for event in all_events:
-            if calendar_service.should_send_reminder(event, hours_before=24):
-                # Get registered users for this event (if applicable)
-                # For now, send to all users or implement registration tracking
-                
-                # Mark reminder as sent
-                await db.events.update_one(
-                    {"id": event['id']},
-                    {"$set": {"reminder_sent": True}}
-                )
-                
-                reminders_sent += 1
-                
-                # Log activity
-                await activity_log_service.log_activity(
-                    action="send_event_reminder",
-                    resource_type="event",
-                    user_id=admin.id,
-                    user_email=admin.email,
-                    resource_id=event['id'],
-                    details={"event_title": event['title'], "event_date": event['date']}
-                )
+        reminders_sent = await reminder_scheduler.send_now(db, actor={"id": admin.id, "email": admin.email})
         
         return {
             "message": f"Sent {reminders_sent} event reminders",
@@ -2856,6 +3283,11 @@ async def send_event_reminders(admin: User = Depends(get_admin_user)):
         logging.error(f"Error sending reminders: {e}")
         raise server_error("Failed to send reminders")
 
+@api_router.get("/admin/metrics/reminders")
+async def get_reminder_metrics(admin: User = Depends(get_admin_user)):
+    """Reminder scheduler queue and delivery counters"""
+    return reminder_scheduler.get_stats()
+
 @api_router.post("/events/{event_id}/check-conflict")
 async def check_event_conflict(
     event_id: str,
@@ -2866,24 +3298,82 @@ async def check_event_conflict(
     admin: User = Depends(get_admin_user)
 ):
     """Check if event would conflict with existing events"""
-    all_events = await db.events.find({}, {"_id": 0}).to_list(1000)
-    
-    has_conflict = calendar_service.check_event_conflict(
-        location,
-        date,
-        start_time,
-        end_time,
-        all_events,
-        exclude_event_id=event_id
-    )
+    try:
+        conflict = await calendar_service.find_conflict(
+            db,
+            location,
+            date,
+            start_time,
+            end_time,
+            exclude_event_id=event_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
-        "has_conflict": has_conflict,
+        "has_conflict": conflict is not None,
+        "conflicts_with": conflict,
         "location": location,
         "date": date,
         "time_range": f"{start_time} - {end_time}"
     }
 
+# Event series endpoints
+@api_router.get("/events/series/{series_id}/occurrences", response_model=List[Event])
+async def get_series_occurrences(
+    series_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+):
+    """Expand a stored event series for a date window"""
+    series = await db.event_series.find_one({"id": series_id}, {"_id": 0})
+    if not series:
+        raise HTTPException(status_code=404, detail="Event series not found")
+    
+    result = []
+    for occurrence in recurrence_service.expand(series, start_date, end_date):
+        if isinstance(occurrence.get('created_at'), str):
+            occurrence['created_at'] = datetime.fromisoformat(occurrence['created_at'])
+        result.append(Event(**occurrence))
+    return result
+
+@api_router.post("/events/series/{series_id}/exceptions")
+async def add_series_exception(series_id: str, date: str, admin: User = Depends(get_admin_user)):
+    """Cancel a single occurrence of an event series"""
+    if not ValidationUtils.validate_date_format(date):
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    
+    result = await db.event_series.update_one(
+        {"id": series_id},
+        {
+            "$addToSet": {"exdates": date},
+            "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}
+        }
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Event series not found")
+    facility_availability_service.invalidate_all()
+    return {"message": "Occurrence cancelled", "series_id": series_id, "date": date}
+
+@api_router.delete("/events/series/{series_id}")
+async def delete_event_series(series_id: str, admin: User = Depends(get_admin_user)):
+    """Delete an event series and all of its occurrences"""
+    result = await db.event_series.delete_one({"id": series_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Event series not found")
+    facility_availability_service.invalidate_all()
+    return {"message": "Event series deleted"}
+
+# Declared after the static /events/... routes so they are not captured as an event_id
+@api_router.get("/events/{event_id}", response_model=Event)
+async def get_event(event_id: str):
+    event = await db.events.find_one({"id": event_id}, {"_id": 0})
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    if isinstance(event['created_at'], str):
+        event['created_at'] = datetime.fromisoformat(event['created_at'])
+    return Event(**event)
+
 @api_router.get("/facilities", response_model=List[Facility])
 async def get_facilities():
     facilities = await db.facilities.find({}, {"_id": 0}).to_list(1000)
@@ -2906,7 +3396,8 @@ async def create_facility(facility_data: FacilityCreate, admin: User = Depends(g
     facility = Facility(**facility_data.model_dump())
     doc = facility.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    await db.facilities.insert_one(doc)
+    await db.facilities.insert_one(search_service.with_search_terms("facilities", doc))
+    search_service.index_document("facilities", doc)
     return facility
 
 @api_router.put("/facilities/{facility_id}", response_model=Facility)
@@ -2915,10 +3406,13 @@ async def update_facility(facility_id: str, facility_data: FacilityCreate, admin
     if not existing:
         raise HTTPException(status_code=404, detail="Facility not found")
     
-    updated_doc = facility_data.model_dump()
+    updated_doc = search_service.with_search_terms("facilities", facility_data.model_dump())
     await db.facilities.update_one({"id": facility_id}, {"$set": updated_doc})
+    if updated_doc['name'] != existing.get('name'):
+        facility_availability_service.invalidate_all()
     
     facility = await db.facilities.find_one({"id": facility_id}, {"_id": 0})
+    search_service.index_document("facilities", facility)
     if isinstance(facility['created_at'], str):
         facility['created_at'] = datetime.fromisoformat(facility['created_at'])
     return Facility(**facility)
@@ -2928,8 +3422,26 @@ async def delete_facility(facility_id: str, admin: User = Depends(get_admin_user
     result = await db.facilities.delete_one({"id": facility_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Facility not found")
+    facility_availability_service.invalidate_all()
+    search_service.remove_document("facilities", facility_id)
     return {"message": "Facility deleted"}
 
+@api_router.get("/facilities/{facility_id}/availability")
+async def get_facility_availability(facility_id: str, date: str):
+    """Free time windows for a facility on a date, in 15-minute slots"""
+    if not ValidationUtils.validate_date_format(date):
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    facility = await db.facilities.find_one({"id": facility_id}, {"_id": 0, "id": 1, "name": 1})
+    if not facility:
+        raise HTTPException(status_code=404, detail="Facility not found")
+    
+    masks = await facility_availability_service.load_day_masks(db, [facility], date)
+    return {
+        "facility_id": facility_id,
+        "date": date,
+        "free_windows": facility_availability_service.free_windows(masks[facility_id])
+    }
+
 # Registration endpoints
 @api_router.get("/registrations", response_model=List[Registration])
 async def get_registrations(user: User = Depends(get_current_user)):
@@ -3039,6 +3551,19 @@ async def create_booking_checkout(booking_data: BookingCreate, checkout_req: Che
     if not facility:
         raise HTTPException(status_code=404, detail="Facility not found")
     
+    if not ValidationUtils.validate_date_format(booking_data.booking_date):
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+    try:
+        start_minute, end_minute = facility_availability_service.parse_range(
+            booking_data.start_time, booking_data.end_time
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not await facility_availability_service.is_free(
+        db, facility, booking_data.booking_date, start_minute, end_minute
+    ):
+        raise conflict_error("booking", "Facility is already booked for part of that time")
+    
     total_cost = facility['hourly_rate'] * booking_data.hours
     
     booking = Booking(
@@ -3052,6 +3577,16 @@ async def create_booking_checkout(booking_data: BookingCreate, checkout_req: Che
         payment_status="pending"
     )
     
+    # Hold the slot before creating the Stripe session so a concurrent checkout sees it
+    booking_doc = booking.model_dump()
+    booking_doc['created_at'] = booking_doc['created_at'].isoformat()
+    await db.bookings.insert_one(booking_doc)
+    facility_availability_service.record_booking(booking_doc)
+    if not await facility_availability_service.holds_slot(db, booking_doc):
+        await db.bookings.delete_one({"id": booking.id})
+        facility_availability_service.release_booking(booking_doc)
+        raise conflict_error("booking", "Facility is already booked for part of that time")
+    
     # Create Stripe checkout
     webhook_url = f"{checkout_req.origin_url}/api/webhook/stripe"
     stripe_checkout = StripeCheckout(api_key=STRIPE_API_KEY, webhook_url=webhook_url)
@@ -3072,13 +3607,16 @@ async def create_booking_checkout(booking_data: BookingCreate, checkout_req: Che
         }
     )
     
-    session = await stripe_checkout.create_checkout_session(checkout_request)
-    booking.checkout_session_id = session.session_id
-    
-    # Save booking
-    booking_doc = booking.model_dump()
-    booking_doc['created_at'] = booking_doc['created_at'].isoformat()
-    await db.bookings.insert_one(booking_doc)
+    try:
+        session = await stripe_checkout.create_checkout_session(checkout_request)
+    except Exception:
+        await db.bookings.delete_one({"id": booking.id})
+        facility_availability_service.release_booking(booking_doc)
+        raise
+    await db.bookings.update_one(
+        {"id": booking.id},
+        {"$set": {"checkout_session_id": session.session_id}}
+    )
     
     # Save payment transaction
     payment_txn = PaymentTransaction(
@@ -3120,6 +3658,14 @@ async def get_booking_status(session_id: str, user: User = Depends(get_current_u
                 {"checkout_session_id": session_id},
                 {"$set": {"payment_status": "completed"}}
             )
+        elif status.status == "expired":
+            booking = await db.bookings.find_one_and_update(
+                {"checkout_session_id": session_id, "payment_status": "pending"},
+                {"$set": {"payment_status": "expired"}},
+                projection={"_id": 0, "facility_id": 1, "booking_date": 1}
+            )
+            if booking:
+                facility_availability_service.release_booking(booking)
     
     return status
 
@@ -3149,6 +3695,8 @@ async def update_user_role(user_id: str, role: str, admin: User = Depends(get_ad
     result = await db.users.update_one({"id": user_id}, {"$set": {"role": role}})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    user_cache_service.invalidate(user_id)
+    await token_version_service.revoke(db, user_id)
     return {"message": f"User role updated to {role}"}
 
 # Program endpoints
@@ -3183,7 +3731,8 @@ async def create_program(program_data: ProgramCreate, admin: User = Depends(get_
     program = Program(**program_data.model_dump())
     doc = program.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    await db.programs.insert_one(doc)
+    await db.programs.insert_one(search_service.with_search_terms("programs", doc))
+    search_service.index_document("programs", doc)
     return program
 
 @api_router.put("/programs/{program_id}", response_model=Program)
@@ -3192,10 +3741,11 @@ async def update_program(program_id: str, program_data: ProgramCreate, admin: Us
     if not existing:
         raise HTTPException(status_code=404, detail="Program not found")
     
-    updated_doc = program_data.model_dump()
+    updated_doc = search_service.with_search_terms("programs", program_data.model_dump())
     await db.programs.update_one({"id": program_id}, {"$set": updated_doc})
     
     program = await db.programs.find_one({"id": program_id}, {"_id": 0})
+    search_service.index_document("programs", program)
     if isinstance(program['created_at'], str):
         program['created_at'] = datetime.fromisoformat(program['created_at'])
     return Program(**program)
@@ -3205,6 +3755,7 @@ async def delete_program(program_id: str, admin: User = Depends(get_admin_user))
     result = await db.programs.delete_one({"id": program_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Program not found")
+    search_service.remove_document("programs", program_id)
     return {"message": "Program deleted"}
 
 # Division endpoints
@@ -3336,8 +3887,12 @@ async def update_membership(membership_id: str, membership_data: MembershipCreat
     
     updated_doc = membership_data.model_dump()
     await db.memberships.update_one({"id": membership_id}, {"$set": updated_doc})
+    family_service.invalidate_user(existing.get('user_id'))
     
     membership = await db.memberships.find_one({"id": membership_id}, {"_id": 0})
+    # The update may have moved the membership to another user
+    if membership.get('user_id') != existing.get('user_id'):
+        family_service.invalidate_user(membership.get('user_id'))
     if isinstance(membership['created_at'], str):
         membership['created_at'] = datetime.fromisoformat(membership['created_at'])
     return Membership(**membership)
@@ -3347,6 +3902,7 @@ async def delete_membership(membership_id: str, admin: User = Depends(get_admin_
     result = await db.memberships.delete_one({"id": membership_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Membership not found")
+    family_service.invalidate_all()
     return {"message": "Membership deleted"}
 
 # User Memberships
@@ -3567,6 +4123,7 @@ async def create_adult_registration(registration_data: AdultRegistrationCreate,
     doc = registration.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.adult_registrations.insert_one(doc)
+    family_service.invalidate_user(current_user.id)
     
     # Send confirmation email
     try:
@@ -3589,7 +4146,8 @@ async def create_team(team_data: TeamCreate, admin: User = Depends(get_admin_use
     team = Team(**team_data.model_dump())
     doc = team.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    await db.teams.insert_one(doc)
+    await db.teams.insert_one(search_service.with_search_terms("teams", doc))
+    search_service.index_document("teams", doc)
     return team
 
 @api_router.get("/admin/teams", response_model=List[Team])
@@ -3607,9 +4165,10 @@ async def update_team(team_id: str, team_data: TeamCreate, admin: User = Depends
     
     await db.teams.update_one(
         {"id": team_id},
-        {"$set": team_data.model_dump()}
+        {"$set": search_service.with_search_terms("teams", team_data.model_dump())}
     )
     updated = await db.teams.find_one({"id": team_id}, {"_id": 0})
+    search_service.index_document("teams", updated)
     return Team(**updated)
 
 @api_router.delete("/admin/teams/{team_id}")
@@ -3618,6 +4177,7 @@ async def delete_team(team_id: str, admin: User = Depends(get_admin_user)):
     result = await db.teams.delete_one({"id": team_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Team not found")
+    search_service.remove_document("teams", team_id)
     return {"message": "Team deleted successfully"}
 
 @api_router.post("/admin/teams/{team_id}/players")
@@ -3653,6 +4213,7 @@ async def add_player_to_team(team_id: str, player_data: AddPlayerToTeam, admin:
         {"id": team_id},
         {"$push": {"players": player}}
     )
+    await search_service.reindex_document(db, "teams", team_id)
     
     return {"message": "Player added to team successfully"}
 
@@ -3665,6 +4226,7 @@ async def remove_player_from_team(team_id: str, player_id: str, admin: User = De
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Team not found")
+    await search_service.reindex_document(db, "teams", team_id)
     return {"message": "Player removed from team successfully"}
 
 @api_router.get("/teams", response_model=List[Team])
@@ -3711,6 +4273,7 @@ async def update_adult_registration_status(registration_id: str, status: str, ad
         {"id": registration_id},
         {"$set": {"status": status}}
     )
+    family_service.invalidate_user(registration['user_id'])
     
     # Create notification
     participant_name = registration['participant_name']
@@ -3768,6 +4331,7 @@ async def create_enhanced_registration(registration_data: EnhancedRegistrationCr
     doc = registration.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
     await db.enhanced_registrations.insert_one(doc)
+    family_service.invalidate_user(current_user.id)
     
     # Send confirmation email
     athlete_full_name = f"{registration_data.athlete_first_name} {registration_data.athlete_last_name}"
@@ -3811,6 +4375,7 @@ async def update_enhanced_registration_status(registration_id: str, status: str,
         {"id": registration_id},
         {"$set": {"status": status}}
     )
+    family_service.invalidate_user(registration['user_id'])
     
     # Create notification
     athlete_name = f"{registration['athlete_first_name']} {registration['athlete_last_name']}"
@@ -3883,6 +4448,7 @@ async def create_youth_registration_checkout(registration_id: str, checkout_req:
             "payment_status": "pending_payment"
         }}
     )
+    family_service.invalidate_user(registration['user_id'])
     
     # Save payment transaction
     payment_txn = PaymentTransaction(
@@ -3925,6 +4491,7 @@ async def get_youth_registration_payment_status(session_id: str, user: User = De
                 {"checkout_session_id": session_id},
                 {"$set": {"payment_status": "paid"}}
             )
+            family_service.invalidate_user(user.id)
     
     return status
 
@@ -3975,6 +4542,7 @@ async def create_adult_registration_checkout(registration_id: str, checkout_req:
             "payment_status": "pending_payment"
         }}
     )
+    family_service.invalidate_user(registration['user_id'])
     
     # Save payment transaction
     payment_txn = PaymentTransaction(
@@ -4017,6 +4585,7 @@ async def get_adult_registration_payment_status(session_id: str, user: User = De
                 {"checkout_session_id": session_id},
                 {"$set": {"payment_status": "paid"}}
             )
+            family_service.invalidate_user(user.id)
     
     return status
 
@@ -4149,6 +4718,7 @@ async def update_sponsorship_inquiry_status(inquiry_id: str, status: str, admin:
 async def get_calendar_events():
     """Get all calendar events"""
     events = await db.calendar_events.find({}, {"_id": 0}).to_list(length=None)
+    events += await recurrence_service.load_occurrences(db, collection="calendar_events")
     return [CalendarEvent(**event) for event in events]
 
 @api_router.post("/admin/calendar-events", response_model=CalendarEvent)
@@ -4157,7 +4727,8 @@ async def create_calendar_event(event_data: CalendarEventCreate, admin: User = D
     event = CalendarEvent(**event_data.model_dump())
     doc = event.model_dump()
     doc['created_at'] = doc['created_at'].isoformat()
-    await db.calendar_events.insert_one(doc)
+    await db.calendar_events.insert_one(search_service.with_search_terms("calendar_events", doc))
+    search_service.index_document("calendar_events", doc)
     return event
 
 @api_router.put("/admin/calendar-events/{event_id}", response_model=CalendarEvent)
@@ -4169,9 +4740,10 @@ async def update_calendar_event(event_id: str, event_data: CalendarEventCreate,
     
     await db.calendar_events.update_one(
         {"id": event_id},
-        {"$set": event_data.model_dump()}
+        {"$set": search_service.with_search_terms("calendar_events", event_data.model_dump())}
     )
     updated = await db.calendar_events.find_one({"id": event_id}, {"_id": 0})
+    search_service.index_document("calendar_events", updated)
     return CalendarEvent(**updated)
 
 @api_router.delete("/admin/calendar-events/{event_id}")
@@ -4180,6 +4752,7 @@ async def delete_calendar_event(event_id: str, admin: User = Depends(get_admin_u
     result = await db.calendar_events.delete_one({"id": event_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Calendar event not found")
+    search_service.remove_document("calendar_events", event_id)
     return {"message": "Calendar event deleted successfully"}
 
 
@@ -4225,6 +4798,7 @@ async def upload_profile_image(
             {"id": user.id},
             {"$set": {"profile_image": image_path}}
         )
+        user_cache_service.invalidate(user.id)
         
         # Get full URL
         image_url = image_service.get_image_url(image_path, "/uploads")
@@ -4260,6 +4834,7 @@ async def upload_team_logo(
             {"id": team_id},
             {"$set": {"logo": image_path}}
         )
+        await search_service.reindex_document(db, "teams", team_id)
         
         image_url = image_service.get_image_url(image_path, "/uploads")
         
@@ -4294,6 +4869,7 @@ async def upload_event_image(
             {"id": event_id},
             {"$set": {"image": image_path}}
         )
+        await search_service.reindex_document(db, "events", event_id)
         
         image_url = image_service.get_image_url(image_path, "/uploads")
         
@@ -4386,6 +4962,101 @@ async def delete_image(
 # SEARCH & FILTER ENDPOINTS
 # ============================================================================
 
+RELEVANCE_SORT = [("score", -1), ("id", 1)]
+
+# Largest page the per-type search endpoints return
+MAX_SEARCH_PAGE_SIZE = 200
+
+async def run_text_search(
+    source: str,
+    build_query,
+    search: Optional[str],
+    sort: Optional[str],
+    limit: Optional[int],
+    cursor: Optional[str] = None,
+    facets: bool = False
+):
+    """
+    Run a per-type search with keyset pagination
+    
+    When the content type's search index is built, the text part is answered
+    from the index and the remaining filters by MongoDB on the matching ids;
+    otherwise build_query(search) includes a regex text condition.
+    sort="relevance" orders by BM25 score. If nothing matches exactly, names
+    and titles within trigram similarity of the search are returned instead,
+    ordered by similarity. limit=None returns every match
+    without paging. With facets=True the facet counts of the whole match set
+    are computed by one $facet aggregation, concurrently with the page.
+    
+    Returns:
+        (results, engine, next_cursor, facet_counts) where engine is "index",
+        "fuzzy", the query planner's strategy ("text", "prefix", "regex") or "mongo"
+        when there is no search term, and facet_counts is None unless requested
+    
+    Raises:
+        InvalidCursorError: If the cursor does not belong to this sort
+    """
+    collection = db[SEARCH_SOURCES[source]["collection"]]
+    sort_params = search_service.parse_sort_param(sort)
+    
+    use_index = bool(search) and search_service.is_ready(source)
+    fuzzy = False
+    if use_index:
+        scores = search_service.score(source, search)
+        if not scores:
+            # Nothing matches exactly; fall back to names/titles that look like the search
+            scores = search_service.fuzzy_scores(source, search)
+            fuzzy = bool(scores)
+        if not scores:
+            query = {"id": {"$in": []}}
+        else:
+            query = build_query(None)
+            id_filter = {"id": {"$in": list(scores)}}
+            query = {"$and": [query, id_filter]} if query else id_filter
+    else:
+        query = build_query(search)
+    if use_index:
+        engine = "fuzzy" if fuzzy else "index"
+    else:
+        engine = search_service.text_strategy(source, search) if search else "mongo"
+    
+    page_task = fetch_search_page(
+        collection, query, scores if use_index else None, "relevance" if fuzzy else sort, sort_params, limit, cursor
+    )
+    if not facets:
+        results, next_cursor = await page_task
+        return results, engine, next_cursor, None
+    (results, next_cursor), facet_counts = await asyncio.gather(
+        page_task, search_service.facet_counts(db, source, query)
+    )
+    return results, engine, next_cursor, facet_counts
+
+async def fetch_search_page(collection, query: Dict, scores: Optional[Dict[str, float]], sort: Optional[str],
+                            sort_params, limit: Optional[int], cursor: Optional[str]):
+    """Fetch one page of a per-type search; scores are the index matches, if any"""
+    if scores is not None and not scores:
+        return [], None
+    
+    if limit is None:
+        results = await collection.find(query, SEARCH_PROJECTION).sort(sort_params).to_list(length=None)
+        return results, None
+    
+    if scores is not None and sort == "relevance":
+        # Ranked in memory; the cursor carries the last (score, id) seen
+        results = await collection.find(query, SEARCH_PROJECTION).to_list(length=None)
+        ranked = sorted(
+            ({**doc, "score": round(scores.get(doc.get("id"), 0.0), 4)} for doc in results),
+            key=lambda doc: (-doc["score"], doc.get("id") or "")
+        )
+        if cursor:
+            last_score, last_id = decode_cursor(cursor, RELEVANCE_SORT)
+            ranked = [doc for doc in ranked if (-doc["score"], doc.get("id") or "") > (-last_score, last_id)]
+        page = ranked[:limit]
+        next_cursor = encode_cursor(page[-1], RELEVANCE_SORT) if len(ranked) > limit else None
+        return page, next_cursor
+    
+    return await paginate(collection, query, sort_params, limit, cursor, SEARCH_PROJECTION)
+
 @api_router.get("/search/events")
 async def search_events(
     search: Optional[str] = None,
@@ -4396,7 +5067,9 @@ async def search_events(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     sort: Optional[str] = "date_asc",
-    limit: int = 50
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    facets: bool = False
 ):
     """
     Search and filter events
@@ -4409,27 +5082,33 @@ async def search_events(
     - location: Filter by location
     - min_price: Minimum price
     - max_price: Maximum price
-    - sort: Sort order (date_asc, date_desc, price_asc, price_desc, newest)
-    - limit: Maximum results (default 50)
+    - sort: Sort order (date_asc, date_desc, price_asc, price_desc, newest, relevance)
+    - limit: Maximum results (default 50, max 200)
+    - cursor: next_cursor from the previous page
+    - facets: Also return counts per facet and price bucket for all matches
     """
-    try:
-        query = search_service.build_event_search_query(
-            search=search,
-            event_type=event_type,
-            date_from=date_from,
-            date_to=date_to,
-            location=location,
-            min_price=min_price,
-            max_price=max_price
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+    async def compute():
+        events, engine, next_cursor, facet_counts = await run_text_search(
+            "events",
+            lambda term: search_service.build_event_search_query(
+                search=term,
+                event_type=event_type,
+                date_from=date_from,
+                date_to=date_to,
+                location=location,
+                min_price=min_price,
+                max_price=max_price
+            ),
+            search, sort, limit, cursor, facets
         )
         
-        sort_params = search_service.parse_sort_param(sort)
-        
-        events = await db.events.find(query, {"_id": 0}).sort(sort_params).limit(limit).to_list(length=limit)
-        
         return {
             "count": len(events),
             "results": events,
+            "next_cursor": next_cursor,
+            "facets": facet_counts,
+            "search_engine": engine,
             "filters_applied": {
                 "search": search,
                 "event_type": event_type,
@@ -4439,6 +5118,23 @@ async def search_events(
                 "price_range": f"{min_price}-{max_price}" if min_price or max_price else None
             }
         }
+    
+    try:
+        return await search_service.cached_response("events", ["events"], {
+            "search": search,
+            "event_type": event_type,
+            "date_from": date_from,
+            "date_to": date_to,
+            "location": location,
+            "min_price": min_price,
+            "max_price": max_price,
+            "sort": sort,
+            "limit": limit,
+            "cursor": cursor,
+            "facets": facets
+        }, compute)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -4451,7 +5147,9 @@ async def search_programs(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     sort: Optional[str] = "name_asc",
-    limit: int = 50
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    facets: bool = False
 ):
     """
     Search and filter programs
@@ -4463,26 +5161,32 @@ async def search_programs(
     - skill_level: Skill level filter (beginner, intermediate, advanced)
     - min_price: Minimum price
     - max_price: Maximum price
-    - sort: Sort order (name_asc, price_asc, newest)
-    - limit: Maximum results (default 50)
+    - sort: Sort order (name_asc, price_asc, newest, relevance)
+    - limit: Maximum results (default 50, max 200)
+    - cursor: next_cursor from the previous page
+    - facets: Also return counts per facet and price bucket for all matches
     """
-    try:
-        query = search_service.build_program_search_query(
-            search=search,
-            category=category,
-            age_group=age_group,
-            skill_level=skill_level,
-            min_price=min_price,
-            max_price=max_price
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+    async def compute():
+        programs, engine, next_cursor, facet_counts = await run_text_search(
+            "programs",
+            lambda term: search_service.build_program_search_query(
+                search=term,
+                category=category,
+                age_group=age_group,
+                skill_level=skill_level,
+                min_price=min_price,
+                max_price=max_price
+            ),
+            search, sort, limit, cursor, facets
         )
         
-        sort_params = search_service.parse_sort_param(sort)
-        
-        programs = await db.programs.find(query, {"_id": 0}).sort(sort_params).limit(limit).to_list(length=limit)
-        
         return {
             "count": len(programs),
             "results": programs,
+            "next_cursor": next_cursor,
+            "facets": facet_counts,
+            "search_engine": engine,
             "filters_applied": {
                 "search": search,
                 "category": category,
@@ -4491,6 +5195,22 @@ async def search_programs(
                 "price_range": f"{min_price}-{max_price}" if min_price or max_price else None
             }
         }
+    
+    try:
+        return await search_service.cached_response("programs", ["programs"], {
+            "search": search,
+            "category": category,
+            "age_group": age_group,
+            "skill_level": skill_level,
+            "min_price": min_price,
+            "max_price": max_price,
+            "sort": sort,
+            "limit": limit,
+            "cursor": cursor,
+            "facets": facets
+        }, compute)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -4499,6 +5219,9 @@ async def search_facilities(
     search: Optional[str] = None,
     facility_type: Optional[str] = None,
     amenities: Optional[str] = None,  # Comma-separated list
+    available_date: Optional[str] = None,
+    start_time: Optional[str] = None,
+    end_time: Optional[str] = None,
     sort: Optional[str] = "name_asc",
     limit: int = 50
 ):
@@ -4509,31 +5232,68 @@ async def search_facilities(
     - search: Text search across name, description, location
     - facility_type: Type of facility
     - amenities: Comma-separated list of required amenities
-    - sort: Sort order (name_asc, newest)
-    - limit: Maximum results (default 50)
+    - available_date: Only facilities with free time on this date (YYYY-MM-DD)
+    - start_time, end_time: With available_date, only facilities free for this whole range (HH:MM)
+    - sort: Sort order (name_asc, newest, relevance)
+    - limit: Maximum results (default 50, max 200)
     """
-    try:
-        amenities_list = amenities.split(",") if amenities else None
-        
-        query = search_service.build_facility_search_query(
-            search=search,
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+    amenities_list = amenities.split(",") if amenities else None
+    start_minute = end_minute = None
+    if available_date:
+        if not ValidationUtils.validate_date_format(available_date):
+            raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+        if start_time or end_time:
+            try:
+                start_minute, end_minute = facility_availability_service.parse_range(start_time, end_time)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+    
+    async def compute():
+        build_query = lambda term: search_service.build_facility_search_query(
+            search=term,
             facility_type=facility_type,
-            amenities=amenities_list
+            amenities=amenities_list,
+            available_date=available_date
         )
         
-        sort_params = search_service.parse_sort_param(sort)
-        
-        facilities = await db.facilities.find(query, {"_id": 0}).sort(sort_params).limit(limit).to_list(length=limit)
+        if available_date:
+            # Availability is checked against occupancy bitmaps, so limit after filtering
+            candidates, engine, _, _ = await run_text_search("facilities", build_query, search, sort, None)
+            facilities = (await facility_availability_service.find_available(
+                db, candidates, available_date, start_minute, end_minute
+            ))[:limit]
+        else:
+            facilities, engine, _, _ = await run_text_search("facilities", build_query, search, sort, limit)
         
         return {
             "count": len(facilities),
             "results": facilities,
+            "search_engine": engine,
             "filters_applied": {
                 "search": search,
                 "facility_type": facility_type,
-                "amenities": amenities_list
+                "amenities": amenities_list,
+                "available_date": available_date,
+                "start_time": start_time,
+                "end_time": end_time
             }
         }
+    
+    try:
+        if available_date:
+            # Occupancy depends on bookings, which do not bump search generations
+            return {**(await compute()), "cached": False}
+        return await search_service.cached_response("facilities", ["facilities"], {
+            "search": search,
+            "facility_type": facility_type,
+            "amenities": amenities,
+            "available_date": available_date,
+            "start_time": start_time,
+            "end_time": end_time,
+            "sort": sort,
+            "limit": limit
+        }, compute)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -4543,7 +5303,8 @@ async def search_teams(
     division: Optional[str] = None,
     age_group: Optional[str] = None,
     sort: Optional[str] = "name_asc",
-    limit: int = 50
+    limit: int = 50,
+    cursor: Optional[str] = None
 ):
     """
     Search and filter teams
@@ -4552,29 +5313,45 @@ async def search_teams(
     - search: Text search across team name, coach name
     - division: Division filter
     - age_group: Age group filter
-    - sort: Sort order (name_asc, newest)
-    - limit: Maximum results (default 50)
+    - sort: Sort order (name_asc, newest, relevance)
+    - limit: Maximum results (default 50, max 200)
+    - cursor: next_cursor from the previous page
     """
-    try:
-        query = search_service.build_team_search_query(
-            search=search,
-            division=division,
-            age_group=age_group
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+    async def compute():
+        teams, engine, next_cursor, _ = await run_text_search(
+            "teams",
+            lambda term: search_service.build_team_search_query(
+                search=term,
+                division=division,
+                age_group=age_group
+            ),
+            search, sort, limit, cursor
         )
         
-        sort_params = search_service.parse_sort_param(sort)
-        
-        teams = await db.teams.find(query, {"_id": 0}).sort(sort_params).limit(limit).to_list(length=limit)
-        
         return {
             "count": len(teams),
             "results": teams,
+            "next_cursor": next_cursor,
+            "search_engine": engine,
             "filters_applied": {
                 "search": search,
                 "division": division,
                 "age_group": age_group
             }
         }
+    
+    try:
+        return await search_service.cached_response("teams", ["teams"], {
+            "search": search,
+            "division": division,
+            "age_group": age_group,
+            "sort": sort,
+            "limit": limit,
+            "cursor": cursor
+        }, compute)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
@@ -4585,7 +5362,8 @@ async def search_calendar_events(
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
     sort: Optional[str] = "date_asc",
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
     """
     Search calendar events with filters
@@ -4595,18 +5373,21 @@ async def search_calendar_events(
     - event_type: Filter by type (program, tournament, camp, clinic, workshop, event)
     - date_from: Start date (YYYY-MM-DD)
     - date_to: End date (YYYY-MM-DD)
-    - sort: Sort order (date_asc, date_desc, newest)
-    - limit: Maximum results (default 100)
+    - sort: Sort order (date_asc, date_desc, newest, relevance)
+    - limit: Maximum results (default 100, max 200)
+    - cursor: next_cursor from the previous page
     """
-    try:
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+    def build_query(term: Optional[str]) -> Dict:
         query = {}
         conditions = []
         
         # Text search
-        if search:
+        if term:
             text_query = search_service.create_text_search_query(
-                search,
-                ["title", "description", "location"]
+                term,
+                ["title", "description", "location"],
+                "calendar_events"
             )
             conditions.append(text_query)
         
@@ -4625,14 +5406,16 @@ async def search_calendar_events(
         
         if conditions:
             query["$and"] = conditions
-        
-        sort_params = search_service.parse_sort_param(sort)
-        
-        events = await db.calendar_events.find(query, {"_id": 0}).sort(sort_params).limit(limit).to_list(length=limit)
+        return query
+    
+    async def compute():
+        events, engine, next_cursor, _ = await run_text_search("calendar_events", build_query, search, sort, limit, cursor)
         
         return {
             "count": len(events),
             "results": events,
+            "next_cursor": next_cursor,
+            "search_engine": engine,
             "filters_applied": {
                 "search": search,
                 "event_type": event_type,
@@ -4640,99 +5423,156 @@ async def search_calendar_events(
                 "date_to": date_to
             }
         }
+    
+    try:
+        return await search_service.cached_response("calendar", ["calendar_events"], {
+            "search": search,
+            "event_type": event_type,
+            "date_from": date_from,
+            "date_to": date_to,
+            "sort": sort,
+            "limit": limit,
+            "cursor": cursor
+        }, compute)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+# Fields matched by the MongoDB fallback while a search index is still being built
+GLOBAL_SEARCH_FALLBACK_FIELDS = {
+    "events": ["title", "description"],
+    "programs": ["name", "description"],
+    "facilities": ["name", "description"],
+    "teams": ["name", "coach_name"],
+    "calendar_events": ["title", "description"]
+}
+
+# Per-source time budget for global search; slower sources are reported and skipped
+GLOBAL_SEARCH_SOURCE_TIMEOUT = float(os.environ.get('GLOBAL_SEARCH_SOURCE_TIMEOUT_SECONDS', 2.0))
+
+async def search_global_source(source: str, search: str, limit: int):
+    """
+    Top `limit` scored results for one content type, from its index or MongoDB
+    
+    Returns:
+        (results, engine) where engine is "index", "fuzzy" or the query planner's strategy
+    """
+    if search_service.is_ready(source):
+        results = search_service.rank(source, search, limit)
+        if results:
+            return results, "index"
+        return search_service.rank_fuzzy(source, search, limit), "fuzzy"
+    
+    results = await db[SEARCH_SOURCES[source]["collection"]].find(
+        search_service.create_text_search_query(search, GLOBAL_SEARCH_FALLBACK_FIELDS[source], source),
+        SEARCH_PROJECTION
+    ).limit(limit).to_list(length=limit)
+    for result in results:
+        result["score"] = search_service.match_score(source, result, search)
+    results.sort(key=lambda result: -result["score"])
+    return results, search_service.text_strategy(source, search)
+
 @api_router.get("/search/global")
 async def global_search(search: str, limit: int = 20):
     """
     Global search across all content types
     
-    Returns results from events, programs, facilities, teams, and calendar
+    Queries events, programs, facilities, teams, and calendar concurrently,
+    each with its own timeout, and returns the `limit` most relevant results
+    overall with per-source timing
     """
-    try:
-        if not search or len(search) < 2:
-            raise HTTPException(status_code=400, detail="Search term must be at least 2 characters")
-        
-        # Search across all collections
-        pattern = re.compile(search, re.IGNORECASE)
-        
-        # Events
-        events = await db.events.find(
-            {"$or": [
-                {"title": {"$regex": pattern}},
-                {"description": {"$regex": pattern}}
-            ]},
-            {"_id": 0}
-        ).limit(limit).to_list(length=limit)
-        
-        # Programs
-        programs = await db.programs.find(
-            {"$or": [
-                {"name": {"$regex": pattern}},
-                {"description": {"$regex": pattern}}
-            ]},
-            {"_id": 0}
-        ).limit(limit).to_list(length=limit)
-        
-        # Facilities
-        facilities = await db.facilities.find(
-            {"$or": [
-                {"name": {"$regex": pattern}},
-                {"description": {"$regex": pattern}}
-            ]},
-            {"_id": 0}
-        ).limit(limit).to_list(length=limit)
-        
-        # Teams
-        teams = await db.teams.find(
-            {"$or": [
-                {"name": {"$regex": pattern}},
-                {"coach_name": {"$regex": pattern}}
-            ]},
-            {"_id": 0}
-        ).limit(limit).to_list(length=limit)
-        
-        # Calendar Events
-        calendar_events = await db.calendar_events.find(
-            {"$or": [
-                {"title": {"$regex": pattern}},
-                {"description": {"$regex": pattern}}
-            ]},
-            {"_id": 0}
-        ).limit(limit).to_list(length=limit)
-        
-        # Add type to each result
-        for event in events:
-            event["result_type"] = "event"
-        for program in programs:
-            program["result_type"] = "program"
-        for facility in facilities:
-            facility["result_type"] = "facility"
-        for team in teams:
-            team["result_type"] = "team"
-        for cal_event in calendar_events:
-            cal_event["result_type"] = "calendar_event"
-        
-        all_results = events + programs + facilities + teams + calendar_events
+    if not search or len(search) < 2:
+        raise HTTPException(status_code=400, detail="Search term must be at least 2 characters")
+    limit = max(1, min(limit, 100))
+    
+    async def compute():
+        async def timed(source: str):
+            started = time.perf_counter()
+            try:
+                results, engine = await asyncio.wait_for(
+                    search_global_source(source, search, limit),
+                    timeout=GLOBAL_SEARCH_SOURCE_TIMEOUT
+                )
+                status = "ok"
+            except asyncio.TimeoutError:
+                results, engine, status = [], None, "timeout"
+            except Exception as e:
+                logging.error(f"Global search failed for {source}: {e}")
+                results, engine, status = [], None, "error"
+            
+            # Add type to each result
+            for result in results:
+                result["result_type"] = SEARCH_SOURCES[source]["result_type"]
+            return source, results, {
+                "engine": engine,
+                "status": status,
+                "matched": len(results),
+                "ms": round((time.perf_counter() - started) * 1000, 2)
+            }
+        
+        sources = await asyncio.gather(*(timed(source) for source in GLOBAL_SEARCH_FALLBACK_FIELDS))
+        all_results = search_service.merge_top_k([results for _, results, _ in sources], limit)
+        
+        results_by_type = {source: 0 for source, _, _ in sources}
+        type_to_source = {config["result_type"]: source for source, config in SEARCH_SOURCES.items()}
+        for result in all_results:
+            results_by_type[type_to_source[result["result_type"]]] += 1
         
         return {
             "search_term": search,
             "total_count": len(all_results),
-            "results_by_type": {
-                "events": len(events),
-                "programs": len(programs),
-                "facilities": len(facilities),
-                "teams": len(teams),
-                "calendar_events": len(calendar_events)
-            },
+            "results_by_type": results_by_type,
+            "sources": {source: timing for source, _, timing in sources},
             "results": all_results
         }
+    
+    try:
+        # Responses missing a source that timed out or failed are not cached
+        return await search_service.cached_response(
+            "global", list(GLOBAL_SEARCH_FALLBACK_FIELDS), {"search": search, "limit": limit}, compute,
+            should_cache=lambda response: all(t["status"] == "ok" for t in response["sources"].values())
+        )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Global search failed: {str(e)}")
 
+@api_router.get("/search/suggest")
+async def search_suggest(q: str = "", limit: int = 10, types: Optional[str] = None):
+    """
+    Typeahead completions for event titles, program, team, coach and facility names
+    
+    Query Parameters:
+    - q: Text typed so far; matches the start of the name or of any later word
+    - limit: Maximum suggestions (default 10, max 25)
+    - types: Comma-separated subset of event, program, team, coach, facility
+    
+    Answered from memory without a database round trip.
+    """
+    started = time.perf_counter()
+    suggestions = search_service.suggest(
+        q,
+        limit=max(1, min(limit, 25)),
+        types=types.split(",") if types else None
+    )
+    return {
+        "query": q,
+        "suggestions": suggestions,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+@api_router.get("/admin/metrics/search-index")
+async def get_search_index_metrics(admin: User = Depends(get_admin_user)):
+    """Search index sizes and build times"""
+    return search_service.get_stats()
+
+@api_router.post("/admin/search/reindex")
+async def rebuild_search_index(admin: User = Depends(get_admin_user)):
+    """Rebuild every search index from the database"""
+    await search_service.build_all(db)
+    return {"message": "Search indexes rebuilt", "indexes": search_service.get_stats()}
+
 
 
 # ============================================================================
@@ -4824,7 +5664,8 @@ async def get_news_posts(
     category: Optional[str] = None,
     tag: Optional[str] = None,
     limit: int = 20,
-    skip: int = 0
+    skip: int = 0,
+    cursor: Optional[str] = None
 ):
     """
     Get news/blog posts with optional filters
@@ -4834,7 +5675,8 @@ async def get_news_posts(
     - category: Filter by category
     - tag: Filter by tag
     - limit: Maximum results (default: 20)
-    - skip: Skip results for pagination
+    - skip: Skip results for pagination (ignored when cursor is given)
+    - cursor: next_cursor from the previous page; prefer this over skip
     """
     try:
         query = {}
@@ -4848,11 +5690,16 @@ async def get_news_posts(
         if tag:
             query["tags"] = tag
         
-        posts = await db.news_posts.find(query, {"_id": 0})\
-            .sort([("published_at", -1), ("created_at", -1)])\
-            .skip(skip)\
-            .limit(limit)\
-            .to_list(length=limit)
+        sort_params = [("published_at", -1), ("created_at", -1)]
+        if cursor or not skip:
+            posts, next_cursor = await paginate(db.news_posts, query, sort_params, limit, cursor)
+        else:
+            posts = await db.news_posts.find(query, {"_id": 0})\
+                .sort(sort_params)\
+                .skip(skip)\
+                .limit(limit)\
+                .to_list(length=limit)
+            next_cursor = None
         
         # Convert datetime objects to strings
         for post in posts:
@@ -4869,8 +5716,11 @@ async def get_news_posts(
             "posts": posts,
             "total": total,
             "limit": limit,
-            "skip": skip
+            "skip": skip,
+            "next_cursor": next_cursor
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch news posts: {str(e)}")
 
@@ -5671,6 +6521,37 @@ async def get_all_faqs_admin(admin: User = Depends(get_admin_user)):
     return faqs
 
 
+@app.on_event("startup")
+async def start_background_services():
+    token_version_service.start(db)
+    try:
+        await token_version_service.ensure_indexes(db)
+        await calendar_service.ensure_indexes(db)
+        await recurrence_service.ensure_indexes(db)
+        await facility_availability_service.ensure_indexes(db)
+        await search_service.ensure_indexes(db)
+        await standings_service.ensure_indexes(db)
+        await box_score_service.ensure_indexes(db)
+        await advanced_stats_service.ensure_indexes(db)
+    except Exception as e:
+        logging.error(f"Failed to prepare event indexes: {e}")
+    reminder_scheduler.start(db)
+    search_service.start(db)
+    try:
+        await leaderboard_service.ensure_loaded(db)
+    except Exception as e:
+        logging.error(f"Failed to load stat leader boards: {e}")
+    leaderboard_service.start(db)
+    try:
+        await advanced_stats_service.ensure_materialized(db)
+    except Exception as e:
+        logging.error(f"Failed to build advanced player stats: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await token_version_service.stop()
+    await reminder_scheduler.stop()
+    await search_service.stop()
+    await leaderboard_service.stop()
+    client.close()
+    password_service.shutdown()
\ No newline at end of file
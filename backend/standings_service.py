@@ -0,0 +1,338 @@
+"""
+Standings Service for MNASE Basketball League
+Keeps team standings in step with game results using single-round-trip upserts
+"""
+
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from pymongo import ASCENDING, UpdateMany, UpdateOne
+
+from cache_utils import TTLLRUCache
+
+STANDING_COUNTERS = ("wins", "losses", "points_for", "points_against")
+
+# Game fields loaded as columns for the standings table
+GAME_COLUMNS = ("home_team", "away_team", "home_score", "away_score")
+
+
+def home_won(game: Dict[str, Any]) -> bool:
+    """Whether the home team won (a tie counts as an away win, as it always has)"""
+    return game["home_score"] > game["away_score"]
+
+
+def compute_table(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """
+    Build a ranked standings table from a season's games in chronological order
+
+    Every metric is computed over whole arrays: per-team counts with
+    ``bincount``, the head-to-head record as a team x team matrix and the
+    current streak from run boundaries over the games sorted by team.
+
+    Teams are ordered by win percentage, then head-to-head win percentage
+    among the teams tied with them, then point differential, then points
+    scored, then name.
+
+    Args:
+        columns: Lists keyed by GAME_COLUMNS, one entry per game, oldest first
+    """
+    if not columns.get("home_team"):
+        return []
+    names, sides = np.unique(
+        np.concatenate([np.asarray(columns["home_team"]), np.asarray(columns["away_team"])]),
+        return_inverse=True
+    )
+    n_teams = len(names)
+    n_games = len(columns["home_team"])
+    home, away = sides[:n_games], sides[n_games:]
+    home_score = np.asarray(columns["home_score"], dtype=np.int64)
+    away_score = np.asarray(columns["away_score"], dtype=np.int64)
+    home_win = home_score > away_score
+
+    winner = np.where(home_win, home, away)
+    loser = np.where(home_win, away, home)
+    games = np.bincount(sides, minlength=n_teams)
+    wins = np.bincount(winner, minlength=n_teams)
+    losses = games - wins
+    points_for = np.bincount(home, home_score, n_teams) + np.bincount(away, away_score, n_teams)
+    points_against = np.bincount(home, away_score, n_teams) + np.bincount(away, home_score, n_teams)
+    differential = points_for - points_against
+    win_pct = wins / np.maximum(games, 1)
+
+    # Games back of the team with the best record
+    leader = np.lexsort((-(wins - losses), -win_pct))[0]
+    games_back = ((wins[leader] - wins) + (losses - losses[leader])) / 2
+
+    # Head-to-head win percentage against the other teams on the same win percentage
+    head_to_head = np.zeros((n_teams, n_teams), dtype=np.int64)
+    np.add.at(head_to_head, (winner, loser), 1)
+    tied = (win_pct[:, None] == win_pct[None, :]) & ~np.eye(n_teams, dtype=bool)
+    h2h_wins = (head_to_head * tied).sum(axis=1)
+    h2h_games = ((head_to_head + head_to_head.T) * tied).sum(axis=1)
+    h2h_pct = np.where(h2h_games > 0, h2h_wins / np.maximum(h2h_games, 1), 0.5)
+
+    # Current streak: length of each team's last run of wins or losses
+    side_team = np.concatenate([home, away])
+    side_won = np.concatenate([home_win, ~home_win])
+    side_order = np.concatenate([np.arange(n_games), np.arange(n_games)])
+    order = np.lexsort((side_order, side_team))
+    side_team, side_won = side_team[order], side_won[order]
+    position = np.arange(len(order))
+    run_start = np.ones(len(order), dtype=bool)
+    run_start[1:] = (side_team[1:] != side_team[:-1]) | (side_won[1:] != side_won[:-1])
+    run_start_at = np.maximum.accumulate(np.where(run_start, position, 0))
+    last = np.ones(len(order), dtype=bool)
+    last[:-1] = side_team[1:] != side_team[:-1]
+    last_positions = position[last]
+    streak_length = np.zeros(n_teams, dtype=np.int64)
+    streak_won = np.zeros(n_teams, dtype=bool)
+    streak_length[side_team[last_positions]] = last_positions - run_start_at[last_positions] + 1
+    streak_won[side_team[last_positions]] = side_won[last_positions]
+
+    ranking = np.lexsort((names, -points_for, -differential, -h2h_pct, -win_pct))
+    return [
+        {
+            "rank": rank,
+            "team_name": str(names[i]),
+            "games_played": int(games[i]),
+            "wins": int(wins[i]),
+            "losses": int(losses[i]),
+            "win_pct": round(float(win_pct[i]), 3),
+            "games_back": float(games_back[i]),
+            "points_for": int(points_for[i]),
+            "points_against": int(points_against[i]),
+            "point_differential": int(differential[i]),
+            "head_to_head_pct": round(float(h2h_pct[i]), 3),
+            "streak": f"{'W' if streak_won[i] else 'L'}{int(streak_length[i])}"
+        }
+        for rank, i in enumerate(ranking, start=1)
+    ]
+
+
+class StandingsService:
+    """
+    Incremental team standings
+
+    A game result becomes one ``$inc`` delta per (team, season). Applying a
+    game, reversing it on delete, or swapping an edited game's old result
+    for its new one is a single ``bulk_write`` of upserts, so a team's
+    standing is created on its first game without a prior lookup.
+
+    Standings can always be rebuilt for a season from ``game_stats`` with
+    ``recompute_season``, which derives every team's record in one
+    aggregation; use it to repair drift if a write was interrupted.
+
+    Ranked tables with tiebreakers (see ``compute_table``) are cached per
+    season together with a fingerprint of the season's games (count and
+    latest ``updated_at``). Every read checks the fingerprint, so a game
+    written by another worker is picked up on the next request; local
+    writes also drop the entry directly.
+    """
+
+    def __init__(self):
+        self.tables = TTLLRUCache(
+            max_size=int(os.environ.get('STANDINGS_TABLE_CACHE_MAX_SIZE', 64)),
+            ttl_seconds=float(os.environ.get('STANDINGS_TABLE_CACHE_TTL_SECONDS', 3600))
+        )
+        self.games_applied = 0
+        self.games_reversed = 0
+        self.recomputes = 0
+        print("✅ StandingsService initialized")
+
+    def game_deltas(self, game: Dict[str, Any], sign: int = 1) -> Dict[Tuple[str, str], Dict[str, int]]:
+        """
+        Standing changes caused by one game
+
+        Args:
+            game: Game document (home_team, away_team, home_score, away_score, season)
+            sign: 1 to apply the game, -1 to reverse it
+
+        Returns:
+            Dict of (team_name, season) -> counter increments
+        """
+        home_win = home_won(game)
+        season = game["season"]
+        home = {
+            "wins": sign if home_win else 0,
+            "losses": 0 if home_win else sign,
+            "points_for": sign * game["home_score"],
+            "points_against": sign * game["away_score"]
+        }
+        away = {
+            "wins": 0 if home_win else sign,
+            "losses": sign if home_win else 0,
+            "points_for": sign * game["away_score"],
+            "points_against": sign * game["home_score"]
+        }
+        return {(game["home_team"], season): home, (game["away_team"], season): away}
+
+    def _merge(self, *deltas: Dict[Tuple[str, str], Dict[str, int]]) -> Dict[Tuple[str, str], Dict[str, int]]:
+        merged: Dict[Tuple[str, str], Dict[str, int]] = {}
+        for delta in deltas:
+            for key, counters in delta.items():
+                current = merged.setdefault(key, {counter: 0 for counter in STANDING_COUNTERS})
+                for counter, value in counters.items():
+                    current[counter] += value
+        return merged
+
+    async def _write(self, db, deltas: Dict[Tuple[str, str], Dict[str, int]]):
+        now = datetime.now(timezone.utc).isoformat()
+        operations = [
+            UpdateOne(
+                {"team_name": team_name, "season": season},
+                {
+                    "$inc": counters,
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"id": str(uuid.uuid4()), "division": None, "created_at": now}
+                },
+                upsert=True
+            )
+            for (team_name, season), counters in deltas.items()
+            if any(counters.values())
+        ]
+        if operations:
+            await db.team_standings.bulk_write(operations, ordered=False)
+        for season in {season for _, season in deltas}:
+            self.tables.delete(season)
+
+    async def apply_game(self, db, game: Dict[str, Any]):
+        """Add a new game's result to both teams' standings"""
+        await self._write(db, self.game_deltas(game))
+        self.games_applied += 1
+
+    async def apply_games(self, db, games: List[Dict[str, Any]]):
+        """Add several games' results (e.g. a night of box scores) in a single bulk write"""
+        await self._write(db, self._merge(*(self.game_deltas(game) for game in games)))
+        self.games_applied += len(games)
+
+    async def reverse_game(self, db, game: Dict[str, Any]):
+        """Take a deleted game's result back out of both teams' standings"""
+        await self._write(db, self.game_deltas(game, -1))
+        self.games_reversed += 1
+
+    async def replace_game(self, db, old_game: Dict[str, Any], new_game: Dict[str, Any]):
+        """Swap an edited game's old result for its new one in a single bulk write"""
+        await self._write(db, self._merge(self.game_deltas(old_game, -1), self.game_deltas(new_game)))
+        self.games_reversed += 1
+        self.games_applied += 1
+
+    def recompute_pipeline(self, season: str) -> List[Dict[str, Any]]:
+        """Aggregation turning a season's games into one record per team"""
+        home_win = {"$gt": ["$home_score", "$away_score"]}
+        return [
+            {"$match": {"season": season}},
+            {"$project": {"sides": [
+                {
+                    "team": "$home_team",
+                    "won": home_win,
+                    "points_for": "$home_score",
+                    "points_against": "$away_score"
+                },
+                {
+                    "team": "$away_team",
+                    "won": {"$not": [home_win]},
+                    "points_for": "$away_score",
+                    "points_against": "$home_score"
+                }
+            ]}},
+            {"$unwind": "$sides"},
+            {"$group": {
+                "_id": "$sides.team",
+                "wins": {"$sum": {"$cond": ["$sides.won", 1, 0]}},
+                "losses": {"$sum": {"$cond": ["$sides.won", 0, 1]}},
+                "points_for": {"$sum": "$sides.points_for"},
+                "points_against": {"$sum": "$sides.points_against"}
+            }}
+        ]
+
+    async def recompute_season(self, db, season: str) -> Dict[str, Any]:
+        """
+        Rebuild a season's standings from game_stats
+
+        Team records come from one aggregation and are written with one bulk
+        write; teams left without games in the season are zeroed rather than
+        deleted so their division assignment is kept.
+        """
+        records = await db.game_stats.aggregate(self.recompute_pipeline(season)).to_list(length=None)
+        now = datetime.now(timezone.utc).isoformat()
+        operations = [
+            UpdateOne(
+                {"team_name": record["_id"], "season": season},
+                {
+                    "$set": {**{counter: record[counter] for counter in STANDING_COUNTERS}, "updated_at": now},
+                    "$setOnInsert": {"id": str(uuid.uuid4()), "division": None, "created_at": now}
+                },
+                upsert=True
+            )
+            for record in records
+        ]
+        operations.append(UpdateMany(
+            {"season": season, "team_name": {"$nin": [record["_id"] for record in records]}},
+            {"$set": {**{counter: 0 for counter in STANDING_COUNTERS}, "updated_at": now}}
+        ))
+        await db.team_standings.bulk_write(operations, ordered=False)
+        self.tables.delete(season)
+        self.recomputes += 1
+        return {"season": season, "teams": len(records)}
+
+    async def load_columns(self, db, season: str) -> Dict[str, List[Any]]:
+        """Load a season's games as one list per column, oldest game first"""
+        rows = await db.game_stats.aggregate([
+            {"$match": {"season": season}},
+            {"$sort": {"game_date": 1, "created_at": 1}},
+            {"$group": {"_id": None, **{column: {"$push": f"${column}"} for column in GAME_COLUMNS}}}
+        ]).to_list(length=1)
+        return rows[0] if rows else {column: [] for column in GAME_COLUMNS}
+
+    async def season_fingerprint(self, db, season: str) -> str:
+        """Cheap summary of a season's games that changes on any create, edit or delete"""
+        rows = await db.game_stats.aggregate([
+            {"$match": {"season": season}},
+            {"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "latest": {"$max": {"$ifNull": ["$updated_at", "$created_at"]}}
+            }}
+        ]).to_list(length=1)
+        summary = rows[0] if rows else {}
+        return f"{summary.get('count', 0)}:{summary.get('latest')}"
+
+    async def get_table(self, db, season: str) -> List[Dict[str, Any]]:
+        """Ranked standings table for a season (cached while the season's games are unchanged)"""
+        fingerprint = await self.season_fingerprint(db, season)
+        cached = self.tables.get(season)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        table = compute_table(await self.load_columns(db, season))
+        self.tables.set(season, (fingerprint, table))
+        return table
+
+    async def ensure_indexes(self, db):
+        """Create the indexes used to upsert standings and recompute a season"""
+        await db.game_stats.create_index([("season", ASCENDING), ("game_date", ASCENDING), ("created_at", ASCENDING)])
+        try:
+            await db.team_standings.create_index(
+                [("season", ASCENDING), ("team_name", ASCENDING)],
+                unique=True,
+                name="season_team_unique"
+            )
+        except Exception as e:
+            # Existing duplicate standings block the unique index until they are cleaned up
+            logging.warning(f"Unique standings index not created: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counters for monitoring"""
+        return {
+            "games_applied": self.games_applied,
+            "games_reversed": self.games_reversed,
+            "recomputes": self.recomputes,
+            "table_cache": self.tables.stats()
+        }
+
+
+# Initialize service
+standings_service = StandingsService()
@@ -0,0 +1,125 @@
+"""
+Token Version Service for MNASE Basketball League
+Tracks per-user token versions so tokens issued before a role change can be rejected
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Any, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+
+class TokenVersionService:
+    """
+    In-memory table of user token versions
+
+    Each user document carries a ``token_version`` (missing means 0) that is
+    embedded in access tokens as the ``ver`` claim. Revoking a user's tokens
+    increments the stored version; any token carrying an older version is
+    rejected. Only users that have ever been revoked have a non-zero version,
+    so the table stays small and is reloaded in the background instead of
+    being queried per request. Revocations made by other workers become
+    visible after at most one refresh interval.
+    """
+
+    def __init__(self):
+        self.refresh_interval = float(os.environ.get('TOKEN_VERSION_REFRESH_SECONDS', 30))
+        self.versions: Dict[str, int] = {}
+        self.refreshes = 0
+        self.rejected = 0
+        self._task: Optional[asyncio.Task] = None
+        print("✅ TokenVersionService initialized")
+
+    def is_current(self, user_id: str, version: int) -> bool:
+        """Check that a token version is not older than the user's current version"""
+        if version < self.versions.get(user_id, 0):
+            self.rejected += 1
+            return False
+        return True
+
+    async def revoke(self, db, user_id: str) -> Optional[int]:
+        """
+        Invalidate every token previously issued to a user
+
+        Returns:
+            The user's new token version, or None if the user does not exist
+        """
+        user = await db.users.find_one_and_update(
+            {"id": user_id},
+            {"$inc": {"token_version": 1}},
+            projection={"_id": 0, "token_version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not user:
+            return None
+        self.versions[user_id] = user["token_version"]
+        return user["token_version"]
+
+    async def refresh(self, db):
+        """
+        Merge the users collection's versions into the table
+
+        Versions only ever increase, so each entry keeps the higher of the
+        stored and in-memory value: a revoke() that lands while the scan is
+        running is never overwritten by the older value it read.
+        """
+        versions = {}
+        async for user in db.users.find(
+            {"token_version": {"$gt": 0}},
+            {"_id": 0, "id": 1, "token_version": 1}
+        ):
+            versions[user["id"]] = user["token_version"]
+        for user_id, version in versions.items():
+            self.versions[user_id] = max(version, self.versions.get(user_id, 0))
+        self.refreshes += 1
+
+    async def ensure_indexes(self, db):
+        """
+        Create the index the refresh scan reads
+
+        It is partial, so it only holds users that have been revoked, and it
+        covers the scan's projection so refreshes never touch user documents.
+        """
+        await db.users.create_index(
+            [("token_version", ASCENDING), ("id", ASCENDING)],
+            partialFilterExpression={"token_version": {"$gt": 0}},
+            name="revoked_token_version"
+        )
+
+    async def _refresh_loop(self, db):
+        while True:
+            try:
+                await self.refresh(db)
+            except Exception as e:
+                logging.error(f"Failed to refresh token versions: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self, db):
+        """Start the background refresh task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop(db))
+
+    async def stop(self):
+        """Stop the background refresh task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get version table counters for monitoring"""
+        return {
+            "tracked_users": len(self.versions),
+            "refresh_interval_seconds": self.refresh_interval,
+            "refreshes": self.refreshes,
+            "rejected_tokens": self.rejected
+        }
+
+
+# Initialize service
+token_version_service = TokenVersionService()
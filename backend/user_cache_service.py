@@ -0,0 +1,73 @@
+"""
+User Cache Service for MNASE Basketball League
+Caches authenticated user documents so token checks can skip the users lookup
+"""
+
+import os
+from typing import Optional, Dict, Any
+
+from cache_utils import TTLLRUCache
+
+
+class UserCacheService:
+    """
+    Bounded TTL/LRU cache of user documents keyed by user id
+
+    Documents are stored without ``_id`` and ``password``. Every write that
+    changes a user's role, permissions or profile must call ``invalidate`` (or
+    ``invalidate_all`` for role-wide changes) so the next request reloads it.
+    The TTL bounds staleness for writes made by other worker processes.
+    """
+
+    def __init__(self):
+        self.cache = TTLLRUCache(
+            max_size=int(os.environ.get('USER_CACHE_MAX_SIZE', 5000)),
+            ttl_seconds=float(os.environ.get('USER_CACHE_TTL_SECONDS', 60))
+        )
+        # Bumped on every invalidation so a lookup that raced with a write
+        # does not put the stale document back into the cache
+        self.generation = 0
+        self.invalidations = 0
+        print("✅ UserCacheService initialized")
+
+    async def get_user(self, db, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a user document, loading it from the database on a cache miss
+
+        Returns:
+            A copy of the user document, or None if the user does not exist
+        """
+        doc = self.cache.get(user_id)
+        if doc is not None:
+            return dict(doc)
+
+        generation = self.generation
+        doc = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+        if not doc:
+            return None
+
+        if generation == self.generation:
+            self.cache.set(user_id, doc)
+        return dict(doc)
+
+    def invalidate(self, user_id: str):
+        """Drop a single user from the cache"""
+        self.generation += 1
+        self.invalidations += 1
+        self.cache.delete(user_id)
+
+    def invalidate_all(self):
+        """Drop every cached user (e.g. after a role definition changes)"""
+        self.generation += 1
+        self.invalidations += 1
+        self.cache.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache counters for monitoring"""
+        stats = self.cache.stats()
+        stats["invalidations"] = self.invalidations
+        return stats
+
+
+# Initialize service
+user_cache_service = UserCacheService()
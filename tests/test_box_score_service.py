@@ -0,0 +1,186 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from box_score_service import BoxScoreService, is_duplicate_key
+
+
+GAME = {
+    "game_date": "2025-01-10",
+    "home_team": "Hawks",
+    "away_team": "Bulls",
+    "home_score": 10,
+    "away_score": 7,
+    "location": "Main Gym",
+    "season": "2025"
+}
+
+
+def line(name, team, **stats):
+    return {"player_name": name, "team_name": team, **stats}
+
+
+@pytest.fixture
+def service():
+    return BoxScoreService()
+
+
+def fields(errors):
+    return [error.field for error in errors]
+
+
+def test_parse_json_accepts_single_and_batched_box_scores(service):
+    single = service.parse_json({"game": GAME, "players": [line("A", "Hawks")]})
+    batched = service.parse_json({"box_scores": [{"game": GAME, "players": []}, "junk"]})
+
+    assert single == [{"game": GAME, "players": [line("A", "Hawks")]}]
+    assert batched[1] == {"game": {}, "players": []}
+
+
+def test_parse_json_rejects_scalars(service):
+    with pytest.raises(ValueError):
+        service.parse_json("nope")
+
+
+def test_parse_csv_groups_rows_into_games(service):
+    text = (
+        "season,game_date,home_team,away_team,home_score,away_score,location,player_name,team_name,points\n"
+        "2025,2025-01-10,Hawks,Bulls,10,7,Main Gym,A,Hawks,10\n"
+        "2025,2025-01-10,Hawks,Bulls,10,7,Main Gym,B,Bulls,7\n"
+        "2025,2025-01-11,Bulls,Jets,5,6,Main Gym,B,Bulls,5\n"
+    )
+    box_scores = service.parse_csv(text)
+
+    assert len(box_scores) == 2
+    assert box_scores[0]["rows"] == [2, 3]
+    assert box_scores[0]["game"]["home_team"] == "Hawks"
+    assert box_scores[0]["players"][1] == {"player_name": "B", "team_name": "Bulls", "points": "7"}
+
+
+def test_validate_accepts_a_clean_box_score(service):
+    games, errors, warnings = service.validate([{
+        "game": GAME,
+        "players": [
+            line("A", "Hawks", points=10, field_goals_made=4, field_goals_attempted=8,
+                 offensive_rebounds=1, defensive_rebounds=2),
+            line("B", "Bulls", points="7", minutes_played="12.5")
+        ]
+    }])
+
+    assert errors == [] and warnings == []
+    assert games[0]["game_type"] == "regular"
+    first, second = games[0]["player_stats"]
+    assert first["total_rebounds"] == 3
+    assert second["points"] == 7 and second["minutes_played"] == 12.5
+
+
+def test_validate_reports_missing_game_fields(service):
+    _, errors, _ = service.validate([{"game": {"home_team": "Hawks"}, "players": []}])
+
+    assert "box_scores[0].game.game_date" in fields(errors)
+    assert "box_scores[0].game.home_team" not in fields(errors)
+
+
+def test_validate_rejects_made_over_attempted(service):
+    _, errors, _ = service.validate([{
+        "game": GAME,
+        "players": [line("A", "Hawks", free_throws_made=3, free_throws_attempted=2)]
+    }])
+
+    assert fields(errors) == ["box_scores[0].players[0].free_throws_made"]
+
+
+def test_validate_rejects_players_outside_the_game(service):
+    _, errors, _ = service.validate([{"game": GAME, "players": [line("A", "Jets")]}])
+
+    assert fields(errors) == ["box_scores[0].players[0].team_name"]
+
+
+def test_validate_rejects_duplicate_players_and_games(service):
+    box_score = {"game": GAME, "players": [line("A", "Hawks"), line("A", "Hawks")]}
+    _, errors, _ = service.validate([box_score, box_score])
+
+    codes = [error.code for error in errors]
+    assert codes.count("duplicate") == 3
+
+
+@pytest.mark.parametrize("value", ["1e400", "inf", "nan", float("inf"), 10 ** 400, -1, "abc", True, 2 ** 60])
+def test_validate_rejects_bad_numbers(service, value):
+    _, errors, _ = service.validate([{"game": GAME, "players": [line("A", "Hawks", points=value)]}])
+
+    assert fields(errors) == ["box_scores[0].players[0].points"]
+
+
+def test_validate_rejects_non_integer_scores(service):
+    _, errors, _ = service.validate([{"game": {**GAME, "home_score": "10.5"}, "players": []}])
+
+    assert fields(errors) == ["box_scores[0].game.home_score"]
+
+
+def test_validate_warns_when_points_do_not_add_up(service):
+    _, errors, warnings = service.validate([{"game": GAME, "players": [line("A", "Hawks", points=8)]}])
+
+    assert errors == []
+    assert len(warnings) == 1 and "Hawks" in warnings[0]
+
+
+def test_validate_caps_line_count(service):
+    service.max_lines = 1
+    _, errors, _ = service.validate([{"game": GAME, "players": [line("A", "Hawks"), line("B", "Bulls")]}])
+
+    assert [error.code for error in errors] == ["too_large"]
+
+
+def test_player_totals_sum_lines_across_games(service):
+    games, _, _ = service.validate([
+        {"game": GAME, "players": [line("A", "Hawks", points=10)]},
+        {"game": {**GAME, "game_date": "2025-01-11"}, "players": [line("A", "Hawks", points=5, position="G")]}
+    ])
+    totals = service.player_totals(games)
+    operations = service.player_operations(totals, "now")
+
+    assert list(totals) == [("A", "Hawks", "2025")]
+    assert totals[("A", "Hawks", "2025")]["inc"]["points"] == 15
+    assert totals[("A", "Hawks", "2025")]["inc"]["games_played"] == 2
+    assert len(operations) == 1
+
+
+class FakeCollection:
+    def __init__(self):
+        self.bulk_writes = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.bulk_writes.append(operations)
+
+
+class FakeDB:
+    def __init__(self):
+        self.player_stats = FakeCollection()
+
+
+def test_rollback_undoes_only_applied_operations(service):
+    games, _, _ = service.validate([{
+        "game": {**GAME, "home_score": 6, "away_score": 0},
+        "players": [line("A", "Hawks", points=3), line("B", "Hawks", points=2), line("C", "Hawks", points=1)]
+    }])
+    totals = service.player_totals(games)
+    error = BulkWriteError({"writeErrors": [{"index": 1}], "upserted": [{"index": 2, "_id": "new-doc"}]})
+    db = FakeDB()
+
+    asyncio.run(service._rollback_players(db, totals, error))
+
+    (operations,) = db.player_stats.bulk_writes
+    update, delete = operations
+    assert update._filter["player_name"] == "A"
+    assert update._doc["$inc"]["points"] == -3
+    assert update._doc["$inc"]["games_played"] == -1
+    assert delete._filter == {"_id": {"$in": ["new-doc"]}}
+
+
+def test_is_duplicate_key_only_for_unique_index_errors():
+    assert is_duplicate_key(DuplicateKeyError("E11000"))
+    assert is_duplicate_key(BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}]}))
+    assert not is_duplicate_key(BulkWriteError({"writeErrors": [{"index": 0, "code": 11000}, {"index": 1, "code": 2}]}))
+    assert not is_duplicate_key(BulkWriteError({"writeErrors": []}))
+    assert not is_duplicate_key(ValueError("boom"))
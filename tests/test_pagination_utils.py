@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from pagination_utils import (
+    InvalidCursorError, cursor_filter, decode_cursor, encode_cursor, paginate, with_tiebreaker
+)
+
+SORT = [("date", 1), ("id", 1)]
+
+
+def test_with_tiebreaker_appends_id_in_the_last_direction():
+    assert with_tiebreaker([("price", -1)]) == [("price", -1), ("id", -1)]
+    assert with_tiebreaker(SORT) == SORT
+    assert with_tiebreaker([]) == [("id", 1)]
+
+
+def test_cursor_round_trip_keeps_values_and_datetimes():
+    created = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+    sort = [("created_at", -1), ("id", -1)]
+    token = encode_cursor({"created_at": created, "id": "x"}, sort)
+
+    assert "=" not in token
+    assert decode_cursor(token, sort) == [created, "x"]
+
+
+def test_cursor_from_another_sort_is_rejected():
+    token = encode_cursor({"date": "2025-01-01", "id": "x"}, SORT)
+
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(token, [("price", 1), ("id", 1)])
+
+
+@pytest.mark.parametrize("token", ["", "not-base64!", "bm90IGpzb24", encode_cursor({}, [("id", 1)])[:-2]])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(token, SORT)
+
+
+def test_cursor_filter_ascending():
+    assert cursor_filter(SORT, ["2025-01-01", "x"]) == {"$or": [
+        {"date": {"$gt": "2025-01-01"}},
+        {"date": "2025-01-01", "id": {"$gt": "x"}}
+    ]}
+
+
+def test_cursor_filter_descending_includes_nulls():
+    sort = [("price", -1), ("id", -1)]
+    assert cursor_filter(sort, [10, "x"]) == {"$or": [
+        {"$or": [{"price": {"$lt": 10}}, {"price": None}]},
+        {"$and": [{"price": 10}, {"$or": [{"id": {"$lt": "x"}}, {"id": None}]}]}
+    ]}
+
+
+def test_cursor_filter_after_a_null_ascending_key():
+    assert cursor_filter([("price", 1), ("id", 1)], [None, "x"]) == {"$or": [
+        {"price": {"$ne": None}},
+        {"price": None, "id": {"$gt": "x"}}
+    ]}
+
+
+class FakeCursor:
+    def __init__(self, rows, calls):
+        self.rows = rows
+        self.calls = calls
+
+    def sort(self, sort_params):
+        self.calls["sort"] = sort_params
+        return self
+
+    def limit(self, limit):
+        self.calls["limit"] = limit
+        return self
+
+    async def to_list(self, length):
+        return self.rows[:length]
+
+
+class FakeCollection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = {}
+
+    def find(self, query, projection):
+        self.calls["query"] = query
+        return FakeCursor(self.rows, self.calls)
+
+
+ROWS = [{"date": f"2025-01-0{i}", "id": str(i)} for i in range(1, 6)]
+
+
+def test_paginate_returns_a_cursor_when_more_rows_exist():
+    collection = FakeCollection(ROWS)
+    rows, next_cursor = asyncio.run(paginate(collection, {"type": "camp"}, [("date", 1)], 2))
+
+    assert rows == ROWS[:2]
+    assert collection.calls["limit"] == 3
+    assert collection.calls["sort"] == SORT
+    assert decode_cursor(next_cursor, SORT) == ["2025-01-02", "2"]
+
+
+def test_paginate_applies_the_cursor_to_the_query():
+    collection = FakeCollection(ROWS[2:3])
+    cursor = encode_cursor(ROWS[1], SORT)
+    rows, next_cursor = asyncio.run(paginate(collection, {"type": "camp"}, [("date", 1)], 2, cursor))
+
+    assert rows == ROWS[2:3] and next_cursor is None
+    assert collection.calls["query"] == {"$and": [{"type": "camp"}, cursor_filter(SORT, ["2025-01-02", "2"])]}
+
+
+@pytest.mark.parametrize("limit", [0, -5])
+def test_paginate_never_asks_for_an_unbounded_or_empty_page(limit):
+    collection = FakeCollection(ROWS)
+    rows, next_cursor = asyncio.run(paginate(collection, {}, [("date", 1)], limit))
+
+    assert collection.calls["limit"] == 2
+    assert rows == ROWS[:1] and next_cursor is not None
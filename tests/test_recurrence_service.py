@@ -0,0 +1,133 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from recurrence_service import DEFAULT_HORIZON_DAYS, RecurrenceService, WEEKDAY_CODES
+
+
+@pytest.fixture
+def service():
+    return RecurrenceService()
+
+
+def walk(rule, lo, hi):
+    """Reference expansion: test every day in the window"""
+    dtstart = date.fromisoformat(rule["dtstart"])
+    until = date.fromisoformat(rule["until"]) if rule.get("until") else None
+    interval = rule.get("interval", 1)
+    dates = []
+    day = max(lo, dtstart)
+    while day <= hi and (until is None or day <= until):
+        if rule["freq"] == "daily":
+            match = (day - dtstart).days % interval == 0
+        elif rule["freq"] == "weekly":
+            weeks = ((day - timedelta(days=day.weekday())) - (dtstart - timedelta(days=dtstart.weekday()))).days // 7
+            match = weeks % interval == 0 and WEEKDAY_CODES[day.weekday()] in rule["byday"]
+        else:
+            months = (day.year - dtstart.year) * 12 + day.month - dtstart.month
+            match = day.day == dtstart.day and months % interval == 0
+        if match:
+            dates.append(day)
+        day += timedelta(days=1)
+    return dates
+
+
+@pytest.mark.parametrize("pattern,start,end,days,interval", [
+    ("daily", "2025-01-01", "2025-03-01", None, 1),
+    ("daily", "2025-01-01", None, None, 3),
+    ("weekly", "2025-01-01", "2025-06-30", ["monday", "thursday"], 1),
+    ("weekly", "2025-01-05", None, ["tuesday", "sunday"], 2),
+    ("monthly", "2025-01-31", "2026-12-31", None, 1),
+    ("monthly", "2025-01-15", None, None, 2),
+])
+@pytest.mark.parametrize("window", [("2024-12-01", "2025-12-31"), ("2025-02-10", "2025-04-20")])
+def test_occurrence_dates_match_a_day_walk(service, pattern, start, end, days, interval, window):
+    rule = service.build_rule(pattern, start, end, days, interval)
+    lo, hi = date.fromisoformat(window[0]), date.fromisoformat(window[1])
+
+    assert service.occurrence_dates(rule, lo, hi) == walk(rule, lo, hi)
+
+
+def test_monthly_skips_months_without_the_day(service):
+    rule = service.build_rule("monthly", "2025-01-31", "2025-06-30")
+    dates = service.occurrence_dates(rule, date(2025, 1, 1), date(2025, 12, 31))
+
+    assert [d.month for d in dates] == [1, 3, 5]
+
+
+def test_build_rule_rejects_bad_input(service):
+    with pytest.raises(ValueError):
+        service.build_rule("yearly", "2025-01-01")
+    with pytest.raises(ValueError):
+        service.build_rule("daily", "2025-01-10", "2025-01-01")
+    with pytest.raises(ValueError):
+        service.build_rule("weekly", "2025-01-01", recurrence_days=["funday"])
+
+
+def series(service, rule, exdates=()):
+    doc = service.build_series({"id": "s1", "title": "Practice", "date": rule["dtstart"]}, rule)
+    doc["exdates"] = list(exdates)
+    return doc
+
+
+def test_expand_without_window_runs_to_until(service):
+    start = datetime.now().date()
+    until = start + timedelta(days=3 * 365)
+    rule = service.build_rule("monthly", start.isoformat(), until.isoformat())
+    occurrences = service.expand(series(service, rule))
+
+    assert occurrences[-1]["date"] > (start + timedelta(days=DEFAULT_HORIZON_DAYS)).isoformat()
+    assert occurrences[-1]["date"] <= until.isoformat()
+
+
+def test_expand_open_ended_series_starting_in_the_future(service):
+    start = datetime.now().date() + timedelta(days=2 * 365)
+    rule = service.build_rule("daily", start.isoformat())
+    occurrences = service.expand(series(service, rule))
+
+    assert occurrences[0]["date"] == start.isoformat()
+    assert len(occurrences) == DEFAULT_HORIZON_DAYS + 1
+
+
+def test_expand_skips_exdates_and_shapes_occurrences(service):
+    rule = service.build_rule("daily", "2025-01-01", "2025-01-03")
+    occurrences = service.expand(series(service, rule, exdates=["2025-01-02"]))
+
+    assert [o["date"] for o in occurrences] == ["2025-01-01", "2025-01-03"]
+    assert occurrences[0]["id"] == "s1_20250101"
+    assert occurrences[0]["series_id"] == "s1"
+    assert "rule" not in occurrences[0]
+
+
+def test_expand_calendar_series_gives_occurrences_a_type(service):
+    rule = service.build_rule("weekly", "2025-01-06", "2025-01-20", ["monday"])
+    doc = service.build_series(
+        {"id": "c1", "title": "Clinic", "time": "18:00", "category": "clinic"},
+        rule,
+        collection="calendar_events"
+    )
+
+    occurrences = service.expand(doc)
+
+    assert [o["type"] for o in occurrences] == ["clinic"] * 3
+
+
+def test_calendar_series_occurrences_validate_as_calendar_events(service, monkeypatch):
+    pytest.importorskip("emergentintegrations")
+    monkeypatch.setenv("MONGO_URL", "mongodb://localhost:27017")
+    monkeypatch.setenv("DB_NAME", "test")
+    from server import CalendarEvent
+
+    rule = service.build_rule("daily", "2025-01-01", "2025-01-02")
+    doc = service.build_series(
+        {"id": "c2", "title": "Open Gym", "time": "09:00", "created_at": "2025-01-01T00:00:00+00:00"},
+        rule,
+        collection="calendar_events"
+    )
+
+    events = [CalendarEvent(**occurrence) for occurrence in service.expand(doc)]
+
+    assert [(e.id, e.date, e.type) for e in events] == [
+        ("c2_20250101", "2025-01-01", "event"),
+        ("c2_20250102", "2025-01-02", "event")
+    ]
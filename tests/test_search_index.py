@@ -0,0 +1,68 @@
+import pytest
+
+from search_index import TrigramIndex, trigrams
+
+
+def jaccard(a, b):
+    a, b = trigrams(a), trigrams(b)
+    return len(a & b) / len(a | b)
+
+
+def test_trigrams_are_padded_and_normalized():
+    assert trigrams("Smith") == {"  s", " sm", "smi", "mit", "ith", "th "}
+    assert trigrams("Café") == trigrams("cafe")
+    assert trigrams("") == set()
+
+
+@pytest.fixture
+def index():
+    index = TrigramIndex()
+    index.set_document("1", ["John Smith"])
+    index.set_document("2", ["Jane Smyth"])
+    index.set_document("3", ["Downtown Recreation Center"])
+    return index
+
+
+def test_misspelled_word_finds_the_document(index):
+    results = index.search("Smiht", threshold=0.2)
+
+    assert results[0][1] == "1"
+    assert results[0][0] == pytest.approx(jaccard("smiht", "smith"))
+
+
+def test_document_scores_as_its_best_entry(index):
+    (score, doc_id), = index.search("recreaton", limit=1)
+
+    assert doc_id == "3"
+    assert score == pytest.approx(jaccard("recreaton", "recreation"))
+
+
+def test_threshold_and_limit(index):
+    assert index.search("zzzz") == []
+    assert len(index.search("smith", limit=1, threshold=0.0)) == 1
+    assert all(score >= 0.5 for score, _ in index.search("smith", threshold=0.5))
+
+
+def test_set_document_replaces_previous_texts(index):
+    index.set_document("1", ["Michael Jordan"])
+
+    assert "1" not in [doc_id for _, doc_id in index.search("smith")]
+    assert index.search("jordan")[0][1] == "1"
+
+
+def test_remove_document_drops_its_postings(index):
+    before = index.get_stats()
+    index.remove_document("3")
+
+    assert index.search("recreation") == []
+    assert sorted(index.document_ids()) == ["1", "2"]
+    assert index.get_stats()["trigrams"] < before["trigrams"]
+    assert index.get_stats()["documents"] == 2
+
+
+def test_empty_texts_are_not_indexed():
+    index = TrigramIndex()
+    index.set_document("1", [None, ""])
+
+    assert len(index) == 0
+    assert index.search("anything") == []
@@ -0,0 +1,37 @@
+import pytest
+
+from search_service import SEARCH_TERMS_FIELD, SearchService
+
+
+@pytest.fixture
+def search_service():
+    return SearchService()
+
+
+def test_search_terms_cover_every_text_index_field(search_service):
+    terms = search_service.search_terms("events", {
+        "title": "Summer Classic",
+        "location": "Main Gym",
+        "description": "Week-long basketball camp",
+        "tags": ["Youth", "Skills Clinic"]
+    })
+
+    assert {"summer", "classic", "main", "gym", "camp", "youth", "skills", "clinic"} <= set(terms)
+    assert terms == sorted(terms)
+
+
+def test_one_word_query_uses_stored_terms(search_service):
+    search_service.terms_indexed.add("events")
+    search_service.terms_backfilled.add("events")
+
+    assert search_service.text_strategy("events", "camp") == "prefix"
+    assert search_service.create_text_search_query("Camp", ["title"], "events") == {
+        SEARCH_TERMS_FIELD: {"$regex": "^camp"}
+    }
+
+
+def test_with_search_terms_sets_terms_before_a_write(search_service):
+    doc = {"id": "1", "name": "Falcons", "coach_name": "Pat Lee", "division": "U12"}
+
+    assert search_service.with_search_terms("teams", doc) is doc
+    assert doc[SEARCH_TERMS_FIELD] == ["falcons", "lee", "pat", "u12"]
@@ -0,0 +1,76 @@
+from standings_service import compute_table
+
+
+def columns(*games):
+    home_team, away_team, home_score, away_score = zip(*games)
+    return {
+        "home_team": list(home_team),
+        "away_team": list(away_team),
+        "home_score": list(home_score),
+        "away_score": list(away_score)
+    }
+
+
+def by_team(table):
+    return {row["team_name"]: row for row in table}
+
+
+def test_empty_season():
+    assert compute_table({"home_team": []}) == []
+
+
+def test_records_games_back_and_streaks():
+    table = compute_table(columns(
+        ("A", "B", 10, 5),
+        ("B", "C", 8, 6),
+        ("C", "A", 9, 7),
+        ("A", "C", 12, 3)
+    ))
+    rows = by_team(table)
+
+    assert [row["team_name"] for row in table] == ["A", "B", "C"]
+    assert [row["rank"] for row in table] == [1, 2, 3]
+    assert (rows["A"]["wins"], rows["A"]["losses"], rows["A"]["games_played"]) == (2, 1, 3)
+    assert (rows["A"]["points_for"], rows["A"]["points_against"], rows["A"]["point_differential"]) == (29, 17, 12)
+    assert rows["A"]["win_pct"] == 0.667
+    assert [rows[team]["games_back"] for team in "ABC"] == [0.0, 0.5, 1.0]
+    assert [rows[team]["streak"] for team in "ABC"] == ["W1", "W1", "L1"]
+
+
+def test_head_to_head_breaks_a_win_pct_tie():
+    table = compute_table(columns(
+        ("P", "Q", 2, 1),
+        ("Q", "R", 50, 0),
+        ("Q", "S", 50, 0),
+        ("R", "P", 1, 0),
+        ("P", "S", 1, 0)
+    ))
+    rows = by_team(table)
+
+    # P and Q are both 2-1; P won their game even though Q has the better differential
+    assert [row["team_name"] for row in table][:2] == ["P", "Q"]
+    assert rows["P"]["head_to_head_pct"] == 1.0
+    assert rows["Q"]["head_to_head_pct"] == 0.0
+
+
+def test_point_differential_breaks_an_even_head_to_head():
+    table = compute_table(columns(
+        ("D", "E", 10, 5),
+        ("E", "F", 20, 0),
+        ("F", "D", 3, 2)
+    ))
+
+    assert [row["team_name"] for row in table] == ["E", "D", "F"]
+    assert {row["head_to_head_pct"] for row in table} == {0.5}
+
+
+def test_streak_counts_consecutive_results():
+    table = compute_table(columns(
+        ("A", "B", 1, 0),
+        ("A", "B", 1, 0),
+        ("B", "A", 0, 1)
+    ))
+    rows = by_team(table)
+
+    assert rows["A"]["streak"] == "W3"
+    assert rows["B"]["streak"] == "L3"